@@ -1,18 +1,18 @@
 from enem_lib.analysis import ENEMAnalyzer
-import matplotlib.pyplot as plt
-import seaborn as sns
+from enem_lib.paraiba_analysis import ParaibaENEMAnalyzer
+import os
 
-# Configurar estilo dos gráficos
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+# Os gráficos são desenhados a partir de histogramas e agregados (enem_lib.plotting),
+# então o custo de desenhar não cresce com o número de participantes
 
 def main():
     print("=" * 60)
     print("📊 ANALISADOR DE DADOS DO ENEM - PARAÍBA")
     print("=" * 60)
     
-    # Inicializar analisador
+    # Inicializar analisadores: painel nacional/UF e análises específicas da Paraíba
     analyzer = ENEMAnalyzer()
+    paraiba = ParaibaENEMAnalyzer()
     
     # Carregar dados disponíveis
     available_years = []
@@ -27,33 +27,36 @@ def main():
     
     print(f"📅 Anos disponíveis: {available_years}")
     
-    # Carregar dados
-    analyzer.load_data(available_years)
-    
-    if not analyzer.loaded_years:
+    # Carregar só as colunas do painel (todos os anos em uma tabela com NU_ANO)
+    if analyzer.load_panel(available_years) is None:
         print("❌ Nenhum dado pôde ser carregado.")
         return
+    panel_years = sorted(analyzer.panel['NU_ANO'].unique().tolist())
     
     # Análise 1: Correlações simples por ano
     print("\n" + "=" * 60)
     print("🔍 ANÁLISE 1: CORRELAÇÕES SIMPLES")
     print("=" * 60)
     
+    # Todos os anos em um único painel: uma passada agrupada por ano
+    resultados_painel = analyzer.analyze_panel(uf='PB', by='EDUCACAO_PAIS', predictor='EDUCACAO_PAIS')
+    
     correlations_by_year = {}
-    for year in analyzer.loaded_years:
-        print(f"\n📈 Analisando {year}...")
-        correlations, data = analyzer.analyze_correlations(year)
+    if resultados_painel:
+        correlations_by_year = resultados_painel['correlacoes'].to_dict('index')
+        participantes = resultados_painel['estatisticas'][('NOTA_GERAL', 'count')].groupby(level='NU_ANO').sum()
         
-        if correlations:
-            correlations_by_year[year] = correlations
-            print(f"   Participantes válidos: {len(data)}")
+        for year, correlations in correlations_by_year.items():
+            print(f"\n📈 {year}:")
+            print(f"   Participantes válidos: {participantes.get(year, 0)}")
             for area, corr in correlations.items():
                 area_name = area.replace('NU_NOTA_', '').replace('_', ' ')
                 print(f"   {area_name}: {corr:.3f}")
     
     # Gráfico das correlações ao longo dos anos
     if correlations_by_year:
-        analyzer.plot_correlations(correlations_by_year)
+        paraiba.plot_correlations(correlations_by_year)
+        analyzer.plot_panel_stats(resultados_painel['estatisticas'])
     
     # Análise 2: Bootstrap para um ano específico
     print("\n" + "=" * 60)
@@ -61,29 +64,34 @@ def main():
     print("=" * 60)
     
     # Escolher o ano mais recente para análise detalhada
-    latest_year = max(analyzer.loaded_years)
+    latest_year = max(panel_years)
     print(f"📊 Analisando {latest_year} com bootstrap...")
     
-    results, data = analyzer.analyze_with_bootstrap(latest_year, n_iterations=1000)
+    bootstrap = paraiba.analyze_with_bootstrap(latest_year, n_iterations=1000)
     
-    if results:
+    if bootstrap:
+        results, data = bootstrap
         print(f"   Participantes válidos: {len(data)}")
         for area, result in results.items():
             area_name = area.replace('NU_NOTA_', '').replace('_', ' ')
             print(f"   {area_name}: {result['correlacao']:.3f} (IC 95%: {result['intervalo_confianca'][0]:.3f} - {result['intervalo_confianca'][1]:.3f})")
         
         # Gráficos dos resultados do bootstrap
-        analyzer.plot_bootstrap_results(results, latest_year)
+        paraiba.plot_bootstrap_results(results, latest_year)
+    
+    # Distribuição das notas por educação dos pais e por faixa de renda (histogramas agregados)
+    paraiba.plot_grade_distribution(latest_year)
+    analyzer.plot_grade_distribution('Q006', years=[latest_year], uf='PB', heatmap=True)
     
     # Análise 3: Estatísticas descritivas
     print("\n" + "=" * 60)
     print("🔍 ANÁLISE 3: ESTATÍSTICAS DESCRITIVAS")
     print("=" * 60)
     
-    for year in analyzer.loaded_years:
-        paraiba_data = analyzer.get_paraiba_data(year)
+    for year in panel_years:
+        paraiba_data = paraiba.get_paraiba_data(year)
         if paraiba_data is not None:
-            df = analyzer.categorize_parent_education(paraiba_data)
+            df = paraiba.categorize_parent_education(paraiba_data)
             valid_data = df[['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO', 'EDUCACAO_PAIS']].dropna()
             
             print(f"\n📊 {year}:")
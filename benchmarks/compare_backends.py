@@ -0,0 +1,154 @@
+# benchmarks/compare_backends.py
+"""
+Compara os backends de execução (pandas, duckdb, polars) com o caminho pandas em memória:
+mesmos resultados (estatísticas e correlações) e tempo de cada um.
+
+Uso:
+    python benchmarks/compare_backends.py --tamanho 1000000 --anos 2019,2020 --uf PB
+Sai com código 1 se algum backend divergir do pandas. A mesma paridade roda
+automaticamente (em dados pequenos) em tests/test_backends.py.
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run_benchmarks import ANO, UF, PASTA_DADOS
+
+from enem_lib.analysis import ENEMAnalyzer
+from enem_lib.backends import BACKENDS
+from enem_lib.paraiba_analysis import ParaibaENEMAnalyzer
+from enem_lib.pipeline import parse_anos
+
+CATEGORIAS = ['Q002_STATUS', 'Q003_STATUS', 'Q006']
+# As estatísticas saem arredondadas em 2 casas: outra ordem de soma pode mudar o último dígito
+ARREDONDAMENTO = 0.0100001
+
+
+def silencioso(funcao, *args, **kwargs):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        return resultado, time.perf_counter() - inicio
+
+
+def preparar_anos(anos: list, n_linhas: int) -> str:
+    """Gera (uma única vez) o Parquet sintético de cada ano com n_linhas"""
+    from enem_lib.synthetic import generate_synthetic_microdata
+
+    pasta = os.path.join(PASTA_DADOS, f'backends_{n_linhas}')
+    for ano in anos:
+        if not os.path.exists(os.path.join(pasta, f'microdados_enem_{ano}.parquet')):
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                generate_synthetic_microdata(ano, n_linhas, pasta, formatos=('parquet',))
+    return pasta
+
+
+def referencia_pandas(pasta: str, anos: list, uf: str) -> dict:
+    """Resultados do caminho original: tudo carregado em memória com load_data/load_panel"""
+    analyzer = ENEMAnalyzer(data_dir=pasta)
+    silencioso(analyzer.load_data, anos)
+    silencioso(analyzer.load_panel, anos)
+    paraiba = ParaibaENEMAnalyzer(data_dir=pasta)
+    silencioso(paraiba.load_data, anos)
+
+    return {
+        'painel': silencioso(analyzer.analyze_panel, uf=uf, by=CATEGORIAS, years=anos)[0],
+        'renda': {ano: silencioso(analyzer.analyze_income_vs_grades, ano, uf)[0][0] for ano in anos},
+        'paraiba': {ano: silencioso(paraiba.analyze_correlations, ano)[0][0] for ano in anos},
+    }
+
+
+def executar_backend(nome: str, pasta: str, anos: list, uf: str) -> tuple:
+    analyzer, _ = silencioso(ENEMAnalyzer, data_dir=pasta, backend=nome)
+    if analyzer.backend.name != nome:
+        # get_backend volta para pandas quando a biblioteca não está instalada
+        raise ImportError(nome)
+    paraiba = ParaibaENEMAnalyzer(data_dir=pasta, backend=analyzer.backend)
+
+    painel, tempo_painel = silencioso(analyzer.analyze_panel, uf=uf, by=CATEGORIAS, years=anos)
+    resultados = {'painel': painel, 'renda': {}, 'paraiba': {}}
+    tempos = {'painel': tempo_painel, 'renda': 0.0, 'paraiba': 0.0}
+    for ano in anos:
+        (resultados['renda'][ano], _), tempo = silencioso(analyzer.analyze_income_vs_grades, ano, uf)
+        tempos['renda'] += tempo
+        (resultados['paraiba'][ano], _), tempo = silencioso(paraiba.analyze_correlations, ano)
+        tempos['paraiba'] += tempo
+    return resultados, tempos
+
+
+def normalizar(stats: pd.DataFrame) -> pd.DataFrame:
+    """Chaves como texto simples (o painel em memória usa categorias) e ordem fixa"""
+    stats = stats.copy()
+    stats.index = pd.MultiIndex.from_arrays([stats.index.get_level_values(i).astype(str)
+                                             for i in range(stats.index.nlevels)], names=stats.index.names)
+    return stats.sort_index()
+
+
+def divergencias(resultado: dict, referencia: dict) -> list:
+    problemas = []
+
+    for col in CATEGORIAS:
+        try:
+            pd.testing.assert_frame_equal(normalizar(resultado['painel']['estatisticas'][col]),
+                                          normalizar(referencia['painel']['estatisticas'][col]),
+                                          check_dtype=False, rtol=0, atol=ARREDONDAMENTO)
+        except AssertionError as e:
+            problemas.append(f"estatísticas por {col}: {str(e).splitlines()[0]}")
+
+    if not np.allclose(resultado['painel']['correlacoes'].to_numpy(),
+                       referencia['painel']['correlacoes'].to_numpy(), rtol=1e-9, equal_nan=True):
+        problemas.append("correlações do painel")
+
+    for chave, campo in [('renda', 'correlacoes'), ('paraiba', None)]:
+        for ano, esperado in referencia[chave].items():
+            atual = resultado[chave][ano][campo] if campo else resultado[chave][ano]
+            esperado = esperado[campo] if campo else esperado
+            if atual.keys() != esperado.keys() or not np.allclose(list(atual.values()), list(esperado.values()),
+                                                                 rtol=1e-9, equal_nan=True):
+                problemas.append(f"correlações de {chave} ({ano})")
+
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paridade e tempo dos backends de execução")
+    parser.add_argument('--tamanho', type=int, default=100000, help="Linhas do conjunto sintético")
+    parser.add_argument('--anos', default=str(ANO), help="Intervalo (2014:2024) ou lista (2014,2015,2016)")
+    parser.add_argument('--uf', default=UF, help="UF das análises por UF e do painel")
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="Backends a comparar")
+    args = parser.parse_args()
+    anos = parse_anos(args.anos)
+    uf = args.uf.strip().upper()
+
+    print(f"📦 Preparando dados sintéticos com {args.tamanho:,} linhas por ano ({', '.join(map(str, anos))})...")
+    pasta = preparar_anos(anos, args.tamanho)
+    referencia = referencia_pandas(pasta, anos, uf)
+
+    falhou = False
+    for nome in [n for n in args.backends.split(',') if n]:
+        try:
+            resultado, tempos = executar_backend(nome, pasta, anos, uf)
+        except ImportError:
+            print(f"⚠️  {nome:<8} não instalado, pulando")
+            continue
+
+        problemas = divergencias(resultado, referencia)
+        falhou = falhou or bool(problemas)
+        status = "✅" if not problemas else "❌"
+        print(f"{status} {nome:<8} painel {tempos['painel']:>7.3f} s  renda {tempos['renda']:>7.3f} s  "
+              f"paraíba {tempos['paraiba']:>7.3f} s")
+        for problema in problemas:
+            print(f"   divergência: {problema}")
+
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
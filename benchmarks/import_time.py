@@ -0,0 +1,79 @@
+# benchmarks/import_time.py
+"""
+Tempo de importação do enem_lib e dos seus módulos, cada um medido em um
+interpretador novo, e verificação de que nenhuma dependência pesada fora de
+uso (pandas, matplotlib, seaborn, requests, tqdm, duckdb, polars) é carregada junto.
+
+Uso:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeticoes 10 --falhar
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importação medida -> módulos que ela NÃO deve carregar
+CASOS = {
+    'import enem_lib': ['pandas', 'requests', 'tqdm', 'matplotlib', 'seaborn', 'duckdb', 'polars'],
+    'from enem_lib.analysis import ENEMAnalyzer': ['requests', 'tqdm', 'matplotlib', 'seaborn', 'duckdb', 'polars'],
+    'from enem_lib.paraiba_analysis import ParaibaENEMAnalyzer': ['requests', 'tqdm', 'matplotlib', 'seaborn',
+                                                                  'duckdb', 'polars'],
+    'from enem_lib.cube import year_moments': ['requests', 'tqdm', 'matplotlib', 'seaborn', 'duckdb', 'polars'],
+    'from enem_lib.downloader import ENEMDownloader': ['pandas', 'matplotlib', 'seaborn', 'duckdb', 'polars'],
+}
+
+MEDIR = """
+import json, sys, time
+inicio = time.perf_counter()
+{importacao}
+tempo = time.perf_counter() - inicio
+print(json.dumps({{'tempo_s': tempo, 'modulos': sorted(name.split('.')[0] for name in sys.modules)}}))
+"""
+
+
+def medir_importacao(importacao: str) -> dict:
+    """Executa a importação em um processo Python novo (sem cache de módulos)"""
+    saida = subprocess.run([sys.executable, '-c', MEDIR.format(importacao=importacao)], cwd=RAIZ,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação do enem_lib")
+    parser.add_argument('--repeticoes', type=int, default=5, help="Execuções por importação (usa a mediana)")
+    parser.add_argument('--limite-ms', type=float, default=None,
+                        help="Tempo máximo (ms) para 'import enem_lib' antes de sinalizar")
+    parser.add_argument('--falhar', action='store_true', help="Sai com código 1 se houver problema")
+    args = parser.parse_args()
+
+    problemas = []
+    print(f"{'Importação':<60}{'Mediana (ms)':>14}")
+    print("-" * 74)
+    for importacao, proibidos in CASOS.items():
+        execucoes = [medir_importacao(importacao) for _ in range(args.repeticoes)]
+        mediana = statistics.median(execucao['tempo_s'] for execucao in execucoes) * 1000
+        print(f"{importacao:<60}{mediana:>14.1f}")
+
+        carregados = [modulo for modulo in proibidos if modulo in execucoes[0]['modulos']]
+        if carregados:
+            problemas.append(f"'{importacao}' carregou {', '.join(carregados)}")
+        if importacao == 'import enem_lib' and args.limite_ms is not None and mediana > args.limite_ms:
+            problemas.append(f"'{importacao}' levou {mediana:.1f} ms (limite {args.limite_ms:.0f} ms)")
+
+    if problemas:
+        print("\n⚠️  Dependências carregadas sem necessidade / lentidão:")
+        for problema in problemas:
+            print(f"   {problema}")
+        if args.falhar:
+            sys.exit(1)
+    else:
+        print("\n✅ Nenhuma dependência pesada carregada sem necessidade")
+
+
+if __name__ == "__main__":
+    main()
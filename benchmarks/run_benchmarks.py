@@ -0,0 +1,294 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks de ingestão, filtragem, agregação e bootstrap sobre dados sintéticos.
+
+Cada medição roda em um processo novo (pico de RSS isolado), registra tempo,
+pico de memória e vazão (linhas/s, MB/s) em resultados/historico.json e é
+comparada com resultados/baseline.json para sinalizar regressões.
+
+Uso:
+    python benchmarks/run_benchmarks.py --tamanhos 100000,1000000,5000000
+    python benchmarks/run_benchmarks.py --tamanhos 100000 --salvar-baseline
+"""
+import argparse
+import contextlib
+import datetime
+import functools
+import http.server
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_DADOS = os.path.join(PASTA_BENCHMARKS, '.dados')
+PASTA_RESULTADOS = os.path.join(PASTA_BENCHMARKS, 'resultados')
+HISTORICO = os.path.join(PASTA_RESULTADOS, 'historico.json')
+BASELINE = os.path.join(PASTA_RESULTADOS, 'baseline.json')
+
+ANO = 2019
+UF = 'SP'
+TAMANHOS_PADRAO = [100000, 1000000, 5000000]
+# Limite por medição: um filho travado (ex: servidor HTTP local morto) não prende a suíte
+TIMEOUT_PADRAO_S = 1800
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo atual em MB (None fora de sistemas Unix)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024
+
+
+def preparar_dados(n_linhas: int) -> str:
+    """Gera (uma única vez) o ZIP e o Parquet sintéticos de um tamanho"""
+    from enem_lib.synthetic import generate_synthetic_microdata
+
+    pasta = os.path.join(PASTA_DADOS, str(n_linhas))
+    if not all(os.path.exists(os.path.join(pasta, f'microdados_enem_{ANO}.{ext}')) for ext in ('zip', 'parquet')):
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            generate_synthetic_microdata(ANO, n_linhas, pasta)
+    return pasta
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_servidor_http(pasta: str):
+    """Servidor HTTP local que substitui o download.inep.gov.br nos benchmarks de download"""
+    handler = functools.partial(QuietHandler, directory=pasta)
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}'
+
+
+# Cada benchmark: prepara o estado (fora da medição) e devolve (função medida, linhas, bytes)
+
+def bench_ingestao(pasta: str, opcoes: dict):
+    from enem_lib.downloader import ENEMDownloader
+
+    servidor, base_url = iniciar_servidor_http(pasta)
+    saida = tempfile.mkdtemp()
+    downloader = ENEMDownloader(max_retries=1, delay_between_retries=0, output_dir=saida, base_url=base_url)
+    # Com ENEM_CACHE_DIR definido o download viraria um acerto de cache: mede sempre sem cache
+    downloader.cache = None
+
+    def medir():
+        try:
+            if not downloader._process_single_year(ANO):
+                raise RuntimeError("Falha na ingestão")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+    zip_path = os.path.join(pasta, f'microdados_enem_{ANO}.zip')
+    return medir, opcoes['linhas'], os.path.getsize(zip_path)
+
+
+def bench_filtro_uf(pasta: str, opcoes: dict):
+    from enem_lib.analysis import ENEMAnalyzer
+
+    analyzer = ENEMAnalyzer(data_dir=pasta)
+    analyzer.load_data([ANO])
+    dados = analyzer.data[ANO]
+    return (lambda: analyzer.get_uf_data(ANO, UF)), len(dados), int(dados.memory_usage().sum())
+
+
+def bench_agregacao_renda(pasta: str, opcoes: dict):
+    from enem_lib.analysis import ENEMAnalyzer
+
+    analyzer = ENEMAnalyzer(data_dir=pasta)
+    analyzer.load_data([ANO])
+    dados = analyzer.data[ANO]
+    return (lambda: analyzer.analyze_income_vs_grades(ANO, UF)), len(dados), int(dados.memory_usage().sum())
+
+
+def bench_kendall_renda(pasta: str, opcoes: dict):
+    from enem_lib.analysis import ENEMAnalyzer
+
+    analyzer = ENEMAnalyzer(data_dir=pasta)
+    analyzer.load_data([ANO])
+    dados = analyzer.data[ANO]
+    medir = lambda: analyzer.analyze_income_vs_grades(ANO, UF, method='kendall')
+    return medir, len(dados), int(dados.memory_usage().sum())
+
+
+def bench_bootstrap(pasta: str, opcoes: dict):
+    from enem_lib.paraiba_analysis import ParaibaENEMAnalyzer
+
+    analyzer = ParaibaENEMAnalyzer(data_dir=pasta)
+    analyzer.load_data([ANO])
+    _, valid_data = analyzer.analyze_correlations(ANO)
+    iteracoes = opcoes['iteracoes']
+    medir = lambda: analyzer.bootstrap_correlation(valid_data, 'NOTA_GERAL', n_iterations=iteracoes)
+    return medir, len(valid_data) * iteracoes, int(valid_data.memory_usage().sum()) * iteracoes
+
+
+BENCHMARKS = {
+    'ingestao': bench_ingestao,
+    'filtro_uf': bench_filtro_uf,
+    'agregacao_renda': bench_agregacao_renda,
+    'kendall_renda': bench_kendall_renda,
+    'bootstrap': bench_bootstrap,
+}
+
+
+def _executar_no_filho(nome: str, pasta: str, opcoes: dict, fila):
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            medir, linhas, n_bytes = BENCHMARKS[nome](pasta, opcoes)
+            rss_inicial = pico_rss_mb()
+            inicio = time.perf_counter()
+            medir()
+            tempo = time.perf_counter() - inicio
+        fila.put({
+            'tempo_s': tempo,
+            'pico_rss_mb': pico_rss_mb(),
+            'rss_preparacao_mb': rss_inicial,
+            'linhas_por_s': linhas / tempo if tempo > 0 else None,
+            'mb_por_s': n_bytes / 1024 / 1024 / tempo if tempo > 0 else None,
+        })
+    except Exception as e:
+        fila.put({'erro': f'{type(e).__name__}: {e}'})
+
+
+def executar_benchmark(nome: str, pasta: str, opcoes: dict, timeout: float = TIMEOUT_PADRAO_S) -> dict:
+    """
+    Roda um benchmark em processo novo (spawn) e devolve as métricas. Se o filho morrer
+    sem responder ou passar de timeout segundos, devolve {'erro': ...} em vez de travar.
+    """
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_executar_no_filho, args=(nome, pasta, opcoes, fila))
+    processo.start()
+    limite = time.monotonic() + timeout
+    resultado = None
+    while resultado is None:
+        try:
+            resultado = fila.get(timeout=1)
+        except queue.Empty:
+            if not processo.is_alive():
+                resultado = {'erro': f'processo terminou sem resultado (código {processo.exitcode})'}
+            elif time.monotonic() > limite:
+                processo.terminate()
+                resultado = {'erro': f'tempo limite de {timeout:.0f} s excedido'}
+    processo.join()
+    return resultado
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def carregar_json(caminho: str, padrao):
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    return padrao
+
+
+def salvar_json(caminho: str, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, indent=2, ensure_ascii=False)
+
+
+def comparar_com_baseline(resultados: list, baseline: dict, tolerancia: float) -> list:
+    """Regressão: tempo ou pico de memória acima do baseline em mais que a tolerância"""
+    referencia = {(r['benchmark'], r['linhas']): r for r in baseline.get('resultados', [])}
+    regressoes = []
+    for resultado in resultados:
+        base = referencia.get((resultado['benchmark'], resultado['linhas']))
+        if base is None or 'erro' in resultado or 'erro' in base:
+            continue
+        for metrica in ('tempo_s', 'pico_rss_mb'):
+            atual, anterior = resultado.get(metrica), base.get(metrica)
+            if atual is not None and anterior and atual > anterior * (1 + tolerancia):
+                regressoes.append(f"{resultado['benchmark']} ({resultado['linhas']:,} linhas): "
+                                  f"{metrica} {anterior:.2f} -> {atual:.2f} (+{(atual / anterior - 1) * 100:.0f}%)")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline do ENEM sobre dados sintéticos")
+    parser.add_argument('--tamanhos', default=','.join(map(str, TAMANHOS_PADRAO)),
+                        help="Número de linhas de cada conjunto, separados por vírgula")
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help="Benchmarks a executar")
+    parser.add_argument('--iteracoes', type=int, default=50, help="Iterações do bootstrap")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_PADRAO_S, help="Segundos máximos por medição")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora relativa tolerada antes de sinalizar")
+    parser.add_argument('--salvar-baseline', action='store_true', help="Grava esta execução como baseline")
+    parser.add_argument('--falhar-em-regressao', action='store_true', help="Sai com código 1 se houver regressão")
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',') if t]
+    nomes = [n for n in args.benchmarks.split(',') if n]
+
+    resultados = []
+    for n_linhas in tamanhos:
+        print(f"\n📦 Preparando dados sintéticos com {n_linhas:,} linhas...")
+        pasta = preparar_dados(n_linhas)
+
+        for nome in nomes:
+            metricas = executar_benchmark(nome, pasta, {'linhas': n_linhas, 'iteracoes': args.iteracoes},
+                                          args.timeout)
+            resultado = {'benchmark': nome, 'linhas': n_linhas, **metricas}
+            resultados.append(resultado)
+
+            if 'erro' in metricas:
+                print(f"❌ {nome:<16} {n_linhas:>10,}  {metricas['erro']}")
+            else:
+                rss = f"{metricas['pico_rss_mb']:.0f} MB" if metricas['pico_rss_mb'] is not None else 'N/A'
+                print(f"⏱️  {nome:<16} {n_linhas:>10,}  {metricas['tempo_s']:>8.2f} s  pico {rss:>8}  "
+                      f"{metricas['linhas_por_s']:>12,.0f} linhas/s  {metricas['mb_por_s']:>8.1f} MB/s")
+
+    execucao = {
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_atual(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+
+    historico = carregar_json(HISTORICO, [])
+    historico.append(execucao)
+    salvar_json(HISTORICO, historico)
+    print(f"\n💾 Resultados adicionados a {HISTORICO}")
+
+    regressoes = comparar_com_baseline(resultados, carregar_json(BASELINE, {}), args.tolerancia)
+    if regressoes:
+        print("\n⚠️  Regressões em relação ao baseline:")
+        for regressao in regressoes:
+            print(f"   {regressao}")
+    elif os.path.exists(BASELINE):
+        print("✅ Nenhuma regressão em relação ao baseline")
+
+    if args.salvar_baseline:
+        salvar_json(BASELINE, execucao)
+        print(f"📌 Baseline salvo em {BASELINE}")
+
+    if regressoes and args.falhar_em_regressao:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
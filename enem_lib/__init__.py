@@ -1,5 +1,30 @@
 # enem_lib/__init__.py
-from .downloader import ENEMDownloader
-from .numpy_ops import exemplo_algebra_linear, exemplo_numeros_aleatorios
-from .analysis import ENEMAnalyzer
-from .paraiba_analysis import ParaibaENEMAnalyzer
\ No newline at end of file
+"""
+Os submódulos são importados só no primeiro acesso (PEP 562): `import enem_lib`
+não carrega requests, tqdm nem pandas até que algum nome seja usado, e cada
+script paga apenas pelas dependências do que de fato usa.
+"""
+import importlib
+
+# Nome exportado -> submódulo que o define
+_LAZY_ATTRIBUTES = {
+    'ENEMDownloader': 'downloader',
+    'exemplo_algebra_linear': 'numpy_ops',
+    'exemplo_numeros_aleatorios': 'numpy_ops',
+    'ENEMAnalyzer': 'analysis',
+    'ParaibaENEMAnalyzer': 'paraiba_analysis',
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(f'.{_LAZY_ATTRIBUTES[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,272 @@
+# enem_lib/aggregates.py
+import pandas as pd
+import numpy as np
+from typing import List
+
+NOTE_COLUMNS = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
+GRADE_COLUMNS = NOTE_COLUMNS + ['NOTA_GERAL']
+
+# Mapeamentos das respostas do questionário socioeconômico
+WORK_STATUS_MAP = {
+    'A': 'Não trabalha', 'B': 'Trabalha em casa', 'C': 'Trabalha fora (informal)',
+    'D': 'Trabalha fora (formal)', 'E': 'Aposentado', 'F': 'Desempregado',
+    'G': 'Outro', 'H': np.nan, ' ': np.nan, '': np.nan
+}
+
+INCOME_MAP = {
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'I': 9, 'J': 10, 'K': 11, 'L': 12, 'M': 13, 'N': 14, 'O': 15, 'P': 16,
+    'Q': 17
+}
+
+EDUCATION_MAP = {
+    'A': 1, 'B': 1, 'C': 1, 'D': 1,  # Informal/colarinho azul
+    'E': 2, 'F': 2, 'G': 2,           # Colarinho azul técnico/colarinho branco
+    'H': np.nan, ' ': np.nan, '': np.nan  # Ignorar sem resposta
+}
+
+
+def categories_to_text(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte colunas categóricas de volta para texto (object), como saem do read_parquet.
+    Usado no recorte por UF quando os dados vêm como categorias (ex: memória compartilhada),
+    para que mapeamentos e agrupamentos se comportem como no caminho original.
+    """
+    categorical = [col for col in df.columns if df[col].dtype.name == 'category']
+    if not categorical:
+        return df
+    return df.astype({col: object for col in categorical})
+
+
+def grade_moments(df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Agrega, em uma única passada, contagem, soma e soma dos quadrados de cada nota
+    por combinação das colunas-chave. Apenas registros com todas as notas válidas
+    entram na agregação (mesmo critério do dropna das análises por ano).
+    """
+    notes = [col for col in NOTE_COLUMNS if col in df.columns]
+    keys = [key for key in keys if key in df.columns]
+
+    valid = df[keys + notes].dropna(subset=notes)
+    values = valid[notes].astype('float64')
+    values['NOTA_GERAL'] = values.mean(axis=1)
+
+    parts = {'N': np.ones(len(valid), dtype='float64')}
+    if 'PESO_AMOSTRAL' in df.columns:
+        parts['N'] = df.loc[valid.index, 'PESO_AMOSTRAL'].to_numpy(dtype='float64')
+    for col in values.columns:
+        parts[f'SUM_{col}'] = values[col].to_numpy() * parts['N']
+        parts[f'SQ_{col}'] = values[col].to_numpy() ** 2 * parts['N']
+
+    table = pd.DataFrame(parts, index=valid.index)
+    for key in keys:
+        table[key] = valid[key]
+
+    if not keys:
+        return table.sum().to_frame().T
+
+    return table.groupby(keys, dropna=False, observed=True).sum().reset_index()
+
+
+def weighted_corr(x, y, weights=None) -> float:
+    """Correlação de Pearson ponderada (pesos amostrais); sem pesos, igual a Series.corr"""
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    w = np.ones_like(x) if weights is None else np.asarray(weights, dtype='float64')
+    valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(w))
+    x, y, w = x[valid], y[valid], w[valid]
+    if len(x) < 2:
+        return np.nan
+
+    mean_x = np.average(x, weights=w)
+    mean_y = np.average(y, weights=w)
+    cov = np.sum(w * (x - mean_x) * (y - mean_y))
+    denominator = np.sqrt(np.sum(w * (x - mean_x) ** 2) * np.sum(w * (y - mean_y) ** 2))
+    return cov / denominator if denominator > 0 else np.nan
+
+
+CORRELATION_METHODS = ('pearson', 'spearman', 'kendall')
+
+
+def _valid_pairs(x, y, weights=None):
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    w = np.ones_like(x) if weights is None else np.asarray(weights, dtype='float64')
+    valid = ~(np.isnan(x) | np.isnan(y) | np.isnan(w))
+    return x[valid], y[valid], w[valid]
+
+
+def midranks(values, weights=None) -> np.ndarray:
+    """
+    Postos médios (empates recebem a média dos postos do bloco) em O(n log n).
+    Com pesos, o posto é o peso acumulado até o meio do bloco de empates.
+    """
+    uniques, inverse = np.unique(np.asarray(values, dtype='float64'), return_inverse=True)
+    block_weight = np.bincount(inverse, weights=weights, minlength=len(uniques)).astype('float64')
+    before = np.cumsum(block_weight) - block_weight
+    return (before + block_weight / 2)[inverse]
+
+
+def spearman_corr(x, y, weights=None) -> float:
+    """Correlação de Spearman: Pearson (ponderada) sobre os postos médios"""
+    x, y, w = _valid_pairs(x, y, weights)
+    if len(x) < 2:
+        return np.nan
+    return weighted_corr(midranks(x, w), midranks(y, w), w)
+
+
+def _tied_pairs(codes: np.ndarray, w: np.ndarray, n_codes: int) -> float:
+    """Soma (ponderada) dos pares empatados: sum((W_g^2 - sum w_i^2) / 2) por valor"""
+    block = np.bincount(codes, weights=w, minlength=n_codes)
+    block_sq = np.bincount(codes, weights=w ** 2, minlength=n_codes)
+    return float(np.sum(block ** 2 - block_sq) / 2)
+
+
+def kendall_tau_b(x, y, weights=None) -> float:
+    """
+    Tau-b de Kendall com correção de empates, sem comparar todos os pares.
+
+    As observações são agrupadas pelo valor do lado com menos valores distintos
+    (renda: 17, educação dos pais: 3) e percorridas em ordem; um histograma dos
+    postos do outro lado, acumulado sobre os grupos já vistos, dá de uma vez quantos
+    pares de cada observação são concordantes ou discordantes.
+    Custo O(n log n + k*m), com k e m os números de valores distintos de cada lado.
+    Com pesos, cada par conta w_i * w_j.
+    """
+    x, y, w = _valid_pairs(x, y, weights)
+    if len(x) < 2:
+        return np.nan
+
+    x_values, x_codes = np.unique(x, return_inverse=True)
+    y_values, y_codes = np.unique(y, return_inverse=True)
+    if len(x_values) > len(y_values):
+        x_values, x_codes, y_values, y_codes = y_values, y_codes, x_values, x_codes
+    n_x, n_y = len(x_values), len(y_values)
+
+    order = np.argsort(x_codes, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(x_codes, minlength=n_x))])
+
+    # Pesos por posto de y dos grupos de x menores que o atual
+    seen = np.zeros(n_y, dtype='float64')
+    seen_total = 0.0
+    balance = 0.0  # concordantes - discordantes
+    for g in range(n_x):
+        members = order[bounds[g]:bounds[g + 1]]
+        codes, member_w = y_codes[members], w[members]
+        below = np.cumsum(seen) - seen
+        less = below[codes]
+        greater = seen_total - less - seen[codes]
+        balance += float(np.dot(member_w, less - greater))
+
+        group_hist = np.bincount(codes, weights=member_w, minlength=n_y)
+        seen += group_hist
+        seen_total += group_hist.sum()
+
+    total_pairs = float((w.sum() ** 2 - np.sum(w ** 2)) / 2)
+    denominator = np.sqrt((total_pairs - _tied_pairs(x_codes, w, n_x)) *
+                          (total_pairs - _tied_pairs(y_codes, w, n_y)))
+    return balance / denominator if denominator > 0 else np.nan
+
+
+def correlate(x, y, method: str = 'pearson', weights=None) -> float:
+    """Correlação pelo método pedido ('pearson', 'spearman' ou 'kendall')"""
+    if method == 'pearson':
+        return weighted_corr(x, y, weights)
+    if method == 'spearman':
+        return spearman_corr(x, y, weights)
+    if method == 'kendall':
+        return kendall_tau_b(x, y, weights)
+    raise ValueError(f"Método de correlação desconhecido: {method} (opções: {', '.join(CORRELATION_METHODS)})")
+
+
+def merge_moments(tables: List[pd.DataFrame], keys: List[str]) -> pd.DataFrame:
+    """Combina tabelas de momentos (de arquivos, row groups ou anos diferentes)"""
+    tables = [table for table in tables if table is not None and len(table) > 0]
+    if not tables:
+        return pd.DataFrame()
+    combined = pd.concat(tables, ignore_index=True)
+    keys = [key for key in keys if key in combined.columns]
+    return combined.groupby(keys, dropna=False, observed=True).sum().reset_index()
+
+
+def derive_predictors(moments: pd.DataFrame) -> pd.DataFrame:
+    """Deriva as variáveis categóricas/ordinais a partir dos códigos brutos das chaves"""
+    moments = moments.copy()
+    if 'Q006' in moments.columns:
+        moments['RENDA_NUM'] = moments['Q006'].map(INCOME_MAP).astype('float64')
+    for col in ['Q002', 'Q003']:
+        if col in moments.columns:
+            moments[f'{col}_STATUS'] = moments[col].map(WORK_STATUS_MAP)
+            moments[f'{col}_CAT'] = moments[col].map(EDUCATION_MAP).astype('float64')
+    if 'Q002_CAT' in moments.columns and 'Q003_CAT' in moments.columns:
+        moments['EDUCACAO_PAIS'] = moments[['Q002_CAT', 'Q003_CAT']].mean(axis=1)
+    return moments
+
+
+def stats_from_moments(moments: pd.DataFrame, by: List[str], column: str = 'NOTA_GERAL') -> pd.DataFrame:
+    """Média, desvio padrão (ddof=1) e contagem por grupo, no formato do groupby().agg()"""
+    valid = moments.dropna(subset=by)
+    grouped = valid.groupby(by, observed=True)[['N', f'SUM_{column}', f'SQ_{column}']].sum()
+
+    n = grouped['N']
+    mean = grouped[f'SUM_{column}'] / n
+    var = (grouped[f'SQ_{column}'] - n * mean ** 2) / (n - 1)
+    std = np.sqrt(var.clip(lower=0)).where(n > 1)
+
+    stats = pd.DataFrame({
+        (column, 'mean'): mean,
+        (column, 'std'): std,
+        (column, 'count'): n,
+    })
+    stats.columns = pd.MultiIndex.from_tuples(stats.columns)
+    stats = stats.round(2)
+    if (n % 1 == 0).all():
+        stats[(column, 'count')] = n.astype('int64')
+    return stats
+
+
+def grouped_grade_stats(valid_data: pd.DataFrame, by: str) -> pd.DataFrame:
+    """
+    Média, desvio padrão e contagem da NOTA_GERAL por categoria. Em amostras
+    (coluna PESO_AMOSTRAL) as estimativas são ponderadas e a contagem estima a população.
+    """
+    if 'PESO_AMOSTRAL' in valid_data.columns:
+        return stats_from_moments(grade_moments(valid_data, [by]), [by])
+    return valid_data.groupby(by).agg({
+        'NOTA_GERAL': ['mean', 'std', 'count']
+    }).round(2)
+
+
+def correlations_from_moments(moments: pd.DataFrame, predictor: str, by: List[str] = None) -> pd.DataFrame:
+    """
+    Correlação de Pearson entre um preditor derivado das chaves e cada nota.
+    Como o preditor é constante dentro de cada célula, os produtos cruzados
+    saem diretamente das somas por célula.
+    """
+    by = by or []
+    valid = moments.dropna(subset=[predictor]).copy()
+    x = valid[predictor]
+
+    columns = [col for col in GRADE_COLUMNS if f'SUM_{col}' in valid.columns]
+    parts = {'N': valid['N'], 'SX': x * valid['N'], 'SXX': x ** 2 * valid['N']}
+    for col in columns:
+        parts[f'SY_{col}'] = valid[f'SUM_{col}']
+        parts[f'SYY_{col}'] = valid[f'SQ_{col}']
+        parts[f'SXY_{col}'] = x * valid[f'SUM_{col}']
+    sums = pd.DataFrame(parts)
+
+    if by:
+        sums[by] = valid[by]
+        sums = sums.groupby(by, observed=True).sum()
+    else:
+        sums = sums.sum().to_frame().T
+
+    n = sums['N']
+    var_x = sums['SXX'] - sums['SX'] ** 2 / n
+    correlations = {}
+    for col in columns:
+        cov = sums[f'SXY_{col}'] - sums['SX'] * sums[f'SY_{col}'] / n
+        var_y = sums[f'SYY_{col}'] - sums[f'SY_{col}'] ** 2 / n
+        correlations[col] = cov / np.sqrt(var_x * var_y)
+
+    return pd.DataFrame(correlations).replace([np.inf, -np.inf], np.nan)
@@ -1,16 +1,41 @@
 # enem_lib/analysis.py
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from typing import Dict, List, Tuple
 import os
+import pyarrow.parquet as pq
+
+from .aggregates import (NOTE_COLUMNS, WORK_STATUS_MAP, INCOME_MAP, grade_moments, merge_moments,
+                         derive_predictors, stats_from_moments, correlations_from_moments,
+                         grouped_grade_stats, weighted_corr, categories_to_text,
+                         CORRELATION_METHODS, correlate)
+from .cube import CUBE_KEYS, cube_path_for, load_aggregate_cube
+from .sketch import DEFAULT_QUANTILES, GroupedQuantileSketch, stream_grade_quantile_groupings
+from .sampling import sample_dir_for
+from .instrumentation import span, traced
+from .backends import get_backend, uf_filters, frame_text_columns, parquet_text_columns
+from . import plotting
+from .regression import (DEFAULT_FIXED_EFFECTS, cells_from_moments, regression_moments,
+                         stream_regression_moments, regress_from_cells)
+
+# Colunas necessárias para o modo painel (todos os anos como uma única tabela)
+PANEL_COLUMNS = ['SG_UF_PROVA', 'Q002', 'Q003', 'Q006'] + NOTE_COLUMNS
+PANEL_KEYS = ['NU_ANO', 'Q002', 'Q003', 'Q006']
+# Colunas lidas sob demanda (via backend) quando o ano não foi carregado com load_data
+ANALYSIS_COLUMNS = PANEL_COLUMNS + ['PESO_AMOSTRAL']
 
 class ENEMAnalyzer:
-    def __init__(self, data_dir='dados_enem'):
-        self.data_dir = data_dir
+    def __init__(self, data_dir='dados_enem', use_sample=False, backend='pandas'):
+        # Com use_sample=True, todas as leituras usam as amostras estratificadas
+        # (sampling.build_stratified_sample) e as estimativas são ponderadas
+        self.data_dir = sample_dir_for(data_dir) if use_sample else data_dir
+        self.use_sample = use_sample
+        # Motor usado para anos não carregados em memória: 'pandas', 'duckdb' ou 'polars'
+        self.backend = get_backend(backend)
         self.data = {}
         self.loaded_years = []
+        self.panel = None
+        self.cube = None
         
     def load_data(self, years: List[int]) -> None:
         for year in years:
@@ -18,7 +43,9 @@ class ENEMAnalyzer:
             if os.path.exists(parquet_path):
                 try:
                     print(f"📂 Carregando dados de {year}...")
-                    self.data[year] = pd.read_parquet(parquet_path)
+                    with span('load', ano=year) as s:
+                        self.data[year] = pd.read_parquet(parquet_path)
+                        s.add(linhas=len(self.data[year]), bytes=os.path.getsize(parquet_path))
                     self.loaded_years.append(year)
                     print(f"✅ {year} carregado: {len(self.data[year])} registros")
                 except Exception as e:
@@ -26,61 +53,68 @@ class ENEMAnalyzer:
             else:
                 print(f"⚠️  Arquivo não encontrado para {year}")
     
+    @traced('uf_filter')
     def get_uf_data(self, year: int, uf: str) -> pd.DataFrame:
         if year not in self.data:
-            print(f"❌ Dados de {year} não carregados")
-            return None
+            return self.read_uf_data(year, uf)
         
-        df = self.data[year].copy()
+        # Sem cópia: os filtros abaixo já criam um DataFrame novo (e os dados
+        # podem estar em memória compartilhada, ver parallel.py)
+        df = self.data[year]
         
-        # Verificar diferentes possíveis nomes de coluna para UF
-        uf_columns = [col for col in df.columns if 'UF' in col or 'ESTADO' in col]
+        # Mesmo critério de read_uf_data: sigla exata nas colunas de UF em texto,
+        # ou código numérico nas colunas numéricas
+        candidates = uf_filters(frame_text_columns(df), uf)
         
-        if not uf_columns:
+        if not candidates:
             print(f"❌ Nenhuma coluna de UF encontrada em {year}")
             return None
         
         uf_data = None
-        for col in uf_columns:
-            try:
-                # Tentar encontrar a UF na coluna (pode ser código numérico ou string)
-                if df[col].dtype == 'object' or df[col].dtype.name == 'string':
-                    uf_data = df[df[col].astype(str).str.contains(uf, na=False)]
-                else:
-                    # Se for numérico, tentar converter UF para número
-                    uf_num = int(uf)
-                    uf_data = df[df[col] == uf_num]
-                
-                if len(uf_data) > 0:
-                    print(f"📊 Dados da UF {uf} ({year}) encontrados na coluna {col}: {len(uf_data)} participantes")
-                    break
-            except:
-                continue
+        for col, value in candidates:
+            uf_data = df[df[col] == value]
+            if len(uf_data) > 0:
+                print(f"📊 Dados da UF {uf} ({year}) encontrados na coluna {col}: {len(uf_data)} participantes")
+                break
         
         if uf_data is None or len(uf_data) == 0:
             print(f"❌ UF {uf} não encontrada em {year}")
             return None
         
-        return uf_data
+        return categories_to_text(uf_data)
+    
+    def read_uf_data(self, year: int, uf: str) -> pd.DataFrame:
+        """
+        Lê do Parquet só as linhas da UF e as colunas das análises, com o filtro
+        empurrado para o backend (sem carregar o ano inteiro em self.data)
+        """
+        parquet_path = f'{self.data_dir}/microdados_enem_{year}.parquet'
+        if not os.path.exists(parquet_path):
+            print(f"❌ Dados de {year} não carregados")
+            return None
+        
+        # Mesmos filtros e ordem de busca de get_uf_data
+        for col, value in uf_filters(parquet_text_columns(parquet_path), uf):
+            uf_data = self.backend.read(year, self.data_dir, [col] + ANALYSIS_COLUMNS, {col: value})
+            if uf_data is not None and len(uf_data) > 0:
+                print(f"📊 Dados da UF {uf} ({year}) encontrados na coluna {col}: {len(uf_data)} participantes")
+                return uf_data
+        
+        print(f"❌ UF {uf} não encontrada em {year}")
+        return None
     
+    @traced('categorize')
     def categorize_work_status(self, df: pd.DataFrame) -> pd.DataFrame:
         df = df.copy()
         
         # Mapeamento do status de trabalho dos pais (Q002 e Q003)
-        work_status_map = {
-            'A': 'Não trabalha', 'B': 'Trabalha em casa', 'C': 'Trabalha fora (informal)',
-            'D': 'Trabalha fora (formal)', 'E': 'Aposentado', 'F': 'Desempregado',
-            'G': 'Outro', 'H': np.nan, ' ': np.nan, '': np.nan
-        }
-        
-        # Aplicar mapeamento se as colunas existirem
         for col in ['Q002', 'Q003']:
             if col in df.columns:
-                df[f'{col}_STATUS'] = df[col].map(work_status_map)
+                df[f'{col}_STATUS'] = df[col].map(WORK_STATUS_MAP)
         
         return df
     
-    def analyze_work_status_vs_grades(self, year: int, uf: str) -> Dict:
+    def analyze_work_status_vs_grades(self, year: int, uf: str, quantiles: bool = False) -> Dict:
         uf_data = self.get_uf_data(year, uf)
         if uf_data is None:
             return {}
@@ -88,11 +122,8 @@ class ENEMAnalyzer:
         # Categorizar status de trabalho
         df = self.categorize_work_status(uf_data)
         
-        # Selecionar colunas de notas
-        note_columns = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-        
         # Verificar quais colunas de notas existem
-        available_note_columns = [col for col in note_columns if col in df.columns]
+        available_note_columns = [col for col in NOTE_COLUMNS if col in df.columns]
         
         if not available_note_columns:
             print("❌ Nenhuma coluna de nota encontrada")
@@ -100,30 +131,46 @@ class ENEMAnalyzer:
         
         # Calcular nota geral
         df['NOTA_GERAL'] = df[available_note_columns].mean(axis=1)
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in df.columns else []
         
         # Analisar relação entre trabalho dos pais e notas
         results = {}
         
-        for parent_col in ['Q002_STATUS', 'Q003_STATUS']:
-            if parent_col not in df.columns:
-                continue
-            
-            # Filtrar dados válidos
-            valid_data = df[[parent_col, 'NOTA_GERAL'] + available_note_columns].dropna()
-            
-            if len(valid_data) == 0:
-                continue
-            
-            # Calcular médias por categoria de trabalho
-            parent_work_stats = valid_data.groupby(parent_col).agg({
-                'NOTA_GERAL': ['mean', 'std', 'count']
-            }).round(2)
-            
-            results[parent_col] = parent_work_stats
+        with span('aggregate', ano=year, uf=uf) as s:
+            for parent_col in ['Q002_STATUS', 'Q003_STATUS']:
+                if parent_col not in df.columns:
+                    continue
+
+                # Filtrar dados válidos
+                valid_data = df[[parent_col, 'NOTA_GERAL'] + available_note_columns + weight_columns].dropna()
+
+                if len(valid_data) == 0:
+                    continue
+
+                # Calcular médias por categoria de trabalho
+                parent_work_stats = grouped_grade_stats(valid_data, parent_col)
+
+                if quantiles:
+                    sketch = GroupedQuantileSketch([parent_col], ['NOTA_GERAL']).update(valid_data)
+                    parent_work_stats = parent_work_stats.join(sketch.quantile_table())
+
+                results[parent_col] = parent_work_stats
+
+            s.add(linhas=len(df))
         
         return results, df
     
-    def analyze_income_vs_grades(self, year: int, uf: str) -> Dict:
+    def analyze_income_vs_grades(self, year: int, uf: str, quantiles: bool = False,
+                                 method: str = 'pearson') -> Dict:
+        """
+        Correlação renda x notas e estatísticas por faixa de renda.
+        method: 'pearson' (padrão), 'spearman' ou 'kendall' (tau-b); os dois últimos
+        tratam a renda como ordinal, com correção para os muitos empates.
+        """
+        if method not in CORRELATION_METHODS:
+            print(f"❌ Método de correlação desconhecido: {method} (opções: {', '.join(CORRELATION_METHODS)})")
+            return {}
+        
         uf_data = self.get_uf_data(year, uf)
         if uf_data is None:
             return {}
@@ -133,18 +180,16 @@ class ENEMAnalyzer:
             print("❌ Coluna de renda (Q006) não encontrada")
             return {}
         
-        # Selecionar colunas de notas
-        note_columns = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-        
         # Verificar quais colunas de notas existem
-        available_note_columns = [col for col in note_columns if col in uf_data.columns]
+        available_note_columns = [col for col in NOTE_COLUMNS if col in uf_data.columns]
         
         if not available_note_columns:
             print("❌ Nenhuma coluna de nota encontrada")
             return {}
         
         # Filtrar dados válidos
-        valid_data = uf_data[['Q006'] + available_note_columns].dropna()
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in uf_data.columns else []
+        valid_data = uf_data[['Q006'] + available_note_columns + weight_columns].dropna()
         
         if len(valid_data) == 0:
             print("❌ Nenhum dado válido após filtragem")
@@ -155,25 +200,297 @@ class ENEMAnalyzer:
         
         # Calcular correlação entre renda e notas
         # Primeiro, converter renda para valores numéricos (as categorias são A, B, C, ...)
-        income_map = {
-            'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
-            'I': 9, 'J': 10, 'K': 11, 'L': 12, 'M': 13, 'N': 14, 'O': 15, 'P': 16,
-            'Q': 17
-        }
+        valid_data['RENDA_NUM'] = valid_data['Q006'].map(INCOME_MAP)
+        
+        with span('aggregate', ano=year, uf=uf) as s:
+            correlations = {}
+            for note_col in available_note_columns + ['NOTA_GERAL']:
+                if method != 'pearson':
+                    weights = valid_data['PESO_AMOSTRAL'] if weight_columns else None
+                    correlation = correlate(valid_data['RENDA_NUM'], valid_data[note_col], method, weights)
+                elif weight_columns:
+                    correlation = weighted_corr(valid_data['RENDA_NUM'], valid_data[note_col], valid_data['PESO_AMOSTRAL'])
+                else:
+                    correlation = valid_data['RENDA_NUM'].corr(valid_data[note_col])
+                correlations[note_col] = correlation
+
+            # Calcular médias por faixa de renda
+            income_stats = grouped_grade_stats(valid_data, 'Q006')
+
+            # Percentis (p10/p25/p50/p75/p90) via sketch de quantis
+            if quantiles:
+                sketch = GroupedQuantileSketch(['Q006'], ['NOTA_GERAL']).update(valid_data)
+                income_stats = income_stats.join(sketch.quantile_table())
+
+            s.add(linhas=len(valid_data))
+        
+        return {
+            'correlacoes': correlations,
+            'estatisticas_renda': income_stats
+        }, valid_data
+    
+    def load_panel(self, years: List[int], columns: List[str] = None) -> pd.DataFrame:
+        """
+        Carrega todos os anos como uma única tabela lógica com a chave NU_ANO,
+        lendo apenas as colunas necessárias para as análises em painel
+        """
+        columns = columns or PANEL_COLUMNS + ['PESO_AMOSTRAL']
+        frames = []
         
-        valid_data['RENDA_NUM'] = valid_data['Q006'].map(income_map)
+        for year in years:
+            if year in self.data:
+                df = self.data[year][[col for col in columns if col in self.data[year].columns]].copy()
+            else:
+                parquet_path = f'{self.data_dir}/microdados_enem_{year}.parquet'
+                if not os.path.exists(parquet_path):
+                    print(f"⚠️  Arquivo não encontrado para {year}")
+                    continue
+                try:
+                    with span('load', ano=year) as s:
+                        available = set(pq.read_schema(parquet_path).names)
+                        df = pd.read_parquet(parquet_path, columns=[col for col in columns if col in available])
+                        s.add(linhas=len(df), bytes=os.path.getsize(parquet_path))
+                except Exception as e:
+                    print(f"❌ Erro ao carregar {year}: {e}")
+                    continue
+            
+            df['NU_ANO'] = np.int16(year)
+            frames.append(df)
+            print(f"✅ {year} adicionado ao painel: {len(df)} registros")
+        
+        if not frames:
+            print("❌ Nenhum ano pôde ser adicionado ao painel")
+            self.panel = None
+            return None
         
-        correlations = {}
-        for note_col in available_note_columns + ['NOTA_GERAL']:
-            correlation = valid_data['RENDA_NUM'].corr(valid_data[note_col])
-            correlations[note_col] = correlation
+        panel = pd.concat(frames, ignore_index=True)
         
-        # Calcular médias por faixa de renda
-        income_stats = valid_data.groupby('Q006').agg({
-            'NOTA_GERAL': ['mean', 'std', 'count']
-        }).round(2)
+        # Chaves como categorias: o agrupamento em painel fica bem mais barato
+        for col in ['SG_UF_PROVA', 'Q002', 'Q003', 'Q006']:
+            if col in panel.columns:
+                panel[col] = panel[col].astype('category')
+        
+        self.panel = panel
+        return panel
+    
+    def load_cube(self, cube_path: str = None) -> pd.DataFrame:
+        """Carrega o cubo de agregados gerado por build_aggregate_cube"""
+        cube_path = cube_path or cube_path_for(self.data_dir)
+        self.cube = load_aggregate_cube(cube_path)
+        if self.cube is None:
+            print(f"⚠️  Cubo de agregados não encontrado em {cube_path}")
+        else:
+            print(f"🧊 Cubo carregado: {len(self.cube)} células, anos {sorted(self.cube['NU_ANO'].unique().tolist())}")
+        return self.cube
+    
+    def cube_moments(self, years: List[int] = None, uf: str = None) -> pd.DataFrame:
+        """Momentos ano x códigos do questionário lidos do cubo (None se o cubo não cobre os anos)"""
+        if self.cube is None:
+            return None
+        
+        cube_years = set(self.cube['NU_ANO'].unique().tolist())
+        years = list(years) if years is not None else sorted(cube_years)
+        if not set(years) <= cube_years:
+            return None
+        
+        cells = self.cube[self.cube['NU_ANO'].isin(years)]
+        if uf is not None:
+            cells = cells[cells['SG_UF_PROVA'] == uf]
+        
+        return derive_predictors(merge_moments([cells.drop(columns=['SG_UF_PROVA'])], PANEL_KEYS))
+    
+    def panel_moments(self, uf: str = None, years: List[int] = None) -> pd.DataFrame:
+        """
+        Agrega o painel (ano x códigos do questionário) em uma única passada.
+        Se o cubo de agregados cobre os anos pedidos, responde direto do cubo.
+        """
+        if years is None and self.panel is not None:
+            years = sorted(self.panel['NU_ANO'].unique().tolist())
+        
+        moments = self.cube_moments(years, uf)
+        if moments is not None:
+            return moments
+        
+        if self.panel is None:
+            if years is None:
+                print("❌ Painel não carregado (use load_panel ou load_cube)")
+                return None
+            # Sem painel em memória, o backend agrega direto dos Parquet
+            with span('aggregate', uf=uf):
+                moments = self.backend.grade_moments(years, self.data_dir, PANEL_KEYS[1:], uf)
+            return derive_predictors(moments) if moments is not None else None
+        
+        df = self.panel
+        if years is not None:
+            df = df[df['NU_ANO'].isin(years)]
+        if uf is not None:
+            if 'SG_UF_PROVA' not in df.columns:
+                print("❌ Coluna SG_UF_PROVA não encontrada no painel")
+                return None
+            df = df[df['SG_UF_PROVA'] == uf]
+        
+        with span('aggregate', uf=uf) as s:
+            moments = derive_predictors(grade_moments(df, PANEL_KEYS))
+            s.add(linhas=len(df))
+        return moments
+    
+    def analyze_panel(self, uf: str = None, by='Q006', predictor: str = 'RENDA_NUM',
+                      years: List[int] = None, quantiles: bool = False) -> Dict:
+        """
+        Estatísticas ano x categoria e tendência das correlações ao longo dos anos,
+        calculadas a partir de um único agrupamento do painel (ou do cubo).
+        by: 'Q006', 'Q002_STATUS', 'Q003_STATUS', 'EDUCACAO_PAIS' (ou lista delas)
+        predictor: 'RENDA_NUM' ou 'EDUCACAO_PAIS'
+        """
+        moments = self.panel_moments(uf, years)
+        if moments is None or len(moments) == 0:
+            return {}
+        
+        categories = [by] if isinstance(by, str) else list(by)
+        missing = [col for col in categories + [predictor] if col not in moments.columns]
+        if missing:
+            print(f"❌ Colunas necessárias não disponíveis no painel: {missing}")
+            return {}
+        
+        stats = {col: stats_from_moments(moments, ['NU_ANO', col]) for col in categories}
+        if quantiles:
+            # Todas as categorias saem da mesma passada pelos dados
+            panel_years = years or sorted(moments['NU_ANO'].unique().tolist())
+            sketches = self.grade_sketches([['NU_ANO', col] for col in categories], panel_years, uf)
+            for col in categories:
+                percentiles = sketches[('NU_ANO', col)].quantile_table(columns=['NOTA_GERAL'])
+                if len(percentiles) > 0:
+                    stats[col] = stats[col].join(percentiles)
+        correlations = correlations_from_moments(moments, predictor, by=['NU_ANO'])
         
         return {
+            'estatisticas': stats[by] if isinstance(by, str) else stats,
             'correlacoes': correlations,
-            'estatisticas_renda': income_stats
-        }, valid_data
\ No newline at end of file
+            'variacao_correlacoes': correlations.diff(),
+        }
+    
+    def income_vs_grades_from_cube(self, year: int, uf: str) -> Dict:
+        """
+        Mesmo resultado de analyze_income_vs_grades, respondido pelo cubo. Os dois filtram a
+        UF de prova (SG_UF_PROVA); aqui a UF precisa ser a sigla.
+        """
+        moments = self.cube_moments([year], uf)
+        if moments is None or len(moments) == 0:
+            print(f"❌ Cubo não disponível para {uf} ({year})")
+            return {}
+        
+        correlations = correlations_from_moments(moments, 'RENDA_NUM').iloc[0].to_dict()
+        
+        return {
+            'correlacoes': correlations,
+            'estatisticas_renda': stats_from_moments(moments, ['Q006'])
+        }
+    
+    def work_status_vs_grades_from_cube(self, year: int, uf: str) -> Dict:
+        """
+        Mesmo resultado de analyze_work_status_vs_grades, respondido pelo cubo (mesma UF de
+        prova, SG_UF_PROVA, informada pela sigla)
+        """
+        moments = self.cube_moments([year], uf)
+        if moments is None or len(moments) == 0:
+            print(f"❌ Cubo não disponível para {uf} ({year})")
+            return {}
+        
+        return {parent_col: stats_from_moments(moments, [parent_col])
+                for parent_col in ['Q002_STATUS', 'Q003_STATUS'] if parent_col in moments.columns}
+    
+    def regress_grades(self, predictors: List[str] = ('RENDA_NUM', 'EDUCACAO_PAIS'), years: List[int] = None,
+                       uf: str = None, fixed_effects: List[str] = DEFAULT_FIXED_EFFECTS,
+                       columns: List[str] = None) -> Dict:
+        """
+        Regressão (MQO) de cada nota nos preditores do questionário, com efeitos fixos
+        de UF e ano e erros padrão robustos HC1.
+        predictors: numéricos entram como ordinais (RENDA_NUM, EDUCACAO_PAIS, Q002_CAT);
+        de texto viram one-hot (Q006, Q002_STATUS, Q003_STATUS), com o primeiro nível
+        como referência.
+        As equações normais vêm do cubo, do painel em memória ou de uma passada em lotes
+        pelos Parquet, nessa ordem de preferência.
+        Retorna {'coeficientes': {nota: tabela}, 'r2': {...}, 'n_obs': n, 'n_parametros': p}
+        """
+        panel_years = set() if self.panel is None else set(self.panel['NU_ANO'].unique().tolist())
+        cube_years = set() if self.cube is None else set(self.cube['NU_ANO'].unique().tolist())
+        if years is None:
+            years = sorted(cube_years or panel_years) or self.loaded_years
+        if not years:
+            print("❌ Nenhum ano informado ou carregado para a regressão")
+            return {}
+        
+        # O cubo não tem os momentos com pesos ao quadrado do HC1: só serve para dados completos
+        if cube_years and set(years) <= cube_years and not self.use_sample:
+            cells = self.cube[self.cube['NU_ANO'].isin(years)]
+            if uf is not None:
+                cells = cells[cells['SG_UF_PROVA'] == uf]
+            cells = cells_from_moments(cells)
+        elif panel_years and set(years) <= panel_years:
+            df = self.panel[self.panel['NU_ANO'].isin(years)]
+            if uf is not None:
+                df = df[df['SG_UF_PROVA'] == uf]
+            with span('aggregate', uf=uf) as s:
+                cells = regression_moments(df, CUBE_KEYS)
+                s.add(linhas=len(df))
+        else:
+            cells = stream_regression_moments(years, self.data_dir, uf)
+        
+        if cells is None or len(cells) == 0:
+            print("❌ Nenhum dado disponível para a regressão")
+            return {}
+        
+        return regress_from_cells(cells, list(predictors), list(fixed_effects), columns)
+    
+    def grade_sketch(self, by: List[str], years: List[int] = None, uf: str = None) -> GroupedQuantileSketch:
+        """
+        Histogramas das notas por grupo (GroupedQuantileSketch). Usa o painel em memória
+        quando ele cobre os anos; caso contrário, faz uma única passada em lotes pelos Parquet.
+        """
+        return self.grade_sketches([by], years, uf)[tuple(by)]
+    
+    def grade_sketches(self, groupings: List[List[str]], years: List[int] = None,
+                       uf: str = None) -> Dict[tuple, GroupedQuantileSketch]:
+        """Vários agrupamentos de grade_sketch com uma só leitura (painel ou Parquet): {tupla: sketch}"""
+        panel_years = set() if self.panel is None else set(self.panel['NU_ANO'].unique().tolist())
+        if years is None:
+            years = sorted(panel_years) if panel_years else self.loaded_years
+        
+        if set(years) <= panel_years and panel_years:
+            df = self.panel[self.panel['NU_ANO'].isin(years)]
+            if uf is not None:
+                df = df[df['SG_UF_PROVA'] == uf]
+            notes = [col for col in NOTE_COLUMNS if col in df.columns]
+            df = df.dropna(subset=notes).copy()
+            df['NOTA_GERAL'] = df[notes].mean(axis=1)
+            df = derive_predictors(df)
+            return {tuple(by): GroupedQuantileSketch(by).update(df) for by in groupings}
+        
+        return stream_grade_quantile_groupings(years, groupings, data_dir=self.data_dir, uf=uf)
+    
+    def grade_quantiles(self, by: List[str], years: List[int] = None, uf: str = None,
+                        columns: List[str] = None, qs=DEFAULT_QUANTILES) -> pd.DataFrame:
+        """Percentis das notas por grupo, estimados pelos histogramas de grade_sketch"""
+        return self.grade_sketch(by, years, uf).quantile_table(qs, columns=columns)
+    
+    def plot_grade_distribution(self, by='Q006', years: List[int] = None, uf: str = None,
+                                column: str = 'NOTA_GERAL', heatmap: bool = False, path: str = None):
+        """
+        Distribuição da nota por categoria (ex: faixa de renda Q006) desenhada a partir
+        dos histogramas agregados, sem passar as linhas dos participantes ao matplotlib.
+        heatmap=True desenha o histograma 2D categoria x faixa de nota.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        sketch = self.grade_sketch(by, years, uf)
+        title = f"{plotting.AREA_NAMES.get(column, column)} por {', '.join(by)}" + (f" - {uf}" if uf else '')
+        if heatmap:
+            return plotting.plot_grade_heatmap(sketch, column, title=title, path=path)
+        return plotting.plot_grade_histograms(sketch, column, title=title, path=path)
+    
+    def plot_correlations(self, correlations_by_year, path: str = None):
+        """Correlações por ano ({ano: {area: corr}} ou a tabela 'correlacoes' de analyze_panel)"""
+        return plotting.plot_correlations(correlations_by_year, path=path)
+    
+    def plot_panel_stats(self, stats: pd.DataFrame, path: str = None):
+        """Média da nota geral por categoria ao longo dos anos ('estatisticas' de analyze_panel)"""
+        return plotting.plot_group_means(stats, path=path)
@@ -0,0 +1,179 @@
+# enem_lib/archive_cache.py
+"""
+Cache de arquivos ZIP endereçado por conteúdo (SHA-256), pensado para uma pasta
+compartilhada entre execuções e máquinas (ex: NFS):
+
+    {cache_dir}/objetos/ab/abcdef...zip        conteúdo, nomeado pelo próprio hash
+    {cache_dir}/indice/microdados_enem_2019.zip  JSON com o hash, tamanho/mtime do objeto
+                                                 e a origem (URL ou caminho, ETag, tamanho)
+
+Objetos e índices são gravados em arquivos temporários na mesma pasta e publicados
+com os.replace (atômico), então leitores concorrentes nunca veem arquivos pela metade.
+Na leitura, o hash do objeto é sempre recalculado e um objeto corrompido é descartado.
+Com trust_stat=True (opt-in, para caches em que só esta ferramenta escreve), o hash só
+é recalculado quando o tamanho ou o mtime diferem dos registrados no índice; uma
+corrupção que preserve o mtime, ou um objeto copiado de outra máquina com o mesmo
+tamanho e mtime, passa despercebida nesse modo.
+
+Se a origem mudar (outra ETag ou outro tamanho na mesma URL/pasta), is_stale aponta a
+entrada como desatualizada e o arquivo é baixado de novo. Para forçar um novo download
+manualmente, basta apagar {cache_dir}/indice/<nome>.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+CACHE_ENV = 'ENEM_CACHE_DIR'
+CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Pasta do cache vinda de ENEM_CACHE_DIR (None = cache desligado)"""
+    return os.environ.get(CACHE_ENV) or None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArchiveCache:
+    def __init__(self, cache_dir: str, trust_stat: bool = False):
+        self.cache_dir = cache_dir
+        # Opt-in: confiar no tamanho/mtime registrados e não reler o objeto a cada consulta
+        self.trust_stat = trust_stat
+        self.objects_dir = os.path.join(cache_dir, 'objetos')
+        self.index_dir = os.path.join(cache_dir, 'indice')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], f'{sha256}.zip')
+
+    def _publish(self, tmp_path: str, final_path: str):
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+
+    def entry(self, name: str) -> dict:
+        """Registro do índice para o nome (hash, stat do objeto, origem), ou None"""
+        try:
+            with open(os.path.join(self.index_dir, name), encoding='utf-8') as f:
+                content = f.read().strip()
+        except OSError:
+            return None
+        if not content.startswith('{'):
+            # Índice antigo: só o hash
+            return {'sha256': content}
+        try:
+            return json.loads(content)
+        except ValueError:
+            return None
+
+    def lookup(self, name: str, source_version: dict = None) -> str:
+        """
+        Caminho do arquivo em cache para o nome (ex: microdados_enem_2019.zip), ou None.
+        O conteúdo é conferido pelo SHA-256 (ver trust_stat). source_version, se informado,
+        descarta a entrada quando a origem mudou (ver is_stale).
+        """
+        entry = self.entry(name)
+        if entry is None:
+            return None
+        if source_version is not None and self.is_stale(name, source_version):
+            return None
+
+        sha256 = entry['sha256']
+        path = self.object_path(sha256)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        # Só com trust_stat: mesmo tamanho e mtime do que foi verificado antes, não relê o arquivo
+        if self.trust_stat and (stat.st_size, stat.st_mtime_ns) == (entry.get('tamanho'), entry.get('mtime_ns')):
+            return path
+
+        if file_sha256(path) != sha256:
+            print(f"⚠️  Objeto corrompido no cache ({sha256[:12]}...), descartando")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        if (stat.st_size, stat.st_mtime_ns) != (entry.get('tamanho'), entry.get('mtime_ns')):
+            self._write_index(name, sha256, {key: value for key, value in entry.items()
+                                             if key not in ('sha256', 'tamanho', 'mtime_ns')})
+        return path
+
+    def is_stale(self, name: str, source_version: dict) -> bool:
+        """
+        True se a entrada veio da mesma origem e a ETag, o tamanho ou o mtime mudaram.
+        source_version=None (origem desconhecida ou sem resposta) não invalida a entrada.
+        """
+        entry = self.entry(name)
+        if entry is None or source_version is None or not _is_stale(entry, source_version):
+            return False
+        print(f"🔁 {name} mudou na origem ({entry.get('origem')}), ignorando o cache")
+        return True
+
+    def store_chunks(self, name: str, chunks, expected_size: int = None, source_version: dict = None) -> str:
+        """
+        Grava no cache um conteúdo recebido em blocos (ex: download HTTP), calculando
+        o hash durante a escrita, e registra o nome no índice. Devolve o caminho do objeto.
+        Com expected_size, um conteúdo truncado gera IOError e não entra no cache.
+        source_version (origem, etag, tamanho_origem, mtime_origem) fica no índice.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.parcial')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            if expected_size is not None and size != expected_size:
+                raise IOError(f"conteúdo incompleto: {size} de {expected_size} bytes")
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256)
+            if os.path.exists(path):
+                # Mesmo conteúdo já gravado por outra execução
+                os.remove(tmp_path)
+            else:
+                self._publish(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._write_index(name, sha256, source_version)
+        return path
+
+    def store_file(self, name: str, source_path: str, source_version: dict = None) -> str:
+        """Copia um arquivo local (ex: espelho em pasta) para o cache"""
+        with open(source_path, 'rb') as f:
+            return self.store_chunks(name, iter(lambda: f.read(CHUNK_SIZE), b''),
+                                     expected_size=os.path.getsize(source_path), source_version=source_version)
+
+    def _write_index(self, name: str, sha256: str, source_version: dict = None):
+        stat = os.stat(self.object_path(sha256))
+        record = {'sha256': sha256, 'tamanho': stat.st_size, 'mtime_ns': stat.st_mtime_ns, **(source_version or {})}
+        fd, tmp_path = tempfile.mkstemp(dir=self.index_dir, suffix='.parcial')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+            f.write('\n')
+        self._publish(tmp_path, os.path.join(self.index_dir, name))
+
+
+def _is_stale(entry: dict, source_version: dict) -> bool:
+    """A entrada veio da mesma origem e algum identificador de versão mudou"""
+    if entry.get('origem') != source_version.get('origem'):
+        return False
+    return any(entry.get(key) is not None and source_version.get(key) is not None
+               and entry[key] != source_version[key]
+               for key in ('etag', 'tamanho_origem', 'mtime_origem'))
@@ -0,0 +1,239 @@
+# enem_lib/backends.py
+"""
+Motores de execução usados pelos analisadores quando os dados não estão em memória.
+
+Cada backend oferece duas operações sobre os Parquet de um diretório:
+  read(year, data_dir, columns, filters)       -> DataFrame já filtrado e só com as colunas pedidas
+  grade_moments(years, data_dir, keys, uf)     -> momentos por NU_ANO x chaves, no formato de
+                                                  aggregates.grade_moments (N, SUM_*, SQ_*)
+
+'pandas' (padrão) usa pyarrow com filtros e projeção; 'duckdb' e 'polars' montam um plano
+preguiçoso e multithread em que o próprio motor faz a poda de colunas e o pushdown do filtro
+de UF. DuckDB e Polars são opcionais: sem eles instalados, get_backend volta para pandas.
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Tuple
+import os
+
+from .aggregates import NOTE_COLUMNS, grade_moments
+
+UF_COLUMN = 'SG_UF_PROVA'
+# UF de prova primeiro (a mesma chave do cubo e dos painéis); as demais colunas de UF
+# (residência, escola, ...) só entram se a UF não aparecer nelas
+PREFERRED_UF_COLUMNS = (UF_COLUMN, 'CO_UF_PROVA')
+WEIGHT_COLUMN = 'PESO_AMOSTRAL'
+
+
+def _quote(col: str) -> str:
+    return f'"{col}"'
+
+
+def parquet_path_for(year: int, data_dir: str) -> str:
+    return f'{data_dir}/microdados_enem_{year}.parquet'
+
+
+def _existing_years(years: List[int], data_dir: str) -> List[int]:
+    existing = []
+    for year in years:
+        if os.path.exists(parquet_path_for(year, data_dir)):
+            existing.append(year)
+        else:
+            print(f"⚠️  Arquivo não encontrado para {year}")
+    return existing
+
+
+def uf_filters(text_columns: Dict[str, bool], uf) -> List[Tuple[str, object]]:
+    """
+    Filtros (coluna, valor) a tentar, em ordem, para achar as linhas de uma UF: SG_UF_PROVA e
+    CO_UF_PROVA primeiro, depois as outras colunas de UF na ordem do arquivo.
+    text_columns: nome -> True se a coluna é texto. Colunas de UF em texto (SG_UF_*) usam
+    igualdade exata com a sigla; colunas numéricas (CO_UF_*) só entram quando a UF é um
+    código (ex: '25'). Usado igualmente em memória e nas leituras dos backends.
+    """
+    uf = str(uf).strip()
+    preferred = [col for col in PREFERRED_UF_COLUMNS if col in text_columns]
+    ordered = preferred + [col for col in text_columns if col not in preferred]
+    filters = []
+    for col in ordered:
+        is_text = text_columns[col]
+        if 'UF' not in col and 'ESTADO' not in col:
+            continue
+        if is_text:
+            filters.append((col, uf))
+        elif uf.isdigit():
+            filters.append((col, int(uf)))
+    return filters
+
+
+def frame_text_columns(df: pd.DataFrame) -> Dict[str, bool]:
+    return {col: df[col].dtype == object or df[col].dtype.name in ('string', 'category') for col in df.columns}
+
+
+def parquet_text_columns(parquet_path: str) -> Dict[str, bool]:
+    def is_text(arrow_type) -> bool:
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+    return {field.name: is_text(field.type) for field in pq.read_schema(parquet_path)}
+
+
+def _moment_columns(available: set, keys: List[str]):
+    """Chaves, notas e peso presentes no arquivo"""
+    return ([key for key in keys if key in available],
+            [col for col in NOTE_COLUMNS if col in available],
+            WEIGHT_COLUMN in available)
+
+
+class PandasBackend:
+    name = 'pandas'
+
+    def read(self, year: int, data_dir: str, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        parquet_path = parquet_path_for(year, data_dir)
+        if not os.path.exists(parquet_path):
+            return None
+        available = pq.read_schema(parquet_path).names
+        columns = available if columns is None else [col for col in dict.fromkeys(columns) if col in available]
+        filters = [(col, '==', value) for col, value in (filters or {}).items()]
+        return pd.read_parquet(parquet_path, columns=columns, filters=filters or None)
+
+    def grade_moments(self, years: List[int], data_dir: str, keys: List[str], uf: str = None) -> pd.DataFrame:
+        frames = []
+        for year in _existing_years(years, data_dir):
+            available = set(pq.read_schema(parquet_path_for(year, data_dir)).names)
+            key_cols, notes, weighted = _moment_columns(available, keys)
+            df = self.read(year, data_dir, key_cols + notes + [WEIGHT_COLUMN] * weighted,
+                           {UF_COLUMN: uf} if uf is not None else None)
+            moments = grade_moments(df, key_cols)
+            moments.insert(0, 'NU_ANO', year)
+            frames.append(moments)
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+
+class DuckDBBackend:
+    name = 'duckdb'
+
+    def __init__(self):
+        import duckdb
+        self.connection = duckdb.connect()
+
+    @staticmethod
+    def _source(year: int, data_dir: str) -> str:
+        return "read_parquet('{}')".format(parquet_path_for(year, data_dir).replace("'", "''"))
+
+    def read(self, year: int, data_dir: str, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        parquet_path = parquet_path_for(year, data_dir)
+        if not os.path.exists(parquet_path):
+            return None
+        available = pq.read_schema(parquet_path).names
+        columns = available if columns is None else [col for col in dict.fromkeys(columns) if col in available]
+        filters = filters or {}
+
+        query = f"SELECT {', '.join(map(_quote, columns))} FROM {self._source(year, data_dir)}"
+        if filters:
+            query += " WHERE " + " AND ".join(f"{_quote(col)} = ?" for col in filters)
+        return self.connection.execute(query, list(filters.values())).df()
+
+    def grade_moments(self, years: List[int], data_dir: str, keys: List[str], uf: str = None) -> pd.DataFrame:
+        years = _existing_years(years, data_dir)
+        if not years:
+            return None
+
+        # Mesmas colunas em todos os anos, para o UNION ALL
+        available = set.intersection(*(set(pq.read_schema(parquet_path_for(year, data_dir)).names) for year in years))
+        key_cols, notes, weighted = _moment_columns(available, keys)
+        quoted_keys = [_quote(key) for key in key_cols]
+        quoted_notes = [_quote(col) for col in notes]
+        weight = _quote(WEIGHT_COLUMN) if weighted else '1.0'
+        general = f"({' + '.join(quoted_notes)}) / {len(notes)}"
+        valid = ' AND '.join(f"{col} IS NOT NULL AND NOT isnan({col})" for col in quoted_notes)
+        uf_filter = f" AND {_quote(UF_COLUMN)} = $uf" if uf is not None else ''
+
+        scans = ' UNION ALL '.join(
+            f"SELECT {year} AS NU_ANO, {', '.join(quoted_keys + quoted_notes)}, "
+            f"{general} AS NOTA_GERAL, CAST({weight} AS DOUBLE) AS W "
+            f"FROM {self._source(year, data_dir)} WHERE {valid}{uf_filter}"
+            for year in years
+        )
+        sums = ['SUM(W) AS N']
+        for col in notes + ['NOTA_GERAL']:
+            sums.append(f"SUM(W * {_quote(col)}) AS {_quote('SUM_' + col)}")
+            sums.append(f"SUM(W * {_quote(col)} * {_quote(col)}) AS {_quote('SQ_' + col)}")
+
+        group = ', '.join(['NU_ANO'] + quoted_keys)
+        query = f"SELECT {group}, {', '.join(sums)} FROM ({scans}) GROUP BY {group} ORDER BY {group}"
+        return self.connection.execute(query, {'uf': uf} if uf is not None else {}).df()
+
+
+class PolarsBackend:
+    name = 'polars'
+
+    def __init__(self):
+        import polars
+        self.pl = polars
+
+    def _scan(self, year: int, data_dir: str, columns: List[str], filters: Dict):
+        pl = self.pl
+        frame = pl.scan_parquet(parquet_path_for(year, data_dir))
+        for col, value in (filters or {}).items():
+            frame = frame.filter(pl.col(col) == value)
+        return frame.select(columns)
+
+    def read(self, year: int, data_dir: str, columns: List[str] = None, filters: Dict = None) -> pd.DataFrame:
+        parquet_path = parquet_path_for(year, data_dir)
+        if not os.path.exists(parquet_path):
+            return None
+        available = pq.read_schema(parquet_path).names
+        columns = available if columns is None else [col for col in dict.fromkeys(columns) if col in available]
+        return self._scan(year, data_dir, columns, filters).collect().to_pandas()
+
+    def grade_moments(self, years: List[int], data_dir: str, keys: List[str], uf: str = None) -> pd.DataFrame:
+        pl = self.pl
+        years = _existing_years(years, data_dir)
+        if not years:
+            return None
+
+        available = set.intersection(*(set(pq.read_schema(parquet_path_for(year, data_dir)).names) for year in years))
+        key_cols, notes, weighted = _moment_columns(available, keys)
+        filters = {UF_COLUMN: uf} if uf is not None else None
+
+        frames = []
+        for year in years:
+            frame = self._scan(year, data_dir, key_cols + notes + [WEIGHT_COLUMN] * weighted, filters)
+            frame = frame.filter(pl.all_horizontal([pl.col(col).is_not_null() & pl.col(col).is_not_nan()
+                                                    for col in notes]))
+            frames.append(frame.with_columns(
+                pl.lit(year).alias('NU_ANO'),
+                pl.mean_horizontal(notes).alias('NOTA_GERAL'),
+                (pl.col(WEIGHT_COLUMN) if weighted else pl.lit(1.0)).cast(pl.Float64).alias('W'),
+            ))
+
+        sums = [pl.col('W').sum().alias('N')]
+        for col in notes + ['NOTA_GERAL']:
+            sums.append((pl.col('W') * pl.col(col)).sum().alias(f'SUM_{col}'))
+            sums.append((pl.col('W') * pl.col(col) ** 2).sum().alias(f'SQ_{col}'))
+
+        group = ['NU_ANO'] + key_cols
+        return pl.concat(frames).group_by(group).agg(sums).sort(group, nulls_last=True).collect().to_pandas()
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'duckdb': DuckDBBackend,
+    'polars': PolarsBackend,
+}
+
+
+def get_backend(backend='pandas'):
+    """Instancia o backend pelo nome (ou devolve a instância recebida); sem a biblioteca, usa pandas"""
+    if not isinstance(backend, str):
+        return backend
+    if backend not in BACKENDS:
+        print(f"❌ Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)}); usando pandas")
+        return PandasBackend()
+    try:
+        return BACKENDS[backend]()
+    except ImportError:
+        print(f"⚠️  {backend} não está instalado (pip install {backend}); usando pandas")
+        return PandasBackend()
@@ -0,0 +1,101 @@
+# enem_lib/cube.py
+import pandas as pd
+import pyarrow.parquet as pq
+from typing import List
+import os
+
+from .aggregates import NOTE_COLUMNS, grade_moments, merge_moments
+from .instrumentation import span
+
+# Chaves do cubo: cada célula guarda contagem, soma e soma dos quadrados de cada nota
+CUBE_KEYS = ['NU_ANO', 'SG_UF_PROVA', 'Q002', 'Q003', 'Q006']
+CUBE_FILE = 'cubo_agregado.parquet'
+# Subpasta própria: na raiz de data_dir ficam só os microdados_enem_<ano>.parquet
+CUBE_DIR = 'agregados'
+
+
+def cube_path_for(data_dir: str = 'dados_enem') -> str:
+    return os.path.join(data_dir, CUBE_DIR, CUBE_FILE)
+
+
+def year_moments(year: int, data_dir: str = 'dados_enem', batch_size: int = 500000) -> pd.DataFrame:
+    """Agrega um ano do Parquet em células do cubo, lendo em lotes (memória constante)"""
+    parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+    if not os.path.exists(parquet_path):
+        print(f"⚠️  Arquivo não encontrado para {year}")
+        return None
+
+    parquet_file = pq.ParquetFile(parquet_path)
+    available = set(parquet_file.schema_arrow.names)
+    columns = [col for col in CUBE_KEYS[1:] + NOTE_COLUMNS + ['PESO_AMOSTRAL'] if col in available]
+    keys = [key for key in CUBE_KEYS[1:] if key in available]
+
+    with span('aggregate', ano=year) as s:
+        partial = []
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            partial.append(grade_moments(batch.to_pandas(), keys))
+            s.add(linhas=batch.num_rows)
+            # Combina os parciais periodicamente para não acumular tabelas
+            if len(partial) >= 16:
+                partial = [merge_moments(partial, keys)]
+
+        moments = merge_moments(partial, keys)
+    if len(moments) == 0:
+        return moments
+
+    moments.insert(0, 'NU_ANO', year)
+    return moments
+
+
+def build_aggregate_cube(years: List[int], data_dir: str = 'dados_enem', cube_path: str = None) -> pd.DataFrame:
+    """
+    Materializa (ou atualiza) o cubo de agregados para os anos informados.
+    Células de anos que já estavam no cubo e não foram recalculados são mantidas.
+    """
+    cube_path = cube_path or cube_path_for(data_dir)
+
+    frames = []
+    for year in years:
+        print(f"🧊 Agregando {year} no cubo...")
+        frames.append(year_moments(year, data_dir))
+
+    return save_aggregate_cube(frames, cube_path)
+
+
+def save_aggregate_cube(frames: List[pd.DataFrame], cube_path: str) -> pd.DataFrame:
+    """
+    Grava no cubo os momentos já calculados por year_moments (ex: em outros processos).
+    Os anos presentes em frames substituem as células que já existiam para eles.
+    """
+    frames = [moments for moments in frames if moments is not None and len(moments) > 0]
+    rebuilt = sorted({year for moments in frames for year in moments['NU_ANO'].unique().tolist()})
+
+    if os.path.exists(cube_path):
+        existing = pd.read_parquet(cube_path)
+        frames.insert(0, existing[~existing['NU_ANO'].isin(rebuilt)])
+
+    if not frames:
+        print("❌ Nenhum dado disponível para montar o cubo")
+        return None
+
+    cube = pd.concat(frames, ignore_index=True)
+    cube['NU_ANO'] = cube['NU_ANO'].astype('int16')
+    for key in CUBE_KEYS[1:]:
+        if key in cube.columns:
+            cube[key] = cube[key].astype('string')
+    cube = cube.sort_values([key for key in CUBE_KEYS if key in cube.columns]).reset_index(drop=True)
+
+    os.makedirs(os.path.dirname(cube_path) or '.', exist_ok=True)
+    cube.to_parquet(cube_path, index=False, engine='pyarrow')
+    print(f"✅ Cubo salvo em {cube_path}: {len(cube)} células, anos {sorted(cube['NU_ANO'].unique().tolist())}")
+    return cube
+
+
+def load_aggregate_cube(cube_path: str) -> pd.DataFrame:
+    if not os.path.exists(cube_path):
+        return None
+    cube = pd.read_parquet(cube_path)
+    for key in CUBE_KEYS[1:]:
+        if key in cube.columns:
+            cube[key] = cube[key].astype('category')
+    return cube
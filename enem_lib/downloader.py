@@ -1,17 +1,41 @@
 # enem_lib/downloader.py
 import requests
 import zipfile
-import pandas as pd
 import os
 import tempfile
-from io import BytesIO
 from tqdm import tqdm
 import time
 import shutil
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from .instrumentation import span
+from .archive_cache import ArchiveCache, default_cache_dir
+
+INEP_BASE_URL = 'https://download.inep.gov.br/microdados'
+# Consulta de versão feita após um acerto de cache: curta, para não travar execuções offline
+SOURCE_PROBE_TIMEOUT = 5
+
+
+def _http_version(url: str, response) -> dict:
+    """Identificadores de versão de uma resposta HTTP, gravados no índice do cache"""
+    size = response.headers.get('content-length')
+    return {'origem': url, 'etag': response.headers.get('etag'),
+            'tamanho_origem': int(size) if size and size.isdigit() else None}
+
 
 class ENEMDownloader:
-    def __init__(self, max_retries=5, delay_between_retries=10):
+    def __init__(self, max_retries=5, delay_between_retries=10, output_dir='dados_enem', base_url=INEP_BASE_URL,
+                 mirrors=None, cache_dir=None, trust_cache_stat=False):
         self.max_retries = max_retries
+        self.output_dir = output_dir
+        self.base_url = base_url.rstrip('/')
+        # Fontes tentadas em ordem: espelhos (pasta local, file:// ou outra URL HTTP) e, por último, base_url
+        self.sources = [mirror.rstrip('/') for mirror in (mirrors or [])] + [self.base_url]
+        # Cache endereçado por conteúdo, compartilhável entre máquinas (ENEM_CACHE_DIR por padrão)
+        cache_dir = cache_dir or default_cache_dir()
+        # trust_cache_stat=True pula a releitura do SHA-256 em acertos (ver ArchiveCache)
+        self.cache = ArchiveCache(cache_dir, trust_stat=trust_cache_stat) if cache_dir else None
         self.delay_between_retries = delay_between_retries
         self.session = requests.Session()
         self.session.headers.update({
@@ -67,46 +91,157 @@ class ENEMDownloader:
         temp_dir = tempfile.mkdtemp()
         
         try:
-            url = f'https://download.inep.gov.br/microdados/microdados_enem_{ano}.zip'
-            
-            try:
-                head_response = self.session.head(url, timeout=30, allow_redirects=True)
-                if head_response.status_code != 200:
-                    print(f"❌ Arquivo não disponível para {ano} (status: {head_response.status_code})")
-                    return False
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Erro ao verificar disponibilidade: {str(e)}")
-                return False
-            
-            print(f"📥 Baixando dados do ENEM {ano}...")
-            response = self.session.get(url, stream=True, timeout=120)
-            
-            if response.status_code != 200:
-                print(f"❌ Erro no download: Status {response.status_code}")
-                return False
-            
-            total_size = int(response.headers.get('content-length', 0))
-            if total_size == 0:
-                print("❌ Arquivo vazio ou indisponível")
+            zip_path = self._fetch_archive(ano, temp_dir)
+            if zip_path is None:
                 return False
             
-            print(f"📦 Tamanho do arquivo: {total_size / (1024*1024):.2f} MB")
+            return self.convert_zip_to_parquet(zip_path, ano, temp_dir)
+                
+        except Exception as e:
+            print(f"❌ Erro no processamento: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            return False
             
-            print("📦 Processando arquivo ZIP...")
-            zip_data = BytesIO()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    def _fetch_archive(self, ano: int, temp_dir: str) -> str:
+        """
+        Obtém o ZIP do ano: primeiro no cache, depois em cada fonte na ordem configurada.
+        Devolve o caminho local do arquivo (None se nenhuma fonte o tiver).
+        """
+        file_name = f'microdados_enem_{ano}.zip'
+        
+        cached_path = self.cache.lookup(file_name) if self.cache is not None else None
+        if cached_path is not None:
+            # Só depois de um acerto consulta a origem, em melhor esforço: sem rede (ou sem
+            # resposta em SOURCE_PROBE_TIMEOUT segundos) o cache é usado como está
+            origin = self.cache.entry(file_name).get('origem')
+            if not self.cache.is_stale(file_name, self._source_version(origin, timeout=SOURCE_PROBE_TIMEOUT)):
+                print(f"♻️  {file_name} encontrado no cache ({cached_path})")
+                return cached_path
+        
+        for source in self.sources:
+            if source.startswith(('http://', 'https://')):
+                zip_path = self._download_http(f'{source}/{file_name}', ano, temp_dir)
+            else:
+                zip_path = self._local_source(source, file_name)
             
+            if zip_path is not None:
+                return zip_path
+        
+        return None
+    
+    def _source_version(self, origin: str, timeout: float = 30) -> dict:
+        """
+        Versão atual de um arquivo na origem: ETag e tamanho (HTTP) ou tamanho e mtime
+        (pasta local). None se a origem não for conhecida ou não responder.
+        """
+        if not origin:
+            return None
+        if origin.startswith(('http://', 'https://')):
+            try:
+                response = self.session.head(origin, timeout=timeout, allow_redirects=True)
+            except requests.exceptions.RequestException:
+                return None
+            if response.status_code != 200:
+                return None
+            return _http_version(origin, response)
+        try:
+            stat = os.stat(origin)
+        except OSError:
+            return None
+        return {'origem': origin, 'tamanho_origem': stat.st_size, 'mtime_origem': stat.st_mtime_ns}
+    
+    def _local_source(self, source: str, file_name: str) -> str:
+        """Espelho em pasta local ou file:// (copiado para o cache, se configurado)"""
+        directory = url2pathname(urlparse(source).path) if source.startswith('file://') else source
+        zip_path = os.path.join(directory, file_name)
+        if not os.path.exists(zip_path):
+            print(f"⚠️  {file_name} não encontrado no espelho {source}")
+            return None
+        print(f"📂 Usando {zip_path} do espelho local")
+        if self.cache is not None:
+            try:
+                zip_path = self.cache.store_file(file_name, zip_path, self._source_version(os.path.abspath(zip_path)))
+            except IOError as e:
+                # Sem espaço ou sem permissão no cache: segue lendo direto do espelho
+                print(f"⚠️  Não foi possível copiar {file_name} para o cache: {e}")
+        return zip_path
+    
+    def _download_http(self, url: str, ano: int, temp_dir: str) -> str:
+        """Baixa o ZIP em blocos direto para o disco (no cache, se configurado)"""
+        try:
+            head_response = self.session.head(url, timeout=30, allow_redirects=True)
+            if head_response.status_code != 200:
+                print(f"❌ Arquivo não disponível para {ano} (status: {head_response.status_code})")
+                return None
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Erro ao verificar disponibilidade: {str(e)}")
+            return None
+        
+        print(f"📥 Baixando dados do ENEM {ano}...")
+        try:
+            response = self.session.get(url, stream=True, timeout=120)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Erro no download: {str(e)}")
+            return None
+        
+        if response.status_code != 200:
+            print(f"❌ Erro no download: Status {response.status_code}")
+            return None
+        
+        total_size = int(response.headers.get('content-length', 0))
+        if total_size == 0:
+            print("❌ Arquivo vazio ou indisponível")
+            return None
+        
+        print(f"📦 Tamanho do arquivo: {total_size / (1024*1024):.2f} MB")
+        
+        with span('download', ano=ano) as s:
             with tqdm(total=total_size, unit='B', unit_scale=True, desc=f"Baixando {ano}") as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        zip_data.write(chunk)
+                def chunks():
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
                         pbar.update(len(chunk))
-            
-            print("✅ Download concluído")
-            
+                        yield chunk
+                
+                file_name = os.path.basename(urlparse(url).path)
+                try:
+                    if self.cache is not None:
+                        zip_path = self.cache.store_chunks(file_name, chunks(), expected_size=total_size,
+                                                           source_version=_http_version(url, head_response))
+                    else:
+                        zip_path = os.path.join(temp_dir, file_name)
+                        with open(zip_path, 'wb') as f:
+                            for chunk in chunks():
+                                f.write(chunk)
+                        if os.path.getsize(zip_path) != total_size:
+                            raise IOError(f"conteúdo incompleto: {os.path.getsize(zip_path)} de {total_size} bytes")
+                except (IOError, requests.exceptions.RequestException) as e:
+                    print(f"❌ Erro no download: {str(e)}")
+                    return None
+            s.add(bytes=total_size)
+        
+        print("✅ Download concluído")
+        return zip_path
+    
+    def convert_zip_to_parquet(self, zip_source, ano: int, temp_dir: str = None) -> bool:
+        """
+        Converte o maior CSV de um ZIP de microdados (caminho local ou arquivo em memória)
+        para {output_dir}/microdados_enem_{ano}.parquet
+        """
+        # Importado aqui: só a conversão usa pandas, e quem apenas baixa não paga o import
+        import pandas as pd
+        
+        own_temp_dir = temp_dir is None
+        if own_temp_dir:
+            temp_dir = tempfile.mkdtemp()
+        
+        try:
             print("📂 Extraindo e processando arquivos...")
-            zip_data.seek(0)
             
-            with zipfile.ZipFile(zip_data, 'r') as zip_ref:
+            with zipfile.ZipFile(zip_source, 'r') as zip_ref:
                 csv_files = []
                 for file_name in zip_ref.namelist():
                     if file_name.endswith('.csv'):
@@ -123,8 +258,10 @@ class ENEMDownloader:
                 print(f"📊 Arquivo CSV encontrado: {csv_file} ({csv_files[0][1]/1024/1024:.2f} MB)")
                 
                 csv_temp_path = os.path.join(temp_dir, os.path.basename(csv_file))
-                with zip_ref.open(csv_file) as source, open(csv_temp_path, 'wb') as target:
-                    shutil.copyfileobj(source, target)
+                with span('unzip', ano=ano) as s:
+                    with zip_ref.open(csv_file) as source, open(csv_temp_path, 'wb') as target:
+                        shutil.copyfileobj(source, target)
+                    s.add(bytes=csv_files[0][1])
                 
                 print("🔄 Lendo e convertendo dados...")
                 
@@ -139,8 +276,8 @@ class ENEMDownloader:
                     has_header = any(word in sample.upper() for word in 
                                 ['NU_INSCRICAO', 'TP_FAIXA_ETARIA', 'TP_SEXO', 'CO_MUNICIPIO'])
                 
-                os.makedirs('dados_enem', exist_ok=True)
-                parquet_path = f'dados_enem/microdados_enem_{ano}.parquet'
+                os.makedirs(self.output_dir, exist_ok=True)
+                parquet_path = f'{self.output_dir}/microdados_enem_{ano}.parquet'
                 
                 if os.path.exists(parquet_path):
                     os.remove(parquet_path)
@@ -150,36 +287,42 @@ class ENEMDownloader:
                 chunk_size = 50000
                 total_rows = 0
                 
-                print("📊 Contando número total de linhas...")
-                with open(csv_temp_path, 'r', encoding='latin-1') as f:
-                    total_csv_lines = sum(1 for _ in f) - (1 if has_header else 0)
-                
-                print(f"📈 Total de linhas no CSV: {total_csv_lines}")
-                
-                chunks = []
-                for i, chunk in enumerate(pd.read_csv(csv_temp_path, 
-                                                    encoding='latin-1', 
-                                                    sep=separator,
-                                                    chunksize=chunk_size,
-                                                    low_memory=False,
-                                                    header=0 if has_header else None)):
-                    chunks.append(chunk)
-                    total_rows += len(chunk)
+                with span('csv_parse', ano=ano) as s:
+                    print("📊 Contando número total de linhas...")
+                    with open(csv_temp_path, 'r', encoding='latin-1') as f:
+                        total_csv_lines = sum(1 for _ in f) - (1 if has_header else 0)
+                
+                    print(f"📈 Total de linhas no CSV: {total_csv_lines}")
+                
+                    chunks = []
+                    for i, chunk in enumerate(pd.read_csv(csv_temp_path, 
+                                                        encoding='latin-1', 
+                                                        sep=separator,
+                                                        chunksize=chunk_size,
+                                                        low_memory=False,
+                                                        header=0 if has_header else None)):
+                        chunks.append(chunk)
+                        total_rows += len(chunk)
                     
-                    if i % 10 == 0:
-                        print(f"📖 Processados {total_rows}/{total_csv_lines} registros ({total_rows/total_csv_lines*100:.1f}%)")
+                        if i % 10 == 0:
+                            print(f"📖 Processados {total_rows}/{total_csv_lines} registros ({total_rows/total_csv_lines*100:.1f}%)")
                 
-                print("💾 Salvando como Parquet...")
-                df = pd.concat(chunks, ignore_index=True)
+                    print("💾 Salvando como Parquet...")
+                    df = pd.concat(chunks, ignore_index=True)
                 
-                try:
-                    df.to_parquet(parquet_path, index=False, engine='fastparquet')
-                except:
+                    s.add(linhas=total_rows, bytes=os.path.getsize(csv_temp_path))
+                
+                with span('parquet_write', ano=ano) as s:
                     try:
-                        df.to_parquet(parquet_path, index=False, engine='pyarrow')
-                    except Exception as e:
-                        print(f"❌ Erro ao salvar Parquet: {e}")
-                        return False
+                        df.to_parquet(parquet_path, index=False, engine='fastparquet')
+                    except:
+                        try:
+                            df.to_parquet(parquet_path, index=False, engine='pyarrow')
+                        except Exception as e:
+                            print(f"❌ Erro ao salvar Parquet: {e}")
+                            return False
+                
+                    s.add(linhas=len(df), bytes=os.path.getsize(parquet_path))
                 
                 print(f"✅ Conversão concluída: {total_rows} registros salvos em {parquet_path}")
                 
@@ -206,4 +349,5 @@ class ENEMDownloader:
             return False
             
         finally:
-            shutil.rmtree(temp_dir, ignore_errors=True)
\ No newline at end of file
+            if own_temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
\ No newline at end of file
@@ -0,0 +1,264 @@
+# enem_lib/instrumentation.py
+"""
+Spans nomeados para medir cada etapa do pipeline (download, unzip, csv_parse,
+parquet_write, load, uf_filter, categorize, aggregate, bootstrap).
+
+Desligado por padrão: span() devolve um objeto vazio compartilhado, sem medir nada.
+Para ligar, use enable() ou a variável de ambiente ENEM_INSTRUMENTACAO
+('1' guarda os registros em memória; qualquer outro valor é o caminho de um
+arquivo JSON Lines onde cada span é gravado ao terminar).
+
+Com arquivo, os registros não ficam em memória; o resumo por etapa (summary) é
+acumulado à parte e não cresce com a duração da execução. Spans medidos em
+processos filhos (pipeline e análises paralelas) voltam ao processo pai junto com
+o resultado de cada tarefa (run_in_worker + merge).
+"""
+from collections import deque
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+
+_enabled = False
+_sink = None
+# Sem arquivo de destino, os últimos registros ficam em memória (limitados)
+MAX_BUFFERED_RECORDS = 100000
+_records = deque(maxlen=MAX_BUFFERED_RECORDS)
+_totals = {}
+_lock = threading.Lock()
+
+
+def _rss_mb():
+    """Memória residente atual em MB (Linux); None onde /proc não existe"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    """Pico de memória residente do processo em MB (None fora de sistemas Unix)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.counts = {}
+
+    def add(self, **counts):
+        """Acumula contadores do span (ex: linhas=..., bytes=...)"""
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.start_wall = time.time()
+        self.start = time.perf_counter()
+        self.start_peak = _peak_rss_mb()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        peak = _peak_rss_mb()
+
+        record = {
+            'span': self.name,
+            'inicio': self.start_wall,
+            'duracao_s': round(duration, 6),
+            **self.attrs,
+            **self.counts,
+            'rss_mb': _rss_mb(),
+            'pico_rss_mb': peak,
+            # Quanto este span elevou o pico de memória do processo
+            'aumento_pico_mb': None if peak is None else round(peak - self.start_peak, 3),
+            'thread': threading.current_thread().name,
+        }
+        if exc_type is not None:
+            record['erro'] = exc_type.__name__
+        _emit(record)
+        return False
+
+
+def _emit(record: dict):
+    with _lock:
+        _accumulate(_totals, record)
+        if _sink is not None:
+            _sink.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            _sink.flush()
+        else:
+            _records.append(record)
+
+
+def span(name: str, **attrs):
+    """Context manager que mede uma etapa; sem custo quando a instrumentação está desligada"""
+    if not _enabled:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def _count_rows(result):
+    """Linhas do resultado: DataFrame, ou o DataFrame devolvido junto com o dicionário de resultados"""
+    if isinstance(result, tuple):
+        result = next((item for item in reversed(result) if hasattr(item, 'shape')), None)
+    if hasattr(result, 'shape') and len(getattr(result, 'shape', ())) > 0:
+        return int(result.shape[0])
+    return None
+
+
+def traced(name: str):
+    """
+    Decorador que mede cada chamada como um span, registrando ano/UF dos argumentos
+    e o número de linhas do resultado. Desligado, apenas chama a função.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            # Mesmos nomes de atributo dos spans manuais (ano, uf)
+            attrs = {('ano' if key == 'year' else key): arguments[key]
+                     for key in ('year', 'ano', 'uf') if key in arguments}
+            with _Span(name, attrs) as current:
+                result = func(*args, **kwargs)
+                rows = _count_rows(result)
+                if rows is not None:
+                    current.add(linhas=rows)
+            return result
+        return wrapper
+    return decorator
+
+
+def enable(jsonl_path: str = None):
+    """Liga a instrumentação; com jsonl_path, cada span também é gravado como uma linha JSON"""
+    global _enabled, _sink
+    disable()
+    if jsonl_path:
+        _sink = open(jsonl_path, 'a', encoding='utf-8')
+    _enabled = True
+
+
+def disable():
+    global _enabled, _sink
+    _enabled = False
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def records() -> list:
+    with _lock:
+        return list(_records)
+
+
+def reset():
+    with _lock:
+        _records.clear()
+        _totals.clear()
+
+
+def merge(records_list: list):
+    """Registra spans vindos de outro processo (ex: devolvidos por run_in_worker)"""
+    for record in records_list:
+        _emit(record)
+
+
+def worker_state() -> dict:
+    """Estado a repassar para processos filhos: com 'spawn', enable() do pai não é herdado"""
+    return {'enabled': _enabled}
+
+
+def run_in_worker(state: dict, func, *args, **kwargs):
+    """
+    Executa func em um processo filho com a instrumentação do pai (worker_state).
+    Os spans ficam em memória no filho e voltam com o resultado: (resultado, spans),
+    para o pai chamar merge() e gravar no seu próprio destino.
+    """
+    if state.get('enabled'):
+        enable()
+        reset()
+    elif _enabled:
+        disable()
+    result = func(*args, **kwargs)
+    return result, (records() if state.get('enabled') else [])
+
+
+def _accumulate(totals: dict, record: dict):
+    total = totals.setdefault(record['span'], {'span': record['span'], 'chamadas': 0, 'duracao_s': 0.0,
+                                                'linhas': 0, 'bytes': 0, 'pico_rss_mb': None})
+    total['chamadas'] += 1
+    total['duracao_s'] += record['duracao_s']
+    total['linhas'] += record.get('linhas', 0)
+    total['bytes'] += record.get('bytes', 0)
+    if record.get('pico_rss_mb') is not None:
+        total['pico_rss_mb'] = max(total['pico_rss_mb'] or 0, record['pico_rss_mb'])
+
+
+def summary(records_list: list = None) -> list:
+    """
+    Agrega os spans por nome: chamadas, tempo total, linhas, MB e maior pico de memória.
+    Sem records_list, usa os totais de todos os spans desde o último reset().
+    """
+    if records_list is None:
+        with _lock:
+            totals = {name: dict(total) for name, total in _totals.items()}
+    else:
+        totals = {}
+        for record in records_list:
+            _accumulate(totals, record)
+    return sorted(totals.values(), key=lambda total: total['duracao_s'], reverse=True)
+
+
+def print_summary(records_list: list = None):
+    """Imprime a tabela-resumo por etapa"""
+    rows = summary(records_list)
+    if not rows:
+        print("⚠️  Nenhum span registrado (instrumentação desligada?)")
+        return
+
+    print("\n" + "=" * 92)
+    print("⏱️  TEMPO E MEMÓRIA POR ETAPA")
+    print("=" * 92)
+    print(f"{'Etapa':<16}{'Chamadas':>10}{'Tempo (s)':>12}{'Linhas':>14}{'MB':>10}{'Linhas/s':>14}{'Pico RSS (MB)':>16}")
+    print("-" * 92)
+    for row in rows:
+        throughput = row['linhas'] / row['duracao_s'] if row['duracao_s'] > 0 and row['linhas'] else 0
+        peak = f"{row['pico_rss_mb']:.0f}" if row['pico_rss_mb'] is not None else 'N/A'
+        print(f"{row['span']:<16}{row['chamadas']:>10}{row['duracao_s']:>12.2f}{row['linhas']:>14,}"
+              f"{row['bytes'] / 1024 / 1024:>10.1f}{throughput:>14,.0f}{peak:>16}")
+
+
+_env = os.environ.get('ENEM_INSTRUMENTACAO', '').strip()
+if _env and _env != '0':
+    enable(None if _env == '1' else _env)
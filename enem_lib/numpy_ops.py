@@ -1,40 +1,172 @@
 # enem_lib/numpy_ops.py
 import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import os
 
+NOTAS_PCA = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
+# Valores aceitos em 'por' (None = um único grupo 'TOTAL')
+AGRUPAMENTOS_PCA = (None, 'NU_ANO', 'SG_UF_PROVA')
+
+
+class AcumuladorCovariancia:
+    """
+    Acumula n, soma e produtos cruzados das notas lote a lote (memória constante).
+    Os dados são deslocados por um valor fixo próximo da média das notas para
+    evitar cancelamento numérico; acumuladores de lotes, anos ou processos
+    diferentes são combinados somando os termos.
+    """
+    def __init__(self, n_variaveis: int, deslocamento: float = 500.0):
+        self.deslocamento = deslocamento
+        self.n = 0
+        self.soma = np.zeros(n_variaveis)
+        self.produtos = np.zeros((n_variaveis, n_variaveis))
+
+    def atualizar(self, X: np.ndarray) -> 'AcumuladorCovariancia':
+        X = np.asarray(X, dtype='float64') - self.deslocamento
+        self.n += X.shape[0]
+        self.soma += X.sum(axis=0)
+        self.produtos += X.T @ X
+        return self
+
+    def combinar(self, outro: 'AcumuladorCovariancia') -> 'AcumuladorCovariancia':
+        if outro.deslocamento != self.deslocamento:
+            raise ValueError("Acumuladores com deslocamentos diferentes não podem ser combinados")
+        self.n += outro.n
+        self.soma += outro.soma
+        self.produtos += outro.produtos
+        return self
+
+    @property
+    def media(self) -> np.ndarray:
+        return self.soma / self.n + self.deslocamento
+
+    @property
+    def covariancia(self) -> np.ndarray:
+        media_deslocada = self.soma / self.n
+        return (self.produtos - self.n * np.outer(media_deslocada, media_deslocada)) / (self.n - 1)
+
+
+def acumular_covariancia(anos: list, data_dir: str = 'dados_enem', por: str = None, uf: str = None,
+                         colunas: list = None, batch_size: int = 500000) -> dict:
+    """
+    Percorre os Parquet por lotes e acumula a covariância das notas, opcionalmente
+    agrupada por 'SG_UF_PROVA' ou 'NU_ANO'. Retorna {grupo: AcumuladorCovariancia}.
+    """
+    colunas = colunas or NOTAS_PCA
+    if por not in AGRUPAMENTOS_PCA:
+        print(f"❌ Agrupamento desconhecido: {por} (opções: {', '.join(str(opcao) for opcao in AGRUPAMENTOS_PCA)})")
+        return {}
+    acumuladores = {}
+
+    for ano in anos:
+        parquet_path = os.path.join(data_dir, f'microdados_enem_{ano}.parquet')
+        if not os.path.exists(parquet_path):
+            print(f"⚠️  Arquivo não encontrado para {ano}")
+            continue
+
+        parquet_file = pq.ParquetFile(parquet_path)
+        disponiveis = set(parquet_file.schema_arrow.names)
+        leitura = list(colunas)
+        if por == 'SG_UF_PROVA' or uf is not None:
+            leitura.append('SG_UF_PROVA')
+        faltando = [col for col in leitura if col not in disponiveis]
+        if faltando:
+            # Como um arquivo ausente: pula o ano e mantém o que já foi acumulado dos outros
+            print(f"⚠️  Colunas não encontradas em {ano}: {faltando} (ano ignorado)")
+            continue
+
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=leitura):
+            df = batch.to_pandas()
+            if uf is not None:
+                df = df[df['SG_UF_PROVA'] == uf]
+            df = df.dropna(subset=colunas)
+            if len(df) == 0:
+                continue
+
+            if por is None:
+                grupos = [('TOTAL', df)]
+            elif por == 'NU_ANO':
+                grupos = [(ano, df)]
+            else:
+                grupos = df.groupby(por, observed=True)
+
+            for grupo, dados in grupos:
+                if grupo not in acumuladores:
+                    acumuladores[grupo] = AcumuladorCovariancia(len(colunas))
+                acumuladores[grupo].atualizar(dados[colunas].to_numpy())
+
+    return acumuladores
+
+
+def pca_notas(anos: list, data_dir: str = 'dados_enem', por: str = None, uf: str = None,
+              colunas: list = None) -> dict:
+    """
+    PCA das cinco áreas do ENEM a partir da covariância acumulada fora da memória.
+    Usa np.linalg.eigh (matriz simétrica) e ordena os componentes por variância.
+    """
+    colunas = colunas or NOTAS_PCA
+    resultados = {}
+
+    for grupo, acumulador in acumular_covariancia(anos, data_dir, por, uf, colunas).items():
+        if acumulador.n < 2:
+            continue
+
+        autovalores, autovetores = np.linalg.eigh(acumulador.covariancia)
+        ordem = np.argsort(autovalores)[::-1]
+        autovalores = autovalores[ordem]
+        autovetores = autovetores[:, ordem]
+
+        # Sinal determinístico: maior carga de cada componente positiva
+        sinais = np.sign(autovetores[np.abs(autovetores).argmax(axis=0), np.arange(len(colunas))])
+        autovetores = autovetores * np.where(sinais == 0, 1, sinais)
+
+        resultados[grupo] = {
+            'n': acumulador.n,
+            'colunas': colunas,
+            'media': acumulador.media,
+            'covariancia': acumulador.covariancia,
+            'autovalores': autovalores,
+            'autovetores': autovetores,
+            'variancia_explicada': autovalores / autovalores.sum(),
+        }
+
+    return resultados
+
+
+def scores_pca(notas, resultado: dict, n_componentes: int = None) -> np.ndarray:
+    """Projeta as notas (linhas x áreas) nos componentes principais de um resultado de pca_notas"""
+    if isinstance(notas, pd.DataFrame):
+        notas = notas[resultado['colunas']].to_numpy()
+    componentes = resultado['autovetores'][:, :n_componentes]
+    return (np.asarray(notas, dtype='float64') - resultado['media']) @ componentes
+
 def exemplo_algebra_linear():
     print("\n🧮 EXEMPLO DE ÁLGEBRA LINEAR")
     print("=" * 40)
     
-    enem_files = [f for f in os.listdir('dados_enem') if f.endswith('.parquet')]
+    anos = []
+    if os.path.exists('dados_enem'):
+        anos = sorted(int(f.split('_')[-1].split('.')[0]) for f in os.listdir('dados_enem')
+                      if f.startswith('microdados_enem_') and f.endswith('.parquet'))
     
-    if enem_files:
+    if anos:
         try:
-            file_path = os.path.join('dados_enem', enem_files[0])
-            df = pd.read_parquet(file_path)
-            
-            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            resultados = pca_notas(anos)
             
-            if len(numeric_cols) >= 2:
-                col1, col2 = numeric_cols[:2]
+            if 'TOTAL' in resultados:
+                resultado = resultados['TOTAL']
+                
+                print(f"PCA das notas ({resultado['n']} participantes, anos {anos[0]}-{anos[-1]})")
+                print("Matriz de covariância entre as áreas:")
+                print(resultado['covariancia'])
                 
-                data = df[[col1, col2]].dropna()
-                data = data[np.isfinite(data).all(1)]
+                print(f"\nAutovalores: {resultado['autovalores']}")
+                print(f"Variância explicada: {np.round(resultado['variancia_explicada'], 3)}")
+                print("Autovetores:")
+                print(resultado['autovetores'])
                 
-                if len(data) > 10:
-                    cov_matrix = np.cov(data.values.T)
-                    
-                    print("Matriz de covariância entre duas variáveis numéricas:")
-                    print(cov_matrix)
-                    
-                    eigenvalues, eigenvectors = np.linalg.eig(cov_matrix)
-                    
-                    print(f"\nAutovalores: {eigenvalues}")
-                    print("Autovetores:")
-                    print(eigenvectors)
-                    
-                    return cov_matrix, eigenvalues, eigenvectors
+                return resultado['covariancia'], resultado['autovalores'], resultado['autovetores']
             
         except Exception as e:
             print(f"Erro ao processar dados do ENEM: {str(e)}")
@@ -56,7 +188,8 @@ def exemplo_algebra_linear():
     print("\nMatriz de covariância:")
     print(cov_matrix)
     
-    eigenvalues, eigenvectors = np.linalg.eig(cov_matrix)
+    # Matriz de covariância é simétrica: eigh é mais estável e devolve autovalores reais
+    eigenvalues, eigenvectors = np.linalg.eigh(cov_matrix)
     
     print(f"\nAutovalores: {eigenvalues}")
     print("Autovetores:")
@@ -4,9 +4,26 @@ import numpy as np
 from typing import Dict, List, Tuple
 import os
 
+from .aggregates import (NOTE_COLUMNS, GRADE_COLUMNS, EDUCATION_MAP, CORRELATION_METHODS, categories_to_text,
+                         correlate, weighted_corr)
+from .backends import get_backend
+from .sampling import sample_dir_for
+from .sketch import DEFAULT_QUANTILES, GroupedQuantileSketch
+from .instrumentation import span, traced
+from . import plotting
+
+# Colunas lidas sob demanda (via backend) quando o ano não foi carregado com load_data
+PARAIBA_COLUMNS = ['SG_UF_PROVA', 'Q002', 'Q003'] + NOTE_COLUMNS + ['PESO_AMOSTRAL']
+# Valores de EDUCACAO_PAIS (média dos níveis do pai e da mãe) nas legendas dos gráficos
+EDUCATION_LABELS = {1.0: 'Nível 1 (A-D)', 1.5: 'Misto', 2.0: 'Nível 2 (E-G)'}
+
 class ParaibaENEMAnalyzer:
-    def __init__(self, data_dir='dados_enem'):
-        self.data_dir = data_dir
+    def __init__(self, data_dir='dados_enem', use_sample=False, backend='pandas'):
+        # Com use_sample=True, lê as amostras estratificadas e pondera pelo PESO_AMOSTRAL
+        self.data_dir = sample_dir_for(data_dir) if use_sample else data_dir
+        self.use_sample = use_sample
+        # Motor usado para anos não carregados em memória: 'pandas', 'duckdb' ou 'polars'
+        self.backend = get_backend(backend)
         self.data = {}
         self.loaded_years = []
         
@@ -17,7 +34,9 @@ class ParaibaENEMAnalyzer:
             if os.path.exists(parquet_path):
                 try:
                     print(f"📂 Carregando dados de {year}...")
-                    self.data[year] = pd.read_parquet(parquet_path)
+                    with span('load', ano=year) as s:
+                        self.data[year] = pd.read_parquet(parquet_path)
+                        s.add(linhas=len(self.data[year]), bytes=os.path.getsize(parquet_path))
                     self.loaded_years.append(year)
                     print(f"✅ {year} carregado: {len(self.data[year])} registros")
                 except Exception as e:
@@ -25,13 +44,19 @@ class ParaibaENEMAnalyzer:
             else:
                 print(f"⚠️  Arquivo não encontrado para {year}")
     
+    @traced('uf_filter')
     def get_paraiba_data(self, year: int) -> pd.DataFrame:
         """Filtra dados apenas para a Paraíba usando SG_UF_PROVA = 'PB'"""
         if year not in self.data:
-            print(f"❌ Dados de {year} não carregados")
-            return None
+            # Ano não carregado: o backend lê só as linhas da Paraíba e as colunas usadas
+            paraiba_data = self.backend.read(year, self.data_dir, PARAIBA_COLUMNS, {'SG_UF_PROVA': 'PB'})
+            if paraiba_data is None:
+                print(f"❌ Dados de {year} não carregados")
+                return None
+            print(f"📊 Dados da Paraíba ({year}): {len(paraiba_data)} participantes")
+            return paraiba_data
         
-        df = self.data[year].copy()
+        df = self.data[year]
         
         # Verificar se a coluna SG_UF_PROVA existe
         if 'SG_UF_PROVA' not in df.columns:
@@ -39,10 +64,11 @@ class ParaibaENEMAnalyzer:
             return None
         
         # Filtrar para Paraíba
-        paraiba_data = df[df['SG_UF_PROVA'] == 'PB']
+        paraiba_data = categories_to_text(df[df['SG_UF_PROVA'] == 'PB'])
         print(f"📊 Dados da Paraíba ({year}): {len(paraiba_data)} participantes")
         return paraiba_data
     
+    @traced('categorize')
     def categorize_parent_education(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Categoriza a educação dos pais conforme solicitado:
@@ -57,24 +83,24 @@ class ParaibaENEMAnalyzer:
             print("⚠️  Colunas Q002 e/ou Q003 não encontradas")
             return df
         
-        # Mapeamento das categorias
-        education_map = {
-            'A': 1, 'B': 1, 'C': 1, 'D': 1,  # Informal/colarinho azul
-            'E': 2, 'F': 2, 'G': 2,           # Colarinho azul técnico/colarinho branco
-            'H': np.nan, ' ': np.nan, '': np.nan  # Ignorar sem resposta
-        }
-        
-        # Aplicar mapeamento
-        df['Q002_CAT'] = df['Q002'].map(education_map)
-        df['Q003_CAT'] = df['Q003'].map(education_map)
+        # Aplicar o mesmo mapeamento das análises nacionais (aggregates.EDUCATION_MAP)
+        df['Q002_CAT'] = df['Q002'].map(EDUCATION_MAP)
+        df['Q003_CAT'] = df['Q003'].map(EDUCATION_MAP)
         
         # Criar uma variável combinada (média da educação dos pais)
         df['EDUCACAO_PAIS'] = df[['Q002_CAT', 'Q003_CAT']].mean(axis=1)
         
         return df
     
-    def analyze_correlations(self, year: int) -> Dict:
-        """Analisa correlações entre educação dos pais e notas"""
+    def analyze_correlations(self, year: int, method: str = 'pearson') -> Dict:
+        """
+        Analisa correlações entre educação dos pais e notas.
+        method: 'pearson' (padrão), 'spearman' ou 'kendall' (tau-b, corrigido para empates)
+        """
+        if method not in CORRELATION_METHODS:
+            print(f"❌ Método de correlação desconhecido: {method} (opções: {', '.join(CORRELATION_METHODS)})")
+            return {}
+        
         paraiba_data = self.get_paraiba_data(year)
         if paraiba_data is None or len(paraiba_data) == 0:
             return {}
@@ -82,43 +108,85 @@ class ParaibaENEMAnalyzer:
         # Categorizar educação dos pais
         df = self.categorize_parent_education(paraiba_data)
         
-        # Selecionar colunas de notas
-        note_columns = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-        
         # Verificar quais colunas de notas existem
-        available_note_columns = [col for col in note_columns if col in df.columns]
+        available_note_columns = [col for col in NOTE_COLUMNS if col in df.columns]
         
         if not available_note_columns:
             print("❌ Nenhuma coluna de nota encontrada")
             return {}
         
         # Filtrar apenas registros com notas e educação dos pais válidos
-        valid_data = df[available_note_columns + ['EDUCACAO_PAIS']].dropna()
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in df.columns else []
+        valid_data = df[available_note_columns + ['EDUCACAO_PAIS'] + weight_columns].dropna()
         
         if len(valid_data) == 0:
             print("❌ Nenhum dado válido após filtragem")
             return {}
         
-        # Calcular correlações
-        correlations = {}
-        for note_col in available_note_columns:
-            correlation = valid_data['EDUCACAO_PAIS'].corr(valid_data[note_col])
-            correlations[note_col] = correlation
-        
         # Calcular nota geral (média das áreas)
         valid_data['NOTA_GERAL'] = valid_data[available_note_columns].mean(axis=1)
-        correlations['NOTA_GERAL'] = valid_data['EDUCACAO_PAIS'].corr(valid_data['NOTA_GERAL'])
+        
+        # Calcular correlações (ponderadas quando os dados são uma amostra)
+        with span('aggregate', ano=year, uf='PB') as s:
+            correlations = {}
+            for note_col in available_note_columns + ['NOTA_GERAL']:
+                if method != 'pearson':
+                    weights = valid_data['PESO_AMOSTRAL'] if weight_columns else None
+                    correlation = correlate(valid_data['EDUCACAO_PAIS'], valid_data[note_col], method, weights)
+                elif weight_columns:
+                    correlation = weighted_corr(valid_data['EDUCACAO_PAIS'], valid_data[note_col], valid_data['PESO_AMOSTRAL'])
+                else:
+                    correlation = valid_data['EDUCACAO_PAIS'].corr(valid_data[note_col])
+                correlations[note_col] = correlation
+            s.add(linhas=len(valid_data))
         
         return correlations, valid_data
     
+    def grade_sketch(self, year: int) -> GroupedQuantileSketch:
+        """Histogramas das notas por nível de educação dos pais (GroupedQuantileSketch)"""
+        sketch = GroupedQuantileSketch(['EDUCACAO_PAIS'])
+        paraiba_data = self.get_paraiba_data(year)
+        if paraiba_data is None or len(paraiba_data) == 0:
+            return sketch
+        
+        df = self.categorize_parent_education(paraiba_data)
+        
+        available_note_columns = [col for col in NOTE_COLUMNS if col in df.columns]
+        
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in df.columns else []
+        valid_data = df[available_note_columns + ['EDUCACAO_PAIS'] + weight_columns].dropna()
+        if len(valid_data) == 0:
+            return sketch
+        
+        valid_data['NOTA_GERAL'] = valid_data[available_note_columns].mean(axis=1)
+        return sketch.update(valid_data)
+    
+    def analyze_quantiles(self, year: int, qs=DEFAULT_QUANTILES) -> pd.DataFrame:
+        """Percentis (p10, p25, p50, p75, p90) das notas por nível de educação dos pais"""
+        return self.grade_sketch(year).quantile_table(qs)
+    
+    def plot_grade_distribution(self, year: int, column: str = 'NOTA_GERAL', heatmap: bool = False,
+                                path: str = None):
+        """Distribuição da nota por nível de educação dos pais, a partir dos histogramas agregados"""
+        sketch = self.grade_sketch(year)
+        title = f"{plotting.AREA_NAMES.get(column, column)} por educação dos pais - Paraíba {year}"
+        if heatmap:
+            return plotting.plot_grade_heatmap(sketch, column, labels=EDUCATION_LABELS, title=title, path=path)
+        return plotting.plot_grade_histograms(sketch, column, labels=EDUCATION_LABELS, title=title, path=path)
+    
+    def plot_correlations(self, correlations_dict: Dict[int, Dict], path: str = None):
+        """Gráfico das correlações por ano (mesmo formato de print_correlations)"""
+        return plotting.plot_correlations(correlations_dict,
+                                          title="Correlações entre educação dos pais e notas - Paraíba", path=path)
+    
     def print_correlations(self, correlations_dict: Dict[int, Dict]):
         """Imprime correlações por ano em formato de texto"""
         print("\n" + "=" * 80)
         print("CORRELAÇÕES ENTRE EDUCAÇÃO DOS PAIS E DESEMPENHO NO ENEM - PARAÍBA")
         print("=" * 80)
         
-        areas = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO', 'NOTA_GERAL']
-        area_names = ['Ciências Naturais', 'Ciências Humanas', 'Linguagens', 'Matemática', 'Redação', 'Nota Geral']
+        areas = GRADE_COLUMNS
+        area_names = [plotting.AREA_NAMES[area] for area in areas]
         
         # Cabeçalho da tabela
         print(f"{'Ano':<6}", end="")
@@ -138,18 +206,27 @@ class ParaibaENEMAnalyzer:
                     print(f"{'N/A':<20}", end="")
             print()
     
-    def bootstrap_correlation(self, data: pd.DataFrame, column: str, n_iterations: int = 1000) -> Tuple[float, List[float]]:
+    def bootstrap_correlation(self, data: pd.DataFrame, column: str, n_iterations: int = 1000,
+                              method: str = 'pearson') -> Tuple[float, List[float]]:
         """
         Realiza bootstrap para estimar a correlação e seu intervalo de confiança
         """
         correlations = []
         n = len(data)
         
-        for _ in range(n_iterations):
-            # Amostra com reposição
-            sample = data.sample(n, replace=True)
-            correlation = sample['EDUCACAO_PAIS'].corr(sample[column])
-            correlations.append(correlation)
+        # Em amostras estratificadas, a reamostragem segue os pesos amostrais
+        weights = 'PESO_AMOSTRAL' if 'PESO_AMOSTRAL' in data.columns else None
+        
+        with span('bootstrap', coluna=column, iteracoes=n_iterations, metodo=method) as s:
+            for _ in range(n_iterations):
+                # Amostra com reposição
+                sample = data.sample(n, replace=True, weights=weights)
+                if method == 'pearson':
+                    correlation = sample['EDUCACAO_PAIS'].corr(sample[column])
+                else:
+                    correlation = correlate(sample['EDUCACAO_PAIS'], sample[column], method)
+                correlations.append(correlation)
+            s.add(linhas=n * n_iterations)
         
         # Calcular intervalo de confiança 95%
         mean_corr = np.mean(correlations)
@@ -158,8 +235,12 @@ class ParaibaENEMAnalyzer:
         
         return mean_corr, (ci_lower, ci_upper), correlations
     
-    def analyze_with_bootstrap(self, year: int, n_iterations: int = 1000) -> Dict:
-        """Análise com bootstrap para estimar intervalos de confiança"""
+    def analyze_with_bootstrap(self, year: int, n_iterations: int = 1000, method: str = 'pearson') -> Dict:
+        """Análise com bootstrap para estimar intervalos de confiança (method como em analyze_correlations)"""
+        if method not in CORRELATION_METHODS:
+            print(f"❌ Método de correlação desconhecido: {method} (opções: {', '.join(CORRELATION_METHODS)})")
+            return {}
+        
         paraiba_data = self.get_paraiba_data(year)
         if paraiba_data is None or len(paraiba_data) == 0:
             return {}
@@ -167,14 +248,12 @@ class ParaibaENEMAnalyzer:
         # Categorizar educação dos pais
         df = self.categorize_parent_education(paraiba_data)
         
-        # Selecionar colunas de notas
-        note_columns = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-        
         # Verificar quais colunas de notas existem
-        available_note_columns = [col for col in note_columns if col in df.columns]
+        available_note_columns = [col for col in NOTE_COLUMNS if col in df.columns]
         
         # Filtrar apenas registros com notas e educação dos pais válidos
-        valid_data = df[available_note_columns + ['EDUCACAO_PAIS']].dropna()
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in df.columns else []
+        valid_data = df[available_note_columns + ['EDUCACAO_PAIS'] + weight_columns].dropna()
         
         if len(valid_data) == 0:
             return {}
@@ -185,7 +264,7 @@ class ParaibaENEMAnalyzer:
         # Realizar bootstrap para cada área
         results = {}
         for note_col in available_note_columns + ['NOTA_GERAL']:
-            mean_corr, ci, corr_dist = self.bootstrap_correlation(valid_data, note_col, n_iterations)
+            mean_corr, ci, corr_dist = self.bootstrap_correlation(valid_data, note_col, n_iterations, method)
             results[note_col] = {
                 'correlacao': mean_corr,
                 'intervalo_confianca': ci,
@@ -199,8 +278,8 @@ class ParaibaENEMAnalyzer:
         print(f"\nANÁLISE BOOTSTRAP - ENEM {year}")
         print("=" * 50)
         
-        areas = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO', 'NOTA_GERAL']
-        area_names = ['Ciências Naturais', 'Ciências Humanas', 'Linguagens', 'Matemática', 'Redação', 'Nota Geral']
+        areas = GRADE_COLUMNS
+        area_names = [plotting.AREA_NAMES[area] for area in areas]
         
         print(f"{'Área':<20} {'Correlação':<12} {'IC 95% Inferior':<18} {'IC 95% Superior':<18}")
         print("-" * 70)
@@ -210,47 +289,68 @@ class ParaibaENEMAnalyzer:
                 result = results[area]
                 print(f"{area_name:<20} {result['correlacao']:<12.3f} {result['intervalo_confianca'][0]:<18.3f} {result['intervalo_confianca'][1]:<18.3f}")
     
-    def print_descriptive_stats(self, year: int):
-        """Imprime estatísticas descritivas"""
+    def plot_bootstrap_results(self, results: Dict, year: int, path: str = None):
+        """Histogramas das distribuições bootstrap de analyze_with_bootstrap"""
+        return plotting.plot_bootstrap_results(results, year, path=path)
+    
+    def print_descriptive_stats(self, year: int) -> Dict:
+        """
+        Imprime estatísticas descritivas e as devolve:
+        {'participantes', 'validos', 'distribuicao': {nível: fração}, 'medias': {nível: {área: média}}}
+        """
         paraiba_data = self.get_paraiba_data(year)
         if paraiba_data is None or len(paraiba_data) == 0:
-            return
+            return {}
         
         df = self.categorize_parent_education(paraiba_data)
         
-        # Selecionar colunas de notas
-        note_columns = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
-        
         # Verificar quais colunas de notas existem
-        available_note_columns = [col for col in note_columns if col in df.columns]
+        available_note_columns = [col for col in NOTE_COLUMNS if col in df.columns]
         
-        valid_data = df[available_note_columns + ['EDUCACAO_PAIS']].dropna()
+        # Em amostras estratificadas, contagens, proporções e médias usam PESO_AMOSTRAL
+        weight_columns = ['PESO_AMOSTRAL'] if 'PESO_AMOSTRAL' in df.columns else []
+        valid_data = df[available_note_columns + ['EDUCACAO_PAIS'] + weight_columns].dropna()
         
         if len(valid_data) == 0:
-            return
+            return {}
+        
+        if weight_columns:
+            weights = valid_data['PESO_AMOSTRAL']
+            n_paraiba = paraiba_data['PESO_AMOSTRAL'].sum()
+        else:
+            weights = pd.Series(1.0, index=valid_data.index)
+            n_paraiba = len(paraiba_data)
         
         print(f"\nESTATÍSTICAS DESCRITIVAS - ENEM {year}")
         print("=" * 50)
-        print(f"Participantes Paraíba: {len(paraiba_data)}")
-        print(f"Dados válidos para análise: {len(valid_data)}")
+        print(f"Participantes Paraíba: {n_paraiba:.0f}")
+        print(f"Dados válidos para análise: {weights.sum():.0f}")
+        if weight_columns:
+            print(f"(estimativas ponderadas a partir de {len(valid_data)} linhas da amostra)")
         
         # Distribuição educação dos pais
-        nivel_1 = (valid_data['EDUCACAO_PAIS'] == 1).sum()
-        nivel_2 = (valid_data['EDUCACAO_PAIS'] == 2).sum()
-        total = len(valid_data)
+        nivel_1 = weights[valid_data['EDUCACAO_PAIS'] == 1].sum()
+        nivel_2 = weights[valid_data['EDUCACAO_PAIS'] == 2].sum()
+        total = weights.sum()
+        stats = {'participantes': float(n_paraiba), 'validos': float(total), 'distribuicao': {}, 'medias': {}}
         
         if total > 0:
+            stats['distribuicao'] = {1: nivel_1 / total, 2: nivel_2 / total}
             print(f"\nDistribuição Educação dos Pais:")
-            print(f"Nível 1 (A-D): {nivel_1} ({nivel_1/total*100:.1f}%)")
-            print(f"Nível 2 (E-G): {nivel_2} ({nivel_2/total*100:.1f}%)")
+            print(f"Nível 1 (A-D): {nivel_1:.0f} ({nivel_1/total*100:.1f}%)")
+            print(f"Nível 2 (E-G): {nivel_2:.0f} ({nivel_2/total*100:.1f}%)")
             
             # Médias das notas por nível
             print(f"\nMédias das Notas por Nível de Educação dos Pais:")
             for nivel in [1, 2]:
-                nivel_data = valid_data[valid_data['EDUCACAO_PAIS'] == nivel]
-                if len(nivel_data) > 0:
+                mask = valid_data['EDUCACAO_PAIS'] == nivel
+                if mask.any() and weights[mask].sum() > 0:
                     print(f"\nNível {nivel}:")
+                    stats['medias'][nivel] = {}
                     for area in available_note_columns:
                         area_name = area.replace('NU_NOTA_', '').replace('_', ' ').title()
-                        media = nivel_data[area].mean()
-                        print(f"  {area_name}: {media:.1f}")
\ No newline at end of file
+                        media = np.average(valid_data.loc[mask, area], weights=weights[mask])
+                        stats['medias'][nivel][area] = media
+                        print(f"  {area_name}: {media:.1f}")
+        
+        return stats
@@ -0,0 +1,310 @@
+# enem_lib/parallel.py
+"""
+Execução paralela das análises por (ano, UF, análise) em um pool de processos.
+
+O processo principal lê de cada ano apenas as colunas usadas pelas análises e as
+publica em memória compartilhada (multiprocessing.shared_memory): colunas numéricas
+como arrays, colunas de texto como códigos de categoria. Os workers montam o
+DataFrame por cima desses buffers, sem cópia e sem receber DataFrames serializados,
+e devolvem só o resultado de cada análise.
+
+A janela de anos publicados ao mesmo tempo tem o tamanho necessário para ocupar todos
+os processos (ceil(processos / tarefas por ano) + 1 ano à frente, no mínimo
+MIN_YEARS_IN_FLIGHT), limitada por max_shared_mb: antes de publicar um ano além da
+janela, o processo principal recolhe os resultados do mais antigo e remove seus
+segmentos. Os workers abrem os segmentos no início de cada tarefa e os fecham ao final
+(abrir é só mapear, sem cópia), então um worker ocioso não mantém nenhum ano mapeado.
+O pico de memória compartilhada é a janela vezes o tamanho de um ano, não o número de anos.
+
+Uso:
+    python -m enem_lib.parallel --anos 2019:2023 --ufs PB,SP --analises renda,trabalho --processos 4
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from multiprocessing import shared_memory
+import multiprocessing
+import argparse
+import contextlib
+import gc
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .analysis import ENEMAnalyzer, ANALYSIS_COLUMNS
+from .paraiba_analysis import ParaibaENEMAnalyzer, PARAIBA_COLUMNS
+from .sampling import sample_dir_for
+from . import instrumentation
+
+# Análise -> (analisador, método). As análises da Paraíba ignoram a UF da tarefa.
+ANALISES_PARALELAS = {
+    'trabalho': ('uf', 'analyze_work_status_vs_grades'),
+    'renda': ('uf', 'analyze_income_vs_grades'),
+    'correlacoes': ('paraiba', 'analyze_correlations'),
+    'bootstrap': ('paraiba', 'analyze_with_bootstrap'),
+    'descritivas': ('paraiba', 'print_descriptive_stats'),
+}
+# Anos em memória compartilhada ao mesmo tempo, no mínimo: o que está sendo analisado e o seguinte
+MIN_YEARS_IN_FLIGHT = 2
+# Fração da memória física usada como limite padrão da memória compartilhada
+SHARED_MEMORY_FRACTION = 0.5
+
+
+def _default_shared_budget() -> int:
+    """Metade da memória física em bytes (None se o sistema não informar)"""
+    try:
+        return int(os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') * SHARED_MEMORY_FRACTION)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def years_in_flight(n_workers: int, n_tasks: int, year_bytes: int = None, budget_bytes: int = None) -> int:
+    """
+    Anos publicados ao mesmo tempo: os necessários para ocupar os n_workers com n_tasks
+    tarefas por ano, mais um à frente; com year_bytes e budget_bytes, no máximo os que
+    cabem no orçamento (mas sempre pelo menos um).
+    """
+    wanted = max(MIN_YEARS_IN_FLIGHT, -(-n_workers // max(n_tasks, 1)) + 1)
+    if year_bytes and budget_bytes:
+        wanted = min(wanted, max(1, budget_bytes // year_bytes))
+    return wanted
+
+
+def _columns_to_share(parquet_path: str) -> list:
+    """Colunas das análises e todas as colunas de UF (get_uf_data as percorre em ordem)"""
+    needed = set(ANALYSIS_COLUMNS + PARAIBA_COLUMNS)
+    return [col for col in pq.read_schema(parquet_path).names
+            if col in needed or 'UF' in col or 'ESTADO' in col]
+
+
+def _share_array(array: np.ndarray, segments: list) -> dict:
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+    segments.append(segment)
+    return {'shm': segment.name, 'dtype': array.dtype.str, 'length': len(array)}
+
+
+def share_year(year: int, data_dir: str, segments: list) -> dict:
+    """
+    Lê as colunas de um ano e as copia para segmentos de memória compartilhada.
+    Devolve a descrição (nomes dos segmentos, dtypes, categorias) enviada aos workers.
+    """
+    parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+    table = pq.read_table(parquet_path, columns=_columns_to_share(parquet_path))
+
+    columns = []
+    for name in table.column_names:
+        series = table.column(name).to_pandas()
+        if series.dtype == object or series.dtype.name in ('string', 'category'):
+            categorical = pd.Categorical(series)
+            spec = _share_array(categorical.codes, segments)
+            spec['categories'] = categorical.categories.tolist()
+        else:
+            spec = _share_array(series.to_numpy(), segments)
+        spec['name'] = name
+        columns.append(spec)
+        del series
+
+    return {'year': year, 'rows': table.num_rows, 'columns': columns}
+
+
+# Estado de cada worker: segmentos abertos na tarefa atual (por ano) e analisadores, reaproveitados entre tarefas
+_WORKER_SEGMENTS = {}
+_WORKER_ANALYZERS = {}
+
+
+def _attach_year(description: dict) -> pd.DataFrame:
+    data = {}
+    segments = _WORKER_SEGMENTS.setdefault(description['year'], {})
+    for spec in description['columns']:
+        segment = segments.get(spec['shm'])
+        if segment is None:
+            segment = segments[spec['shm']] = shared_memory.SharedMemory(name=spec['shm'])
+        array = np.ndarray((spec['length'],), dtype=np.dtype(spec['dtype']), buffer=segment.buf)
+        if 'categories' in spec:
+            data[spec['name']] = pd.Categorical.from_codes(array, spec['categories'])
+        else:
+            data[spec['name']] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def _release_years():
+    """Tira os anos dos analisadores e fecha os segmentos abertos neste worker"""
+    if not _WORKER_SEGMENTS:
+        return
+    for analyzer in _WORKER_ANALYZERS.values():
+        for year in list(analyzer.data):
+            del analyzer.data[year]
+            analyzer.loaded_years.remove(year)
+    gc.collect()
+
+    for year in list(_WORKER_SEGMENTS):
+        segments = _WORKER_SEGMENTS[year]
+        for name in list(segments):
+            try:
+                segments[name].close()
+            except BufferError:
+                # Ainda há um array apontando para o buffer: tenta de novo na próxima tarefa
+                continue
+            del segments[name]
+        if not segments:
+            del _WORKER_SEGMENTS[year]
+
+
+def _analyzer_for(kind: str, description: dict, data_dir: str):
+    key = (kind, data_dir)
+    if key not in _WORKER_ANALYZERS:
+        analyzer_class = ENEMAnalyzer if kind == 'uf' else ParaibaENEMAnalyzer
+        _WORKER_ANALYZERS[key] = analyzer_class(data_dir=data_dir)
+    analyzer = _WORKER_ANALYZERS[key]
+
+    year = description['year']
+    if year not in analyzer.data:
+        analyzer.data[year] = _attach_year(description)
+        analyzer.loaded_years.append(year)
+    return analyzer
+
+
+def _run_task(description: dict, data_dir: str, uf: str, analise: str, n_iterations: int):
+    """Executa uma análise no worker; devolve (resultado, texto impresso)"""
+    kind, method = ANALISES_PARALELAS[analise]
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            analyzer = _analyzer_for(kind, description, data_dir)
+            year = description['year']
+            if kind == 'uf':
+                result = getattr(analyzer, method)(year, uf)
+            elif analise == 'bootstrap':
+                result = analyzer.analyze_with_bootstrap(year, n_iterations)
+            else:
+                result = getattr(analyzer, method)(year)
+
+        # Os métodos devolvem (resultados, DataFrame de linhas); só os resultados voltam ao processo principal
+        if isinstance(result, tuple):
+            result = result[0]
+    finally:
+        # Fecha o ano ao fim de cada tarefa: worker ocioso não segura segmentos já removidos
+        analyzer = None
+        _release_years()
+    return result, output.getvalue()
+
+
+def _unlink(segments: list):
+    while segments:
+        segment = segments.pop()
+        segment.close()
+        segment.unlink()
+
+
+def run_parallel_analyses(years: list, ufs: list, analises: list, data_dir: str = 'dados_enem',
+                          max_workers: int = None, use_sample: bool = False, n_iterations: int = 1000,
+                          show_output: bool = True, max_shared_mb: float = None) -> dict:
+    """
+    Roda cada combinação (ano, UF, análise) em um processo do pool.
+    Retorna {(ano, uf, analise): resultado}, com os mesmos dicionários devolvidos pelos
+    métodos dos analisadores (sem o DataFrame de linhas que alguns devolvem junto).
+    Análises da Paraíba ('correlacoes', 'bootstrap', 'descritivas') usam uf = 'PB'.
+    max_shared_mb limita a memória compartilhada (padrão: metade da memória física).
+    """
+    data_dir = sample_dir_for(data_dir) if use_sample else data_dir
+    unknown = [analise for analise in analises if analise not in ANALISES_PARALELAS]
+    if unknown:
+        print(f"❌ Análises desconhecidas: {unknown} (opções: {', '.join(ANALISES_PARALELAS)})")
+        return {}
+
+    tasks = []
+    for analise in analises:
+        task_ufs = ufs if ANALISES_PARALELAS[analise][0] == 'uf' else ['PB']
+        tasks.extend((uf, analise) for uf in task_ufs)
+
+    results = {}
+    # Anos publicados e ainda não recolhidos: (ano, segmentos, {chave: future})
+    pending = deque()
+    n_workers = max_workers or os.cpu_count()
+    budget_bytes = max_shared_mb * 1024 * 1024 if max_shared_mb else _default_shared_budget()
+    year_bytes = 0
+    # Os spans medidos nos workers voltam com o resultado de cada tarefa
+    instrumentation_state = instrumentation.worker_state()
+
+    def collect(year: int, year_segments: list, futures: dict):
+        """Espera as tarefas de um ano, guarda os resultados e remove seus segmentos"""
+        try:
+            for key, future in futures.items():
+                try:
+                    (results[key], output), spans = future.result()
+                    instrumentation.merge(spans)
+                except Exception as e:
+                    print(f"❌ Erro em {key}: {e}")
+                    results[key] = {}
+                    continue
+                if show_output and output:
+                    print(f"\n===== {key[2]} | {key[1]} | {key[0]} =====")
+                    print(output, end='')
+        finally:
+            _unlink(year_segments)
+
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+            # Enquanto os workers analisam os anos da janela, o processo principal já publica o seguinte
+            for year in years:
+                if not os.path.exists(f'{data_dir}/microdados_enem_{year}.parquet'):
+                    print(f"⚠️  Arquivo não encontrado para {year}")
+                    continue
+                # O tamanho de um ano só é conhecido depois de publicar o primeiro
+                while len(pending) >= years_in_flight(n_workers, len(tasks), year_bytes, budget_bytes):
+                    collect(*pending.popleft())
+
+                print(f"📤 Publicando {year} em memória compartilhada...")
+                year_segments = []
+                pending.append((year, year_segments, {}))
+                description = share_year(year, data_dir, year_segments)
+                year_bytes = max(year_bytes, sum(segment.size for segment in year_segments))
+                for uf, analise in tasks:
+                    pending[-1][2][(year, uf, analise)] = pool.submit(
+                        instrumentation.run_in_worker, instrumentation_state,
+                        _run_task, description, data_dir, uf, analise, n_iterations)
+
+            while pending:
+                collect(*pending.popleft())
+    finally:
+        # Erro no meio do caminho: nenhum segmento fica para trás
+        for _, year_segments, _ in pending:
+            _unlink(year_segments)
+
+    return results
+
+
+if __name__ == "__main__":
+    from .pipeline import parse_anos
+
+    parser = argparse.ArgumentParser(description="Análises por ano/UF em paralelo (memória compartilhada)")
+    parser.add_argument('--anos', required=True, help="Intervalo (2014:2024) ou lista (2014,2015,2016)")
+    parser.add_argument('--ufs', default='PB', help="UFs separadas por vírgula")
+    parser.add_argument('--analises', default='trabalho,renda,correlacoes,descritivas',
+                        help=f"Análises: {', '.join(ANALISES_PARALELAS)}")
+    parser.add_argument('--processos', type=int, default=None, help="Processos (padrão: núcleos da CPU)")
+    parser.add_argument('--iteracoes', type=int, default=1000, help="Iterações do bootstrap")
+    parser.add_argument('--dados', default='dados_enem')
+    parser.add_argument('--amostra', action='store_true', help="Usa as amostras estratificadas")
+    parser.add_argument('--memoria-mb', type=float, default=None,
+                        help="Limite da memória compartilhada (padrão: metade da memória física)")
+    args = parser.parse_args()
+
+    resultados = run_parallel_analyses(parse_anos(args.anos), [uf.strip().upper() for uf in args.ufs.split(',')],
+                                       [analise.strip() for analise in args.analises.split(',')],
+                                       args.dados, args.processos, args.amostra, args.iteracoes,
+                                       max_shared_mb=args.memoria_mb)
+
+    for (ano, uf, analise), resultado in resultados.items():
+        if analise == 'renda' and resultado:
+            print(f"\n💰 Correlações renda x notas - {uf} {ano}:")
+            for area, corr in resultado['correlacoes'].items():
+                print(f"   {area}: {corr:.3f}")
+        elif analise == 'correlacoes' and resultado:
+            print(f"\n📈 Correlações educação dos pais x notas - PB {ano}:")
+            for area, corr in resultado.items():
+                print(f"   {area}: {corr:.3f}")
@@ -0,0 +1,342 @@
+# enem_lib/percentile_index.py
+"""
+Índice de percentil por ano: onde uma nota (ou um candidato, pelo NU_INSCRICAO) fica
+no Brasil, na UF e na faixa de renda (Q006), sem carregar nem ordenar o ano a cada consulta.
+
+Para cada área, as notas têm poucos valores distintos (uma casa decimal), então o índice
+guarda os valores distintos ordenados e, para cada segmento (Brasil, cada UF, cada faixa
+de renda), a contagem acumulada abaixo de cada valor: uma matriz segmentos x valores.
+Os candidatos ficam em um array de NU_INSCRICAO ordenado, com a posição de cada nota
+nos valores distintos, a UF e a faixa. Tudo é gravado em .npy e aberto com mmap:
+
+    {data_dir}/indice_percentis/{ano}/meta.json
+    {data_dir}/indice_percentis/{ano}/NOTA_GERAL_valores.npy      (valores distintos)
+    {data_dir}/indice_percentis/{ano}/NOTA_GERAL_acumulado.npy    (segmentos x valores+1)
+    {data_dir}/indice_percentis/{ano}/inscricoes.npy              (NU_INSCRICAO ordenado)
+    {data_dir}/indice_percentis/{ano}/posicoes.npy                (candidatos x áreas)
+    {data_dir}/indice_percentis/{ano}/uf.npy, renda.npy           (códigos dos segmentos)
+
+Uso:
+    python -m enem_lib.percentile_index --anos 2022,2023
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .aggregates import NOTE_COLUMNS, GRADE_COLUMNS
+from .instrumentation import span
+
+INDEX_DIR = 'indice_percentis'
+NATIONAL = 'BR'
+# kind: 'media' conta metade dos empates (padrão), 'fraca' usa <=, 'estrita' usa <
+RANK_KINDS = ('media', 'fraca', 'estrita')
+
+
+def index_dir_for(year: int, data_dir: str = 'dados_enem') -> str:
+    return os.path.join(data_dir, INDEX_DIR, str(year))
+
+
+def _codes(values: pd.Series, labels: list) -> np.ndarray:
+    """Código de cada linha na lista de rótulos (-1 para vazio/desconhecido)"""
+    codes = pd.Categorical(values, categories=labels).codes
+    return codes.astype('int8')
+
+
+def _note_batches(parquet_file, columns: list, notes: list, batch_size: int):
+    """Lotes do Parquet já com a NOTA_GERAL (mesmo critério das análises: todas as áreas válidas)"""
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        df = batch.to_pandas()
+        df['NOTA_GERAL'] = df[notes].mean(axis=1).where(df[notes].notna().all(axis=1))
+        yield df
+
+
+def _segment_counts(inverse: np.ndarray, uf_codes: np.ndarray, band_codes: np.ndarray, weights,
+                    n_ufs: int, n_bands: int, n_values: int) -> np.ndarray:
+    """Contagens segmentos x valores: Brasil, UF (1..) e faixa de renda (1 + n_ufs ..)"""
+    counts = [np.bincount(inverse, weights=weights, minlength=n_values).astype('float64')[None, :]]
+    for codes, n_segments in [(uf_codes, n_ufs), (band_codes, n_bands)]:
+        known = codes >= 0
+        flat = codes[known].astype('int64') * n_values + inverse[known]
+        family = np.bincount(flat, weights=weights[known] if weights is not None else None,
+                             minlength=n_segments * n_values)
+        counts.append(family.reshape(n_segments, n_values))
+    return np.vstack(counts)
+
+
+def build_percentile_index(year: int, data_dir: str = 'dados_enem', index_dir: str = None,
+                           batch_size: int = 500000):
+    """
+    Lê o ano em lotes (duas passadas: valores distintos, depois contagens e posições) e grava
+    o índice de percentis. Só os arrays por candidato (inscrição, posições, UF, faixa) ficam
+    inteiros na memória, porque são o próprio índice.
+    Retorna o PercentileRankIndex aberto, ou None se o ano não existir.
+    """
+    parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+    if not os.path.exists(parquet_path):
+        print(f"⚠️  Arquivo não encontrado para {year}")
+        return None
+
+    index_dir = index_dir or index_dir_for(year, data_dir)
+    parquet_file = pq.ParquetFile(parquet_path)
+    available = set(parquet_file.schema_arrow.names)
+    if 'NU_INSCRICAO' not in available or 'SG_UF_PROVA' not in available:
+        print(f"❌ Colunas NU_INSCRICAO/SG_UF_PROVA não encontradas em {year}")
+        return None
+
+    columns = [col for col in ['NU_INSCRICAO', 'SG_UF_PROVA', 'Q006', 'PESO_AMOSTRAL'] + NOTE_COLUMNS
+               if col in available]
+    notes = [col for col in NOTE_COLUMNS if col in available]
+    areas = notes + ['NOTA_GERAL']
+    n_rows = parquet_file.metadata.num_rows
+    print(f"🗂️  Construindo índice de percentis de {year}...")
+
+    with span('percentile_index', ano=year) as s:
+        # 1ª passada: valores distintos de cada área, UFs e faixas de renda
+        distinct = {area: np.empty(0, dtype='float64') for area in areas}
+        ufs, bands = set(), set()
+        for df in _note_batches(parquet_file, columns, notes, batch_size):
+            for area in areas:
+                values = df[area].to_numpy(dtype='float64')
+                distinct[area] = np.union1d(distinct[area], values[~np.isnan(values)])
+            ufs.update(df['SG_UF_PROVA'].dropna().unique().tolist())
+            if 'Q006' in df.columns:
+                bands.update(df['Q006'].dropna().unique().tolist())
+        ufs, bands = sorted(ufs), sorted(bands)
+        segments = [NATIONAL] + [f'UF={uf}' for uf in ufs] + [f'Q006={band}' for band in bands]
+
+        # 2ª passada: posição de cada nota nos valores distintos e contagens por segmento
+        inscricoes = np.empty(n_rows, dtype='int64')
+        positions = np.full((n_rows, len(areas)), -1, dtype='int32')
+        uf_codes = np.full(n_rows, -1, dtype='int8')
+        band_codes = np.full(n_rows, -1, dtype='int8')
+        counts = {area: np.zeros((len(segments), len(distinct[area])), dtype='float64') for area in areas}
+        offset = 0
+        for df in _note_batches(parquet_file, columns, notes, batch_size):
+            rows = slice(offset, offset + len(df))
+            offset += len(df)
+            inscricoes[rows] = df['NU_INSCRICAO'].to_numpy(dtype='int64')
+            uf_codes[rows] = _codes(df['SG_UF_PROVA'], ufs)
+            if 'Q006' in df.columns and bands:
+                band_codes[rows] = _codes(df['Q006'], bands)
+            weights = df['PESO_AMOSTRAL'].to_numpy(dtype='float64') if 'PESO_AMOSTRAL' in df.columns else None
+
+            for k, area in enumerate(areas):
+                values = df[area].to_numpy(dtype='float64')
+                valid = ~np.isnan(values)
+                inverse = np.searchsorted(distinct[area], values[valid])
+                positions[rows][valid, k] = inverse
+                counts[area] += _segment_counts(inverse, uf_codes[rows][valid], band_codes[rows][valid],
+                                                weights[valid] if weights is not None else None,
+                                                len(ufs), len(bands), len(distinct[area]))
+            s.add(linhas=len(df))
+        s.add(bytes=os.path.getsize(parquet_path))
+
+        os.makedirs(index_dir, exist_ok=True)
+        for area in areas:
+            cumulative = np.zeros((len(segments), len(distinct[area]) + 1), dtype='float64')
+            np.cumsum(counts[area], axis=1, out=cumulative[:, 1:])
+            np.save(os.path.join(index_dir, f'{area}_valores.npy'), distinct[area])
+            np.save(os.path.join(index_dir, f'{area}_acumulado.npy'), cumulative)
+
+        # Candidatos ordenados por NU_INSCRICAO para busca binária
+        order = np.argsort(inscricoes, kind='stable')
+        np.save(os.path.join(index_dir, 'inscricoes.npy'), inscricoes[order])
+        np.save(os.path.join(index_dir, 'posicoes.npy'), positions[order])
+        np.save(os.path.join(index_dir, 'uf.npy'), uf_codes[order])
+        np.save(os.path.join(index_dir, 'renda.npy'), band_codes[order])
+
+        meta = {'ano': year, 'areas': areas, 'ufs': ufs, 'faixas_renda': bands,
+                'segmentos': segments, 'candidatos': n_rows}
+        with open(os.path.join(index_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Índice de {year} salvo em {index_dir}: {n_rows} candidatos, {len(segments)} segmentos")
+    return PercentileRankIndex(index_dir)
+
+
+def load_percentile_index(year: int, data_dir: str = 'dados_enem'):
+    """Abre o índice de um ano (None se ainda não foi construído)"""
+    index_dir = index_dir_for(year, data_dir)
+    if not os.path.exists(os.path.join(index_dir, 'meta.json')):
+        print(f"⚠️  Índice de percentis não encontrado para {year} (use build_percentile_index)")
+        return None
+    return PercentileRankIndex(index_dir)
+
+
+class PercentileRankIndex:
+    """Consultas de percentil sobre um índice gravado por build_percentile_index (arrays em mmap)"""
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.year = self.meta['ano']
+        self.areas = self.meta['areas']
+        self.ufs = self.meta['ufs']
+        self.bands = self.meta['faixas_renda']
+        self._arrays = {}
+        self._tables = {}
+
+    def _array(self, name: str, mmap: bool = True) -> np.ndarray:
+        """Arrays dos candidatos ficam em mmap; as tabelas por área (pequenas) vão para a memória"""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.index_dir, f'{name}.npy'),
+                                         mmap_mode='r' if mmap else None)
+        return self._arrays[name]
+
+    def _segments(self, n: int, uf=None, renda=None) -> np.ndarray:
+        """Segmento de cada consulta: Brasil, a UF ou a faixa de renda (escalar ou um por valor)"""
+        if uf is not None and renda is not None:
+            raise ValueError("Informe uf ou renda, não os dois")
+        if uf is None and renda is None:
+            return np.zeros(n, dtype='int64')
+
+        labels, first = (self.ufs, 1) if uf is not None else (self.bands, 1 + len(self.ufs))
+        keys = np.broadcast_to(np.asarray(uf if uf is not None else renda, dtype=object), (n,))
+        codes = _codes(pd.Series(keys), labels).astype('int64')
+        return np.where(codes >= 0, codes + first, -1)
+
+    def _rank_table(self, area: str, kind: str) -> np.ndarray:
+        """
+        Percentil de cada valor distinto em cada segmento (segmentos x valores), calculado
+        uma vez a partir das contagens acumuladas. 'abaixo' tem uma coluna a mais e dá o
+        percentil de uma nota ausente do índice (só conta as menores, não há empates).
+        """
+        if (area, kind) not in self._tables:
+            cumulative = self._array(f'{area}_acumulado', mmap=False)
+            if kind in ('estrita', 'abaixo'):
+                count = cumulative if kind == 'abaixo' else cumulative[:, :-1]
+            elif kind == 'fraca':
+                count = cumulative[:, 1:]
+            else:
+                count = (cumulative[:, :-1] + cumulative[:, 1:]) / 2
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._tables[(area, kind)] = np.ascontiguousarray(count * 100 / cumulative[:, -1:])
+        return self._tables[(area, kind)]
+
+    def _ranks(self, area: str, segments: np.ndarray, below: np.ndarray, found: np.ndarray = None,
+               kind: str = 'media') -> np.ndarray:
+        """
+        Percentis a partir do segmento e da posição nos valores distintos (-1 = inválido).
+        found=None indica que todas as notas estão no índice (consulta por candidato).
+        """
+        if kind not in RANK_KINDS:
+            raise ValueError(f"kind desconhecido: {kind} (opções: {', '.join(RANK_KINDS)})")
+        table = self._rank_table(area, kind)
+        n_values = table.shape[1]
+        invalid = (segments < 0) | (below < 0)
+        seg, pos = np.maximum(segments, 0), np.maximum(below, 0)
+
+        if found is None:
+            ranks = table.ravel()[seg * n_values + pos]
+        else:
+            missing = self._rank_table(area, 'abaixo')
+            ranks = np.where(found, table.ravel()[seg * n_values + np.minimum(pos, n_values - 1)],
+                             missing.ravel()[seg * (n_values + 1) + pos])
+        ranks[invalid] = np.nan
+        return ranks
+
+    def percentile_rank(self, values, area: str = 'NOTA_GERAL', uf=None, renda=None, kind: str = 'media'):
+        """
+        Percentil de uma nota (ou de um array de notas) no Brasil, na UF ou na faixa Q006.
+        uf/renda aceitam um valor único ou um por nota. Escalar entra, escalar sai.
+        """
+        if area not in self.areas:
+            raise ValueError(f"Área não indexada: {area} (opções: {', '.join(self.areas)})")
+        scalar = np.ndim(values) == 0
+        values = np.atleast_1d(np.asarray(values, dtype='float64'))
+
+        distinct = self._array(f'{area}_valores', mmap=False)
+        below = np.searchsorted(distinct, values, side='left')
+        found = (below < len(distinct)) & (distinct[np.minimum(below, len(distinct) - 1)] == values)
+        below = np.where(np.isnan(values), -1, below)
+
+        ranks = self._ranks(area, self._segments(len(values), uf, renda), below, found, kind)
+        return float(ranks[0]) if scalar else ranks
+
+    def _stacked_table(self, kind: str):
+        """
+        Tabelas de percentil de todas as áreas empilhadas em uma só, (valores x segmentos),
+        com uma linha e uma coluna de NaN no fim para nota ou segmento inválidos. Os segmentos
+        de um valor ficam lado a lado, então Brasil/UF/renda de um candidato caem na mesma
+        região da memória. Retorna a tabela, os valores empilhados e o início de cada área.
+        """
+        if ('*', kind) not in self._tables:
+            tables = [self._rank_table(area, kind).T for area in self.areas]
+            distinct = [self._array(f'{area}_valores', mmap=False) for area in self.areas]
+            offsets = np.cumsum([0] + [len(values) for values in distinct])
+            stacked = np.full((offsets[-1] + 1, tables[0].shape[1] + 1), np.nan)
+            stacked[:-1, :-1] = np.vstack(tables)
+            values = np.append(np.concatenate(distinct), np.nan)
+            self._tables[('*', kind)] = (stacked, values, offsets[:-1])
+        return self._tables[('*', kind)]
+
+    def lookup_candidates(self, inscricoes, areas: list = None, kind: str = 'media') -> pd.DataFrame:
+        """
+        Percentis de cada candidato (NU_INSCRICAO) em cada área: colunas (área, 'nota'/'BR'/'UF'/'RENDA').
+        Inscrições não encontradas voltam com ('candidato', 'encontrado') = False e percentis NaN.
+        """
+        areas = areas or self.areas
+        unknown = [area for area in areas if area not in self.areas]
+        if unknown:
+            raise ValueError(f"Área não indexada: {', '.join(unknown)} (opções: {', '.join(self.areas)})")
+        if kind not in RANK_KINDS:
+            raise ValueError(f"kind desconhecido: {kind} (opções: {', '.join(RANK_KINDS)})")
+        stacked, values, offsets = self._stacked_table(kind)
+        query = np.atleast_1d(np.asarray(inscricoes, dtype='int64'))
+        registered = self._array('inscricoes')
+
+        # Buscar em ordem crescente é bem mais rápido (acesso sequencial ao mmap)
+        order = np.argsort(query)
+        found_at = np.empty(len(query), dtype='int64')
+        found_at[order] = np.searchsorted(registered, query[order])
+        rows = np.minimum(found_at, len(registered) - 1)
+        found = registered[rows] == query
+        uf_codes = np.where(found, self._array('uf')[rows], -1).astype('int64')
+        band_codes = np.where(found, self._array('renda')[rows], -1).astype('int64')
+        # np.take copia linhas inteiras de uma vez (bem mais rápido que indexar o mmap)
+        positions = np.take(np.asarray(self._array('posicoes')), rows, axis=0, mode='clip')
+
+        # Coluna de cada segmento na tabela empilhada (a última é NaN: inscrição ou segmento desconhecido)
+        n_segments = stacked.shape[1]
+        segment_columns = {
+            'BR': np.where(found, 0, n_segments - 1),
+            'UF': np.where(uf_codes >= 0, uf_codes + 1, n_segments - 1),
+            'RENDA': np.where(band_codes >= 0, band_codes + 1 + len(self.ufs), n_segments - 1),
+        }
+
+        # Uma coluna contígua por (área, nota/segmento): vira um único bloco do DataFrame sem cópia
+        flat = stacked.ravel()
+        block = np.empty((len(areas), 1 + len(segment_columns), len(query)), dtype='float64')
+        for a, area in enumerate(areas):
+            k = self.areas.index(area)
+            valid = found & (positions[:, k] >= 0)
+            value_rows = np.where(valid, positions[:, k] + offsets[k], len(values) - 1)
+            # Índices sempre dentro da tabela: mode='clip' evita a checagem de limites do take
+            np.take(values, value_rows, out=block[a, 0], mode='clip')
+            base = value_rows * n_segments
+            for j, segment in enumerate(segment_columns.values(), start=1):
+                np.take(flat, base + segment, out=block[a, j], mode='clip')
+
+        names = pd.MultiIndex.from_product([areas, ['nota'] + list(segment_columns)])
+        table = pd.DataFrame(block.reshape(-1, len(query)).T, columns=names,
+                             index=pd.Index(query, name='NU_INSCRICAO'), copy=False)
+        table.insert(0, ('candidato', 'Q006'), pd.Categorical.from_codes(band_codes, self.bands))
+        table.insert(0, ('candidato', 'SG_UF_PROVA'), pd.Categorical.from_codes(uf_codes, self.ufs))
+        table.insert(0, ('candidato', 'encontrado'), found)
+        return table
+
+
+if __name__ == "__main__":
+    from .pipeline import parse_anos
+
+    parser = argparse.ArgumentParser(description="Constrói o índice de percentis por ano")
+    parser.add_argument('--anos', required=True, help="Intervalo (2014:2024) ou lista (2014,2015,2016)")
+    parser.add_argument('--dados', default='dados_enem')
+    args = parser.parse_args()
+
+    for ano in parse_anos(args.anos):
+        build_percentile_index(ano, args.dados)
@@ -0,0 +1,151 @@
+# enem_lib/pipeline.py
+"""
+Execução do pipeline como um grafo de dependências:
+
+    download(ano) -> agregação(ano) -> cubo -> análises por UF
+
+Os downloads rodam em threads (limitados pela rede) e a agregação de cada ano
+entra em um pool de processos assim que o Parquet daquele ano fica pronto,
+enquanto os anos seguintes ainda estão sendo baixados. O tempo total tende ao
+da etapa mais lenta, em vez da soma das etapas.
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
+import os
+import time
+
+from .downloader import ENEMDownloader, INEP_BASE_URL
+from .cube import cube_path_for, year_moments, save_aggregate_cube
+from .analysis import ENEMAnalyzer
+from . import instrumentation
+
+ANALISES = ['trabalho', 'renda', 'numpy']
+
+# Colunas categóricas do painel usadas por cada análise
+COLUNAS_ANALISE = {
+    'trabalho': ['Q002_STATUS', 'Q003_STATUS'],
+    'renda': ['Q006'],
+}
+
+
+def parse_anos(texto: str) -> list:
+    """Converte '2014:2024' ou '2014,2015,2016' em lista de anos (ValueError se inválido)"""
+    texto = texto.strip()
+    if ':' in texto:
+        inicio, fim = texto.split(':')
+        return list(range(int(inicio), int(fim) + 1))
+    return [int(ano.strip()) for ano in texto.split(',') if ano.strip()]
+
+
+def download_ano(ano: int, output_dir: str = 'dados_enem', max_retries: int = 5,
+                 delay_between_retries: int = 10, base_url: str = INEP_BASE_URL,
+                 mirrors: list = None, cache_dir: str = None) -> str:
+    """Baixa e converte um ano, com novas tentativas; devolve o status no formato de download_enem_data"""
+    # Um downloader por tarefa: requests.Session não deve ser compartilhada entre threads
+    downloader = ENEMDownloader(max_retries, delay_between_retries, output_dir, base_url, mirrors, cache_dir)
+
+    for tentativa in range(1, max_retries + 1):
+        print(f"\n🔄 Processando ano {ano} (tentativa {tentativa})...")
+        try:
+            if downloader._process_single_year(ano):
+                print(f"✅ Ano {ano} concluído com sucesso!")
+                return "Sucesso"
+            print(f"⚠️  Ano {ano} falhou")
+        except Exception as e:
+            print(f"❌ Erro inesperado no ano {ano}: {str(e)}")
+
+        if tentativa < max_retries:
+            time.sleep(delay_between_retries)
+
+    return "Falha após todas as tentativas"
+
+
+def run_pipeline(anos: list, ufs: list, analises: list = None, data_dir: str = 'dados_enem',
+                 download_workers: int = 2, analysis_workers: int = None, pular_existentes: bool = False,
+                 max_retries: int = 5, delay_between_retries: int = 10, base_url: str = INEP_BASE_URL,
+                 mirrors: list = None, cache_dir: str = None) -> dict:
+    """
+    Baixa, agrega e analisa os anos informados em paralelo.
+
+    Retorna um dicionário com:
+      'downloads': {ano: status}
+      'agregados': {ano: 'Sucesso' ou mensagem de erro}
+      'paineis': {uf: resultado de ENEMAnalyzer.analyze_panel}
+      'falhas': lista de mensagens (vazia quando tudo deu certo)
+    """
+    analises = analises or [analise for analise in ANALISES if analise in COLUNAS_ANALISE]
+    analysis_workers = analysis_workers or os.cpu_count() or 1
+
+    downloads = {}
+    agregados = {}
+    momentos = []
+    falhas = []
+
+    # spawn: o processo pai tem threads de download ativas, e fork com threads não é seguro
+    contexto = multiprocessing.get_context('spawn')
+    # Os spans medidos nos workers voltam com o resultado de cada agregação
+    estado_instrumentacao = instrumentation.worker_state()
+    with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix='download') as downloads_pool, \
+            ProcessPoolExecutor(max_workers=analysis_workers, mp_context=contexto) as agregacao_pool:
+
+        tarefas_download = {}
+        tarefas_agregacao = {}
+        for ano in anos:
+            parquet_path = f'{data_dir}/microdados_enem_{ano}.parquet'
+            if pular_existentes and os.path.exists(parquet_path):
+                print(f"⏭️  {ano} já convertido, pulando download")
+                downloads[ano] = "Sucesso"
+                tarefas_agregacao[agregacao_pool.submit(instrumentation.run_in_worker, estado_instrumentacao,
+                                                        year_moments, ano, data_dir)] = ano
+            else:
+                tarefas_download[downloads_pool.submit(download_ano, ano, data_dir, max_retries,
+                                                       delay_between_retries, base_url, mirrors, cache_dir)] = ano
+
+        # A agregação de cada ano é enviada assim que o seu download termina
+        for tarefa in as_completed(tarefas_download):
+            ano = tarefas_download[tarefa]
+            downloads[ano] = tarefa.result()
+            if downloads[ano] != "Sucesso":
+                falhas.append(f"Download de {ano}: {downloads[ano]}")
+                continue
+            print(f"🧊 Agregando {ano} no cubo...")
+            tarefas_agregacao[agregacao_pool.submit(instrumentation.run_in_worker, estado_instrumentacao,
+                                                    year_moments, ano, data_dir)] = ano
+
+        for tarefa in as_completed(tarefas_agregacao):
+            ano = tarefas_agregacao[tarefa]
+            try:
+                resultado, spans = tarefa.result()
+                instrumentation.merge(spans)
+            except Exception as e:
+                resultado = None
+                print(f"❌ Erro ao agregar {ano}: {e}")
+            if resultado is None or len(resultado) == 0:
+                agregados[ano] = "Sem dados"
+                falhas.append(f"Agregação de {ano}: sem dados")
+            else:
+                agregados[ano] = "Sucesso"
+                momentos.append(resultado)
+                print(f"✅ {ano} agregado: {len(resultado)} células")
+
+    paineis = {}
+    anos_ok = sorted(ano for ano, status in agregados.items() if status == "Sucesso")
+    categorias = [col for analise in analises for col in COLUNAS_ANALISE.get(analise, [])]
+
+    if anos_ok:
+        save_aggregate_cube(momentos, cube_path_for(data_dir))
+
+    if anos_ok and categorias:
+        analyzer = ENEMAnalyzer(data_dir=data_dir)
+        analyzer.load_cube()
+        for uf in ufs:
+            paineis[uf] = analyzer.analyze_panel(uf=uf, by=categorias, predictor='RENDA_NUM', years=anos_ok)
+            if not paineis[uf]:
+                falhas.append(f"Painel da UF {uf}: sem resultados")
+
+    return {
+        'downloads': {ano: downloads[ano] for ano in anos},
+        'agregados': {ano: agregados[ano] for ano in anos if ano in agregados},
+        'paineis': paineis,
+        'falhas': falhas,
+    }
@@ -0,0 +1,230 @@
+# enem_lib/plotting.py
+"""
+Gráficos desenhados só a partir de dados já agregados: contadores dos sketches de
+notas (histogramas 1D e 2D), médias por grupo vindas dos momentos, correlações por
+ano e distribuições do bootstrap. Nenhuma função recebe as linhas dos participantes,
+então o tempo de desenho e a memória não dependem do tamanho do ano.
+
+O matplotlib só é importado na primeira chamada.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from .sketch import GroupedQuantileSketch
+
+AREA_NAMES = {
+    'NU_NOTA_CN': 'Ciências Naturais',
+    'NU_NOTA_CH': 'Ciências Humanas',
+    'NU_NOTA_LC': 'Linguagens',
+    'NU_NOTA_MT': 'Matemática',
+    'NU_NOTA_REDACAO': 'Redação',
+    'NOTA_GERAL': 'Nota Geral',
+}
+
+
+_STYLE_APPLIED = False
+
+
+def _pyplot():
+    """matplotlib.pyplot, com o estilo aplicado uma única vez (na primeira chamada)"""
+    global _STYLE_APPLIED
+    import matplotlib.pyplot as plt
+    if not _STYLE_APPLIED:
+        plt.style.use('seaborn-v0_8')
+        _STYLE_APPLIED = True
+    return plt
+
+
+def _finish(fig, path: str = None):
+    """Salva em 'path' (e libera a figura) ou mostra na tela"""
+    plt = _pyplot()
+    fig.tight_layout()
+    if path:
+        fig.savefig(path, dpi=120, bbox_inches='tight')
+        plt.close(fig)
+        print(f"🖼️  Gráfico salvo em {path}")
+    else:
+        plt.show()
+    return fig
+
+
+def rebin_counts(counts: np.ndarray, bin_width: float, low: float = 0.0, plot_width: float = 10.0):
+    """
+    Junta bins vizinhos de um histograma (último eixo = bins) até a largura pedida.
+    Devolve (bordas, contadores) prontos para ax.stairs.
+    """
+    counts = np.asarray(counts, dtype='float64')
+    factor = max(1, int(round(plot_width / bin_width)))
+    pad = (-counts.shape[-1]) % factor
+    if pad:
+        counts = np.concatenate([counts, np.zeros(counts.shape[:-1] + (pad,))], axis=-1)
+    counts = counts.reshape(counts.shape[:-1] + (-1, factor)).sum(axis=-1)
+    edges = low + np.arange(counts.shape[-1] + 1) * bin_width * factor
+    return edges, counts
+
+
+def _group_label(key: tuple, by: list, labels: Dict = None) -> str:
+    value = key[0] if len(key) == 1 else key
+    if labels and value in labels:
+        return str(labels[value])
+    return ', '.join(f'{col}={part}' for col, part in zip(by, key))
+
+
+def plot_grade_histograms(sketch: GroupedQuantileSketch, column: str = 'NOTA_GERAL', plot_width: float = 10.0,
+                          labels: Dict = None, title: str = None, path: str = None):
+    """
+    Uma curva de distribuição da nota por grupo do sketch (ex: por Q006 ou EDUCACAO_PAIS),
+    normalizada para que grupos de tamanhos diferentes sejam comparáveis.
+    """
+    if not sketch.groups:
+        print("❌ Sketch vazio: nada para desenhar")
+        return None
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    template = sketch.template
+    for key in sorted(sketch.groups, key=lambda key: tuple(str(part) for part in key)):
+        edges, counts = rebin_counts(sketch.groups[key][sketch.columns.index(column)],
+                                     template.bin_width, template.low, plot_width)
+        total = counts.sum()
+        if total == 0:
+            continue
+        ax.stairs(counts / total / np.diff(edges), edges, label=_group_label(key, sketch.by, labels))
+
+    ax.set_xlabel(AREA_NAMES.get(column, column))
+    ax.set_ylabel('Densidade')
+    ax.set_xlim(template.low, template.high)
+    ax.set_title(title or f"Distribuição da {AREA_NAMES.get(column, column)} por {', '.join(sketch.by)}")
+    ax.legend(fontsize='small', ncol=2)
+    return _finish(fig, path)
+
+
+def plot_grade_heatmap(sketch: GroupedQuantileSketch, column: str = 'NOTA_GERAL', plot_width: float = 20.0,
+                       labels: Dict = None, title: str = None, path: str = None):
+    """
+    Histograma 2D grupo x faixa de nota: cada linha mostra a fração do grupo em cada
+    faixa, com a mediana do grupo marcada por cima.
+    """
+    if not sketch.groups:
+        print("❌ Sketch vazio: nada para desenhar")
+        return None
+
+    keys = sorted(sketch.groups, key=lambda key: tuple(str(part) for part in key))
+    template = sketch.template
+    j = sketch.columns.index(column)
+    edges, counts = rebin_counts(np.stack([sketch.groups[key][j] for key in keys]),
+                                 template.bin_width, template.low, plot_width)
+    totals = counts.sum(axis=1, keepdims=True)
+    shares = np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0)
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(12, max(3, 0.4 * len(keys) + 1.5)))
+    image = ax.pcolormesh(edges, np.arange(len(keys) + 1), shares, cmap='viridis', shading='flat')
+    medians = [sketch.sketch(key, column).quantile(0.5) for key in keys]
+    ax.plot(medians, np.arange(len(keys)) + 0.5, linestyle='none', marker='|', color='white',
+            markersize=14, markeredgewidth=2.5, zorder=3, label='Mediana')
+
+    ax.set_yticks(np.arange(len(keys)) + 0.5)
+    ax.set_yticklabels([_group_label(key, sketch.by, labels) for key in keys])
+    ax.set_xlabel(AREA_NAMES.get(column, column))
+    ax.set_xlim(template.low, template.high)
+    ax.grid(False)
+    ax.set_title(title or f"{AREA_NAMES.get(column, column)} por {', '.join(sketch.by)} (fração do grupo)")
+    ax.legend(loc='upper right', fontsize='small', frameon=True)
+    fig.colorbar(image, ax=ax, label='Fração do grupo')
+    return _finish(fig, path)
+
+
+def plot_group_means(stats: pd.DataFrame, column: str = 'NOTA_GERAL', title: str = None, path: str = None):
+    """
+    Médias e desvios por grupo a partir da tabela de stats_from_moments/grouped_grade_stats.
+    Índice com NU_ANO vira uma linha por categoria ao longo dos anos; senão, barras.
+    """
+    if stats is None or len(stats) == 0:
+        print("❌ Sem estatísticas para desenhar")
+        return None
+
+    mean = stats[(column, 'mean')]
+    std = stats[(column, 'std')]
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    if isinstance(stats.index, pd.MultiIndex) and 'NU_ANO' in stats.index.names:
+        category = [name for name in stats.index.names if name != 'NU_ANO'][0]
+        for value, series in mean.groupby(level=category, observed=True):
+            series = series.droplevel(category).sort_index()
+            ax.plot(series.index, series.values, marker='o', label=str(value))
+        ax.set_xticks(sorted(mean.index.get_level_values('NU_ANO').unique()))
+        ax.set_xlabel('Ano')
+        ax.legend(title=category, fontsize='small', ncol=2, loc='center left', bbox_to_anchor=(1.01, 0.5))
+    else:
+        positions = np.arange(len(mean))
+        ax.bar(positions, mean.values, yerr=std.fillna(0).values, capsize=4)
+        ax.set_xticks(positions)
+        ax.set_xticklabels([str(value) for value in mean.index])
+        ax.set_xlabel(stats.index.name or '')
+
+    ax.set_ylabel(f"Média - {AREA_NAMES.get(column, column)}")
+    ax.set_title(title or f"Média da {AREA_NAMES.get(column, column)} por grupo")
+    return _finish(fig, path)
+
+
+def plot_correlations(correlations_by_year, title: str = None, path: str = None):
+    """
+    Correlação de cada área ao longo dos anos. Aceita {ano: {area: corr}}
+    (print_correlations) ou a tabela 'correlacoes' de analyze_panel (ano x área).
+    """
+    table = correlations_by_year if isinstance(correlations_by_year, pd.DataFrame) else \
+        pd.DataFrame.from_dict(correlations_by_year, orient='index')
+    if len(table) == 0:
+        print("❌ Sem correlações para desenhar")
+        return None
+    table = table.sort_index()
+
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for area in table.columns:
+        ax.plot(table.index, table[area], marker='o', label=AREA_NAMES.get(area, area),
+                linewidth=3 if area == 'NOTA_GERAL' else 1.5)
+
+    ax.axhline(0, color='gray', linewidth=0.8)
+    ax.set_xticks(table.index)
+    ax.set_xlabel('Ano')
+    ax.set_ylabel('Correlação')
+    ax.set_title(title or "Correlações com as notas ao longo dos anos")
+    ax.legend(fontsize='small')
+    return _finish(fig, path)
+
+
+def plot_bootstrap_results(results: Dict, year: int, bins: int = 40, path: str = None):
+    """
+    Histograma da distribuição bootstrap de cada área, com a correlação média e o IC 95%.
+    Cada painel recebe só os contadores de np.histogram, não as reamostragens.
+    """
+    areas = [area for area in AREA_NAMES if area in results]
+    if not areas:
+        print("❌ Sem resultados de bootstrap para desenhar")
+        return None
+
+    plt = _pyplot()
+    n_cols = 3
+    n_rows = int(np.ceil(len(areas) / n_cols))
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(5 * n_cols, 3.5 * n_rows), squeeze=False)
+    for ax, area in zip(axes.flat, areas):
+        result = results[area]
+        distribution = np.asarray(result['distribuicao'], dtype='float64')
+        counts, edges = np.histogram(distribution[~np.isnan(distribution)], bins=bins)
+        ax.stairs(counts, edges, fill=True, alpha=0.6)
+        ax.axvline(result['correlacao'], color='black', label=f"Média {result['correlacao']:.3f}")
+        for limit in result['intervalo_confianca']:
+            ax.axvline(limit, color='red', linestyle='--')
+        ax.set_title(AREA_NAMES[area])
+        ax.set_xlabel('Correlação')
+        ax.legend(fontsize='small')
+
+    for ax in axes.flat[len(areas):]:
+        ax.set_visible(False)
+
+    fig.suptitle(f"Distribuições bootstrap das correlações - ENEM {year} (IC 95% tracejado)")
+    return _finish(fig, path)
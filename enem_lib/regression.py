@@ -0,0 +1,213 @@
+# enem_lib/regression.py
+"""
+Regressão linear (MQO) de cada nota em variáveis do questionário, com efeitos fixos
+de UF e ano e erros padrão robustos HC1.
+
+Todos os regressores são funções das chaves do cubo (ano, UF, Q002, Q003, Q006), então
+as equações normais se acumulam por célula: X'WX, X'Wy e os resíduos quadráticos do
+HC1 saem de contagem, soma e soma dos quadrados das notas em cada célula. As células
+são acumuladas lote a lote sobre os row groups do Parquet (ou vêm do painel/cubo),
+e a memória depende só do número de células, não do número de participantes.
+"""
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+from math import erfc, sqrt
+from typing import Dict, List
+import os
+
+from .aggregates import NOTE_COLUMNS, GRADE_COLUMNS, merge_moments, derive_predictors
+from .cube import CUBE_KEYS
+from .instrumentation import span
+
+DEFAULT_FIXED_EFFECTS = ('SG_UF_PROVA', 'NU_ANO')
+INTERCEPT = 'Intercepto'
+
+
+def regression_moments(df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Estatísticas suficientes por célula: número de linhas (N_OBS), soma dos pesos (N),
+    soma dos pesos ao quadrado (N2) e, para cada nota, SUM/SQ (ponderadas por w) e
+    SUM2/SQ2 (por w^2, usadas no HC1). Sem PESO_AMOSTRAL, w = 1.
+    Só entram linhas com todas as notas válidas, como em grade_moments.
+    """
+    notes = [col for col in NOTE_COLUMNS if col in df.columns]
+    keys = [key for key in keys if key in df.columns]
+
+    valid = df[keys + notes].dropna(subset=notes)
+    values = valid[notes].astype('float64')
+    values['NOTA_GERAL'] = values.mean(axis=1)
+
+    w = np.ones(len(valid), dtype='float64')
+    if 'PESO_AMOSTRAL' in df.columns:
+        w = df.loc[valid.index, 'PESO_AMOSTRAL'].to_numpy(dtype='float64')
+
+    parts = {'N_OBS': np.ones(len(valid), dtype='float64'), 'N': w, 'N2': w ** 2}
+    for col in values.columns:
+        y = values[col].to_numpy()
+        parts[f'SUM_{col}'] = w * y
+        parts[f'SQ_{col}'] = w * y ** 2
+        parts[f'SUM2_{col}'] = w ** 2 * y
+        parts[f'SQ2_{col}'] = w ** 2 * y ** 2
+
+    table = pd.DataFrame(parts, index=valid.index)
+    for key in keys:
+        table[key] = valid[key]
+    return table.groupby(keys, dropna=False, observed=True).sum().reset_index()
+
+
+def cells_from_moments(moments: pd.DataFrame) -> pd.DataFrame:
+    """Completa momentos sem pesos (ex: o cubo) com as colunas de regression_moments"""
+    cells = moments.copy()
+    cells['N_OBS'] = cells['N']
+    cells['N2'] = cells['N']
+    for col in GRADE_COLUMNS:
+        if f'SUM_{col}' in cells.columns:
+            cells[f'SUM2_{col}'] = cells[f'SUM_{col}']
+            cells[f'SQ2_{col}'] = cells[f'SQ_{col}']
+    return cells
+
+
+def stream_regression_moments(years: List[int], data_dir: str = 'dados_enem', uf: str = None,
+                              batch_size: int = 500000) -> pd.DataFrame:
+    """Acumula as células de regressão lendo os Parquet em lotes (memória constante)"""
+    keys = CUBE_KEYS[1:]
+    frames = []
+
+    for year in years:
+        parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+        if not os.path.exists(parquet_path):
+            print(f"⚠️  Arquivo não encontrado para {year}")
+            continue
+
+        parquet_file = pq.ParquetFile(parquet_path)
+        available = set(parquet_file.schema_arrow.names)
+        columns = [col for col in keys + NOTE_COLUMNS + ['PESO_AMOSTRAL'] if col in available]
+
+        print(f"📐 Acumulando equações normais com {year}...")
+        with span('aggregate', ano=year, uf=uf) as s:
+            partial = []
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+                df = batch.to_pandas()
+                if uf is not None:
+                    df = df[df['SG_UF_PROVA'] == uf]
+                partial.append(regression_moments(df, keys))
+                s.add(linhas=batch.num_rows)
+                if len(partial) >= 16:
+                    partial = [merge_moments(partial, keys)]
+
+        moments = merge_moments(partial, keys)
+        if len(moments) > 0:
+            moments.insert(0, 'NU_ANO', year)
+            frames.append(moments)
+
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True)
+
+
+def design_matrix(cells: pd.DataFrame, predictors: List[str], fixed_effects: List[str]) -> pd.DataFrame:
+    """
+    Uma linha por célula: intercepto, preditores numéricos como estão (ordinais) e
+    preditores de texto/categoria em one-hot. Efeitos fixos também viram one-hot.
+    Em cada variável one-hot o primeiro nível (em ordem) é a referência.
+    """
+    columns = {INTERCEPT: np.ones(len(cells))}
+    for name in list(predictors) + list(fixed_effects):
+        values = cells[name]
+        if name not in fixed_effects and pd.api.types.is_numeric_dtype(values):
+            columns[name] = values.to_numpy(dtype='float64')
+            continue
+        levels = sorted(pd.unique(values.dropna()), key=str)
+        for level in levels[1:]:
+            columns[f'{name}[{level}]'] = (values == level).to_numpy(dtype='float64')
+    return pd.DataFrame(columns, index=cells.index)
+
+
+def _normal_p_value(t: np.ndarray) -> np.ndarray:
+    return np.array([erfc(abs(value) / sqrt(2)) if np.isfinite(value) else np.nan for value in t])
+
+
+def fit_cells(cells: pd.DataFrame, predictors: List[str], fixed_effects: List[str],
+              columns: List[str] = None) -> Dict:
+    """
+    MQO (ponderado por N) de cada nota sobre as células, com erros padrão HC1.
+    Retorna {'coeficientes': {nota: tabela}, 'r2': {nota: r2}, 'n_obs': n, 'n_parametros': p}
+    """
+    needed = list(predictors) + list(fixed_effects)
+    cells = cells.dropna(subset=needed)
+    cells = cells[cells['N'] > 0]
+    if len(cells) == 0:
+        print("❌ Nenhuma célula válida para a regressão")
+        return {}
+
+    design = design_matrix(cells, predictors, fixed_effects)
+    X = design.to_numpy()
+    n_cell = cells['N'].to_numpy(dtype='float64')
+    n_obs = float(cells['N_OBS'].sum())
+    n_params = X.shape[1]
+    if n_obs <= n_params:
+        print(f"❌ Observações insuficientes ({n_obs:.0f}) para {n_params} parâmetros")
+        return {}
+
+    xtx = X.T @ (X * n_cell[:, None])
+    try:
+        xtx_inv = np.linalg.inv(xtx)
+    except np.linalg.LinAlgError:
+        print("❌ Matriz X'X singular: preditores colineares com os efeitos fixos")
+        return {}
+
+    columns = columns or [col for col in GRADE_COLUMNS if f'SUM_{col}' in cells.columns]
+    coefficients = {}
+    r2 = {}
+    for col in columns:
+        sums = cells[f'SUM_{col}'].to_numpy(dtype='float64')
+        squares = cells[f'SQ_{col}'].to_numpy(dtype='float64')
+        beta = xtx_inv @ (X.T @ sums)
+        fitted = X @ beta
+
+        # Soma de w^2 * e^2 em cada célula, com e = y - x'b constante dentro da célula
+        residual_sq = (cells[f'SQ2_{col}'].to_numpy(dtype='float64')
+                       - 2 * fitted * cells[f'SUM2_{col}'].to_numpy(dtype='float64')
+                       + cells['N2'].to_numpy(dtype='float64') * fitted ** 2)
+        meat = X.T @ (X * np.clip(residual_sq, 0, None)[:, None])
+        covariance = n_obs / (n_obs - n_params) * xtx_inv @ meat @ xtx_inv
+        std_error = np.sqrt(np.clip(np.diag(covariance), 0, None))
+
+        ssr = np.sum(squares - 2 * fitted * sums + n_cell * fitted ** 2)
+        sst = squares.sum() - sums.sum() ** 2 / n_cell.sum()
+        r2[col] = 1 - ssr / sst if sst > 0 else np.nan
+
+        t = np.divide(beta, std_error, out=np.full_like(beta, np.nan), where=std_error > 0)
+        coefficients[col] = pd.DataFrame({
+            'coeficiente': beta,
+            'erro_padrao': std_error,
+            't': t,
+            'p_valor': _normal_p_value(t),
+            'ic_95_inf': beta - 1.96 * std_error,
+            'ic_95_sup': beta + 1.96 * std_error,
+        }, index=pd.Index(design.columns, name='termo'))
+
+    return {
+        'coeficientes': coefficients,
+        'r2': r2,
+        'n_obs': int(n_obs),
+        'n_parametros': n_params,
+    }
+
+
+def regress_from_cells(cells: pd.DataFrame, predictors: List[str], fixed_effects=DEFAULT_FIXED_EFFECTS,
+                       columns: List[str] = None) -> Dict:
+    """Deriva os preditores das chaves (RENDA_NUM, EDUCACAO_PAIS, Q002_STATUS, ...) e ajusta"""
+    cells = derive_predictors(cells)
+    missing = [col for col in list(predictors) + list(fixed_effects) if col not in cells.columns]
+    if missing:
+        print(f"❌ Preditores não disponíveis: {missing}")
+        return {}
+
+    # Efeito fixo com um único nível (ex: uma só UF) não identifica nada: fica de fora
+    fixed_effects = [col for col in fixed_effects if cells[col].nunique() > 1]
+    with span('regression', celulas=len(cells)) as s:
+        results = fit_cells(cells, predictors, fixed_effects, columns)
+        s.add(linhas=results.get('n_obs', 0))
+    return results
@@ -0,0 +1,100 @@
+# enem_lib/sampling.py
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import List
+import argparse
+import os
+
+# Amostras ficam em uma subpasta com os mesmos nomes de arquivo dos dados completos,
+# assim os analisadores só precisam trocar o diretório de leitura
+SAMPLE_SUBDIR = 'amostras'
+DEFAULT_STRATA = ['SG_UF_PROVA', 'Q006']
+
+
+def sample_dir_for(data_dir: str = 'dados_enem') -> str:
+    return os.path.join(data_dir, SAMPLE_SUBDIR)
+
+
+def build_stratified_sample(year: int, data_dir: str = 'dados_enem', fraction: float = 0.01,
+                            strata: List[str] = None, seed: int = 42, min_per_stratum: int = 1,
+                            batch_size: int = 500000) -> str:
+    """
+    Gera uma amostra estratificada (por UF e faixa de renda, por padrão) de um ano.
+    Cada estrato h com N_h registros contribui com n_h = max(min_per_stratum, fraction * N_h)
+    linhas, e cada linha recebe o peso amostral PESO_AMOSTRAL = N_h / n_h.
+    """
+    parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+    if not os.path.exists(parquet_path):
+        print(f"⚠️  Arquivo não encontrado para {year}")
+        return None
+
+    parquet_file = pq.ParquetFile(parquet_path)
+    available = set(parquet_file.schema_arrow.names)
+    strata = [col for col in (strata or DEFAULT_STRATA) if col in available]
+
+    print(f"🎯 Amostrando {year} ({fraction:.2%}, estratos: {', '.join(strata) or 'nenhum'})...")
+
+    # Primeira passada: só as colunas de estrato, para sortear as linhas
+    keys = pq.read_table(parquet_path, columns=strata).to_pandas() if strata else \
+        pd.DataFrame(index=pd.RangeIndex(parquet_file.metadata.num_rows))
+    keys = keys.fillna('NA')
+
+    rng = np.random.default_rng(seed + year)
+    random_key = pd.Series(rng.random(len(keys)), index=keys.index)
+
+    if strata:
+        groups = random_key.groupby([keys[col] for col in strata], sort=False)
+        stratum_size = groups.transform('size').to_numpy()
+        rank = groups.rank(method='first')
+    else:
+        stratum_size = np.full(len(keys), len(keys))
+        rank = random_key.rank(method='first')
+
+    stratum_sample = np.minimum(stratum_size, np.maximum(min_per_stratum, np.round(fraction * stratum_size)))
+    selected = rank.to_numpy() <= stratum_sample
+    weights = stratum_size / stratum_sample
+
+    # Segunda passada: copia apenas as linhas sorteadas, lote a lote
+    output_dir = sample_dir_for(data_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = f'{output_dir}/microdados_enem_{year}.parquet'
+
+    writer = None
+    offset = 0
+    try:
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            mask = selected[offset:offset + batch.num_rows]
+            batch_weights = weights[offset:offset + batch.num_rows][mask]
+            offset += batch.num_rows
+
+            table = pa.Table.from_batches([batch]).filter(pa.array(mask))
+            table = table.append_column('PESO_AMOSTRAL', pa.array(batch_weights, type=pa.float64()))
+
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"✅ Amostra de {year}: {int(selected.sum())} de {len(selected)} registros salvos em {output_path}")
+    return output_path
+
+
+def build_samples(years: List[int], data_dir: str = 'dados_enem', fraction: float = 0.01,
+                  strata: List[str] = None, seed: int = 42) -> dict:
+    return {year: build_stratified_sample(year, data_dir, fraction, strata, seed) for year in years}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera amostras estratificadas dos microdados do ENEM")
+    parser.add_argument('anos', nargs='+', type=int, help="Anos a amostrar (ex: 2019 2020)")
+    parser.add_argument('--fracao', type=float, default=0.01, help="Fração amostrada em cada estrato")
+    parser.add_argument('--estratos', default=','.join(DEFAULT_STRATA), help="Colunas de estrato separadas por vírgula")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--dados', default='dados_enem', help="Pasta com os Parquet completos")
+    args = parser.parse_args()
+
+    build_samples(args.anos, args.dados, args.fracao, [col for col in args.estratos.split(',') if col], args.semente)
@@ -0,0 +1,195 @@
+# enem_lib/sketch.py
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+from typing import Dict, List, Tuple
+import os
+
+from .aggregates import NOTE_COLUMNS, GRADE_COLUMNS, derive_predictors
+
+DEFAULT_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+
+
+class GradeQuantileSketch:
+    """
+    Sketch de quantis para notas do ENEM: histograma de largura fixa sobre [0, 1000].
+    É combinável (soma dos contadores) entre row groups, anos e processos, e o erro
+    de qualquer quantil é limitado pela largura do bin (1 ponto por padrão).
+    """
+    def __init__(self, bin_width: float = 1.0, low: float = 0.0, high: float = 1000.0):
+        self.bin_width = bin_width
+        self.low = low
+        self.high = high
+        self.n_bins = int(np.ceil((high - low) / bin_width)) + 1
+        self.counts = np.zeros(self.n_bins, dtype='float64')
+
+    def bin_index(self, values: np.ndarray) -> np.ndarray:
+        index = np.floor((np.asarray(values, dtype='float64') - self.low) / self.bin_width)
+        return np.clip(index, 0, self.n_bins - 1).astype('int64')
+
+    def update(self, values, weights=None) -> 'GradeQuantileSketch':
+        values = np.asarray(values, dtype='float64')
+        valid = ~np.isnan(values)
+        if weights is not None:
+            weights = np.asarray(weights, dtype='float64')[valid]
+        self.counts += np.bincount(self.bin_index(values[valid]), weights=weights, minlength=self.n_bins)
+        return self
+
+    def merge(self, other: 'GradeQuantileSketch') -> 'GradeQuantileSketch':
+        if (other.bin_width, other.low, other.high) != (self.bin_width, self.low, self.high):
+            raise ValueError("Sketches com bins diferentes não podem ser combinados")
+        self.counts += other.counts
+        return self
+
+    @property
+    def count(self) -> float:
+        return float(self.counts.sum())
+
+    def quantiles(self, qs=DEFAULT_QUANTILES) -> np.ndarray:
+        return counts_quantiles(self.counts, qs, self.low, self.bin_width)
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+
+def counts_quantiles(counts: np.ndarray, qs, low: float = 0.0, bin_width: float = 1.0) -> np.ndarray:
+    """Quantis interpolados linearmente dentro do bin a partir de contadores (último eixo = bins)"""
+    counts = np.asarray(counts, dtype='float64')
+    qs = np.asarray(qs, dtype='float64')
+    cumulative = np.cumsum(counts, axis=-1)
+    total = cumulative[..., -1:]
+
+    result = np.full(counts.shape[:-1] + (len(qs),), np.nan)
+    for i, q in enumerate(qs):
+        target = q * total
+        # Primeiro bin cuja contagem acumulada atinge o alvo
+        position = np.minimum((cumulative < target).sum(axis=-1, keepdims=True), counts.shape[-1] - 1)
+        before = np.take_along_axis(cumulative, position, axis=-1) - np.take_along_axis(counts, position, axis=-1)
+        in_bin = np.take_along_axis(counts, position, axis=-1)
+        fraction = np.divide(target - before, in_bin, out=np.zeros_like(target), where=in_bin > 0)
+        value = low + (position + np.clip(fraction, 0, 1)) * bin_width
+        result[..., i] = np.where(total > 0, value, np.nan)[..., 0]
+    return result
+
+
+class GroupedQuantileSketch:
+    """
+    Um GradeQuantileSketch por grupo e por área de nota, atualizado de forma
+    vetorizada (um único bincount por lote). Memória: grupos x áreas x bins.
+    """
+    def __init__(self, by: List[str], columns: List[str] = None, bin_width: float = 1.0):
+        self.by = list(by)
+        self.columns = list(columns or GRADE_COLUMNS)
+        self.template = GradeQuantileSketch(bin_width=bin_width)
+        self.groups: Dict[Tuple, np.ndarray] = {}
+
+    def update(self, df: pd.DataFrame, weights=None) -> 'GroupedQuantileSketch':
+        columns = [col for col in self.columns if col in df.columns]
+        mask = df[self.by + columns].notna().all(axis=1).to_numpy()
+        valid = df[mask]
+        if len(valid) == 0:
+            return self
+
+        codes, uniques = pd.MultiIndex.from_frame(valid[self.by]).factorize()
+        n_bins = self.template.n_bins
+        if weights is not None:
+            weights = np.asarray(weights, dtype='float64')[mask]
+        elif 'PESO_AMOSTRAL' in valid.columns:
+            weights = valid['PESO_AMOSTRAL'].to_numpy(dtype='float64')
+
+        for j, col in enumerate(self.columns):
+            if col not in columns:
+                continue
+            flat = codes * n_bins + self.template.bin_index(valid[col].to_numpy())
+            counts = np.bincount(flat, weights=weights, minlength=len(uniques) * n_bins)
+            counts = counts.reshape(len(uniques), n_bins)
+            for k, key in enumerate(uniques):
+                self._counts_for(key)[j] += counts[k]
+        return self
+
+    def _counts_for(self, key: Tuple) -> np.ndarray:
+        if key not in self.groups:
+            self.groups[key] = np.zeros((len(self.columns), self.template.n_bins), dtype='float64')
+        return self.groups[key]
+
+    def merge(self, other: 'GroupedQuantileSketch') -> 'GroupedQuantileSketch':
+        if other.by != self.by or other.columns != self.columns or \
+                other.template.bin_width != self.template.bin_width:
+            raise ValueError("Sketches agrupados com estruturas diferentes não podem ser combinados")
+        for key, counts in other.groups.items():
+            self._counts_for(key)[:] += counts
+        return self
+
+    def sketch(self, key, column: str = 'NOTA_GERAL') -> GradeQuantileSketch:
+        key = key if isinstance(key, tuple) else (key,)
+        sketch = GradeQuantileSketch(bin_width=self.template.bin_width)
+        if key in self.groups:
+            sketch.counts = self.groups[key][self.columns.index(column)].copy()
+        return sketch
+
+    def quantile_table(self, qs=DEFAULT_QUANTILES, columns: List[str] = None) -> pd.DataFrame:
+        """Tabela grupo x (área, pXX) com os quantis estimados"""
+        columns = columns or self.columns
+        if not self.groups:
+            return pd.DataFrame()
+
+        keys = sorted(self.groups.keys(), key=lambda key: tuple(str(part) for part in key))
+        stacked = np.stack([self.groups[key] for key in keys])
+        estimates = counts_quantiles(stacked, qs, self.template.low, self.template.bin_width)
+
+        table = {}
+        for col in columns:
+            j = self.columns.index(col)
+            for i, q in enumerate(qs):
+                table[(col, f'p{int(round(q * 100))}')] = estimates[:, j, i]
+
+        index = pd.MultiIndex.from_tuples(keys, names=self.by) if len(self.by) > 1 else \
+            pd.Index([key[0] for key in keys], name=self.by[0])
+        result = pd.DataFrame(table, index=index)
+        result.columns = pd.MultiIndex.from_tuples(result.columns)
+        return result.round(2)
+
+
+def stream_grade_quantiles(years: List[int], by: List[str], data_dir: str = 'dados_enem', uf: str = None,
+                           bin_width: float = 1.0, batch_size: int = 500000) -> GroupedQuantileSketch:
+    """
+    Constrói os sketches agrupados em uma única passada pelos Parquet, lote a lote.
+    'by' aceita colunas brutas (SG_UF_PROVA, Q006, ...), derivadas (Q002_STATUS,
+    RENDA_NUM, EDUCACAO_PAIS) e NU_ANO.
+    """
+    return stream_grade_quantile_groupings(years, [by], data_dir, uf, bin_width, batch_size)[tuple(by)]
+
+
+def stream_grade_quantile_groupings(years: List[int], groupings: List[List[str]], data_dir: str = 'dados_enem',
+                                    uf: str = None, bin_width: float = 1.0,
+                                    batch_size: int = 500000) -> Dict[Tuple, GroupedQuantileSketch]:
+    """
+    Vários agrupamentos (ex: [['NU_ANO', 'Q006'], ['NU_ANO', 'Q002_STATUS']]) na mesma passada:
+    cada lote atualiza todos os sketches. Retorna {tupla do agrupamento: sketch}.
+    """
+    sketches = {tuple(by): GroupedQuantileSketch(by, bin_width=bin_width) for by in groupings}
+
+    for year in years:
+        parquet_path = f'{data_dir}/microdados_enem_{year}.parquet'
+        if not os.path.exists(parquet_path):
+            print(f"⚠️  Arquivo não encontrado para {year}")
+            continue
+
+        parquet_file = pq.ParquetFile(parquet_path)
+        available = set(parquet_file.schema_arrow.names)
+        wanted = ['SG_UF_PROVA', 'Q002', 'Q003', 'Q006', 'PESO_AMOSTRAL'] + NOTE_COLUMNS
+        columns = [col for col in wanted if col in available]
+
+        print(f"📐 Atualizando sketches de quantis com {year}...")
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+            df = batch.to_pandas()
+            if uf is not None:
+                df = df[df['SG_UF_PROVA'] == uf]
+            df = df.dropna(subset=[col for col in NOTE_COLUMNS if col in df.columns])
+            df['NOTA_GERAL'] = df[[col for col in NOTE_COLUMNS if col in df.columns]].mean(axis=1)
+            df['NU_ANO'] = year
+            df = derive_predictors(df)
+            for sketch in sketches.values():
+                sketch.update(df)
+
+    return sketches
@@ -0,0 +1,203 @@
+# enem_lib/synthetic.py
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import argparse
+import os
+import zipfile
+
+# UF: (código IBGE, participação aproximada no total de inscritos)
+UFS = {
+    'RO': (11, 0.008), 'AC': (12, 0.005), 'AM': (13, 0.022), 'RR': (14, 0.003), 'PA': (15, 0.052),
+    'AP': (16, 0.005), 'TO': (17, 0.008), 'MA': (21, 0.043), 'PI': (22, 0.022), 'CE': (23, 0.060),
+    'RN': (24, 0.020), 'PB': (25, 0.025), 'PE': (26, 0.058), 'AL': (27, 0.017), 'SE': (28, 0.013),
+    'BA': (29, 0.075), 'MG': (31, 0.105), 'ES': (32, 0.017), 'RJ': (33, 0.072), 'SP': (35, 0.160),
+    'PR': (41, 0.045), 'SC': (42, 0.024), 'RS': (43, 0.043), 'MS': (50, 0.012), 'MT': (51, 0.017),
+    'GO': (52, 0.035), 'DF': (53, 0.019),
+}
+
+# Média e desvio padrão aproximados de cada área (participantes presentes)
+AREAS = {
+    'CN': (480.0, 75.0), 'CH': (520.0, 80.0), 'LC': (520.0, 70.0), 'MT': (530.0, 110.0),
+}
+
+# Correlação entre as áreas objetivas e a redação (ordem: CN, CH, LC, MT, REDACAO)
+CORRELACAO_NOTAS = np.array([
+    [1.00, 0.72, 0.68, 0.75, 0.50],
+    [0.72, 1.00, 0.78, 0.65, 0.55],
+    [0.68, 0.78, 1.00, 0.62, 0.58],
+    [0.75, 0.65, 0.62, 1.00, 0.50],
+    [0.50, 0.55, 0.58, 0.50, 1.00],
+])
+
+LETRAS = np.array(list('ABCDEFGHIJKLMNOPQ'))
+
+
+# Distribuição aproximada das faixas de renda (Q006, A-Q): concentrada nas mais baixas
+PROPORCOES_RENDA = np.array([0.05, 0.25, 0.20, 0.10, 0.08, 0.06, 0.06, 0.04, 0.03,
+                             0.03, 0.02, 0.02, 0.015, 0.015, 0.01, 0.01, 0.01])
+
+
+def _ordinal(latente: np.ndarray, n_niveis: int, rng, ruido: float = 0.8, proporcoes=None) -> np.ndarray:
+    """Converte uma variável latente em respostas ordinais A, B, C... por quantis"""
+    valores = latente + rng.normal(0, ruido, len(latente))
+    if proporcoes is None:
+        posicoes = np.linspace(0, 1, n_niveis + 1)[1:-1]
+    else:
+        posicoes = np.cumsum(proporcoes)[:-1] / np.sum(proporcoes)
+    cortes = np.quantile(valores, posicoes)
+    return np.searchsorted(cortes, valores)
+
+
+def _gerar_lote(ano: int, inicio: int, n: int, rng) -> pd.DataFrame:
+    ufs = np.array(list(UFS.keys()))
+    pesos = np.array([peso for _, peso in UFS.values()])
+    uf_idx = rng.choice(len(ufs), size=n, p=pesos / pesos.sum())
+    codigo_uf = np.array([codigo for codigo, _ in UFS.values()])[uf_idx]
+
+    # Nível socioeconômico latente, com efeito regional (Sul/Sudeste/DF acima da média)
+    efeito_uf = np.where(codigo_uf >= 31, 0.25, -0.2)
+    ses = rng.normal(0, 1, n) + efeito_uf
+
+    df = pd.DataFrame({
+        'NU_INSCRICAO': np.int64(ano % 100) * 10 ** 10 + np.arange(inicio, inicio + n, dtype='int64'),
+        'NU_ANO': np.full(n, ano, dtype='int64'),
+        'TP_FAIXA_ETARIA': np.clip(rng.geometric(0.35, n), 1, 20),
+        'TP_SEXO': np.where(rng.random(n) < 0.59, 'F', 'M'),
+        'TP_ESTADO_CIVIL': rng.choice([0, 1, 2, 3, 4], size=n, p=[0.04, 0.88, 0.06, 0.015, 0.005]),
+        'TP_COR_RACA': rng.choice([0, 1, 2, 3, 4, 5, 6], size=n, p=[0.02, 0.36, 0.13, 0.44, 0.025, 0.005, 0.02]),
+        'TP_NACIONALIDADE': rng.choice([0, 1, 2, 3, 4], size=n, p=[0.005, 0.98, 0.01, 0.003, 0.002]),
+        'TP_ST_CONCLUSAO': rng.choice([1, 2, 3, 4], size=n, p=[0.45, 0.35, 0.15, 0.05]),
+        'TP_ANO_CONCLUIU': rng.integers(0, 17, n),
+        'TP_ESCOLA': np.where(ses + rng.normal(0, 1, n) > 1.2, 3, rng.choice([1, 2], size=n, p=[0.4, 0.6])),
+        'TP_ENSINO': rng.choice([1, 2], size=n, p=[0.95, 0.05]),
+        'IN_TREINEIRO': (rng.random(n) < 0.1).astype('int64'),
+        'CO_MUNICIPIO_PROVA': codigo_uf.astype('int64') * 100000 + rng.integers(1, 999, n) * 10,
+        'CO_UF_PROVA': codigo_uf.astype('int64'),
+        'SG_UF_PROVA': ufs[uf_idx],
+    })
+
+    # Presença por dia de prova: dia 1 (CH, LC, redação) e dia 2 (CN, MT)
+    presente_dia1 = rng.random(n) < (0.72 + 0.05 * np.tanh(ses))
+    presente_dia2 = presente_dia1 & (rng.random(n) < 0.93)
+    eliminado = rng.random(n) < 0.002
+    for area, presente in [('CN', presente_dia2), ('CH', presente_dia1), ('LC', presente_dia1), ('MT', presente_dia2)]:
+        df[f'TP_PRESENCA_{area}'] = np.where(eliminado & presente, 2, presente.astype('int64'))
+    for area in AREAS:
+        df[f'CO_PROVA_{area}'] = np.where(df[f'TP_PRESENCA_{area}'] == 1, 1000 + rng.integers(0, 8, n), -1)
+
+    # Notas correlacionadas entre si e com o nível socioeconômico
+    cholesky = np.linalg.cholesky(CORRELACAO_NOTAS)
+    fatores = rng.normal(0, 1, (n, 5)) @ cholesky.T
+    fatores = 0.45 * ses[:, None] + np.sqrt(1 - 0.45 ** 2) * fatores
+
+    for i, (area, (media, desvio)) in enumerate(AREAS.items()):
+        nota = np.clip(media + desvio * fatores[:, i], 0, 1000).round(1)
+        df[f'NU_NOTA_{area}'] = np.where(df[f'TP_PRESENCA_{area}'] == 1, nota, np.nan)
+
+    df['TP_LINGUA'] = rng.choice([0, 1], size=n, p=[0.45, 0.55])
+    # A redação é feita com a prova de LC: eliminados no dia 1 ficam sem status e sem nota
+    fez_redacao = (df['TP_PRESENCA_LC'] == 1).to_numpy()
+    status_redacao = np.where(rng.random(n) < 0.03, rng.integers(2, 10, n), 1)
+    df['TP_STATUS_REDACAO'] = np.where(fez_redacao, status_redacao, np.nan)
+
+    # Redação: cinco competências de 0 a 200, em múltiplos de 20
+    competencias = np.clip(120 + 35 * (fatores[:, 4:5] + rng.normal(0, 0.6, (n, 5))), 0, 200)
+    competencias = (np.round(competencias / 20) * 20) * (status_redacao == 1)[:, None]
+    for i in range(5):
+        df[f'NU_NOTA_COMP{i + 1}'] = np.where(fez_redacao, competencias[:, i], np.nan)
+    df['NU_NOTA_REDACAO'] = np.where(fez_redacao, competencias.sum(axis=1), np.nan)
+
+    # Questionário socioeconômico (respostas em letras, correlacionadas com o nível latente)
+    questoes = {
+        'Q001': _ordinal(ses, 7, rng),  # Escolaridade do pai (A-G)
+        'Q002': _ordinal(ses, 7, rng),  # Escolaridade da mãe (A-G)
+        'Q003': _ordinal(ses, 5, rng, ruido=1.2),  # Ocupação do pai (A-E)
+        'Q004': _ordinal(ses, 5, rng, ruido=1.2),  # Ocupação da mãe (A-E)
+    }
+    nao_sabe = rng.random((n, 2)) < 0.05
+    df['Q001'] = np.where(nao_sabe[:, 0], 'H', LETRAS[questoes['Q001']])
+    df['Q002'] = np.where(nao_sabe[:, 1], 'H', LETRAS[questoes['Q002']])
+    df['Q003'] = LETRAS[questoes['Q003']]
+    df['Q004'] = LETRAS[questoes['Q004']]
+    df['Q005'] = np.clip(rng.poisson(3.2, n) + 1, 1, 20)
+    df['Q006'] = LETRAS[_ordinal(ses, 17, rng, ruido=0.5, proporcoes=PROPORCOES_RENDA)]  # Renda familiar (A-Q)
+
+    for numero in range(7, 26):
+        niveis = 2 if numero in (18, 20, 21, 23, 25) else 5
+        df[f'Q{numero:03d}'] = LETRAS[_ordinal(ses, niveis, rng, ruido=1.5)]
+
+    return df
+
+
+def generate_synthetic_microdata(ano: int, n_linhas: int, output_dir: str = 'dados_sinteticos',
+                                 formatos=('zip', 'parquet'), chunk_size: int = 500000, seed: int = 42) -> dict:
+    """
+    Gera microdados sintéticos com o layout real do ENEM, lote a lote (memória limitada
+    pelo chunk_size), em ZIP com CSV latin-1 separado por ';' (como o do INEP) e/ou Parquet.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed + ano)
+
+    caminhos = {}
+    zip_file = csv_stream = parquet_writer = None
+    # Sem aspas, como no CSV do INEP; todo o conteúdo gerado é ASCII (válido em latin-1)
+    opcoes_csv = pa_csv.WriteOptions(include_header=False, delimiter=';', quoting_style='none')
+
+    try:
+        if 'zip' in formatos:
+            caminhos['zip'] = os.path.join(output_dir, f'microdados_enem_{ano}.zip')
+            zip_file = zipfile.ZipFile(caminhos['zip'], 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+            # Arquivo auxiliar menor, como no pacote do INEP: o conversor deve escolher o maior CSV
+            zip_file.writestr(f'DADOS/ITENS_PROVA_{ano}.csv',
+                              'CO_POSICAO;SG_AREA;CO_ITEM;TX_GABARITO\n1;CN;12345;A\n'.encode('latin-1'))
+            csv_stream = zip_file.open(f'DADOS/MICRODADOS_ENEM_{ano}.csv', 'w', force_zip64=True)
+        if 'parquet' in formatos:
+            caminhos['parquet'] = os.path.join(output_dir, f'microdados_enem_{ano}.parquet')
+
+        print(f"🧪 Gerando {n_linhas:,} registros sintéticos para {ano}...")
+        schema = None
+        for inicio in range(0, n_linhas, chunk_size):
+            lote = _gerar_lote(ano, inicio, min(chunk_size, n_linhas - inicio), rng)
+            tabela = pa.Table.from_pandas(lote, schema=schema, preserve_index=False)
+            schema = tabela.schema
+
+            if csv_stream is not None:
+                if inicio == 0:
+                    csv_stream.write((';'.join(lote.columns) + '\n').encode('latin-1'))
+                pa_csv.write_csv(tabela, csv_stream, opcoes_csv)
+
+            if 'parquet' in caminhos:
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(caminhos['parquet'], schema)
+                parquet_writer.write_table(tabela)
+
+            print(f"   {min(inicio + chunk_size, n_linhas):,}/{n_linhas:,} registros")
+    finally:
+        if csv_stream is not None:
+            csv_stream.close()
+        if zip_file is not None:
+            zip_file.close()
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    for formato, caminho in caminhos.items():
+        print(f"✅ {formato.upper()}: {caminho} ({os.path.getsize(caminho) / 1024 / 1024:.1f} MB)")
+    return caminhos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera microdados sintéticos do ENEM para testes offline")
+    parser.add_argument('anos', nargs='+', type=int, help="Anos a gerar (ex: 2019 2020)")
+    parser.add_argument('--linhas', type=int, default=100000, help="Número de registros por ano")
+    parser.add_argument('--saida', default='dados_sinteticos', help="Pasta de saída")
+    parser.add_argument('--formatos', default='zip,parquet', help="zip, parquet ou ambos separados por vírgula")
+    parser.add_argument('--lote', type=int, default=500000, help="Registros gerados por lote")
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    for ano in args.anos:
+        generate_synthetic_microdata(ano, args.linhas, args.saida, tuple(args.formatos.split(',')),
+                                     args.lote, args.semente)
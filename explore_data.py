@@ -1,70 +1,175 @@
 # explore_data.py
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import argparse
 import os
 
-def explore_parquet_files():
-    """Explora a estrutura dos arquivos Parquet"""
-    data_dir = 'dados_enem'
-    
+
+def is_uf_column(col: str) -> bool:
+    return 'UF' in col or 'ESTADO' in col or 'LOCAL' in col
+
+
+def is_paraiba(value) -> bool:
+    return '25' in str(value) or 'PB' in str(value)
+
+
+def column_statistics(parquet_file: pq.ParquetFile, col: str):
+    """Mínimo, máximo e nulos de uma coluna a partir das estatísticas dos row groups (rodapé)"""
+    metadata = parquet_file.metadata
+    index = parquet_file.schema.names.index(col)
+    minimum = maximum = None
+    nulls = 0
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(index).statistics
+        if stats is None:
+            return None
+        nulls += stats.null_count
+        if stats.has_min_max:
+            minimum = stats.min if minimum is None else min(minimum, stats.min)
+            maximum = stats.max if maximum is None else max(maximum, stats.max)
+    return minimum, maximum, nulls
+
+
+def value_counts(file_path: str, col: str) -> dict:
+    """Contagem por valor de uma coluna, lendo um row group por vez (codificação de dicionário mantida)"""
+    parquet_file = pq.ParquetFile(file_path, read_dictionary=[col])
+    counts = {}
+    for i in range(parquet_file.metadata.num_row_groups):
+        column = parquet_file.read_row_group(i, columns=[col]).column(0)
+        for item in pc.value_counts(column).to_pylist():
+            counts[item['values']] = counts.get(item['values'], 0) + item['counts']
+    return counts
+
+
+def explore_metadata(file_path: str):
+    """Inventário de um arquivo lendo só o rodapé, as colunas de UF e uma amostra de 2 linhas"""
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    columns = parquet_file.schema_arrow.names
+
+    print(f"📈 Total de registros: {metadata.num_rows:,}")
+    print(f"📋 Número de colunas: {len(columns)} ({metadata.num_row_groups} row groups, "
+          f"{os.path.getsize(file_path) / 1024 / 1024:.1f} MB)")
+
+    # Verificar colunas relacionadas a UF/localização
+    uf_columns = [col for col in columns if is_uf_column(col)]
+    print(f"📍 Colunas de localização: {uf_columns}")
+
+    uf_counts = {col: value_counts(file_path, col) for col in uf_columns}
+    for col, counts in uf_counts.items():
+        unique_values = list(counts)
+        print(f"   Valores únicos em {col}: {unique_values[:10]}{'...' if len(unique_values) > 10 else ''}")
+
+    # Verificar colunas de questões socioeconômicas
+    q_columns = [col for col in columns if col.startswith('Q')]
+    print(f"❓ Colunas de questionário: {q_columns[:10]}{'...' if len(q_columns) > 10 else ''}")
+
+    # Verificar colunas de notas (faixa e nulos vêm das estatísticas do rodapé)
+    nota_columns = [col for col in columns if 'NOTA' in col]
+    print(f"📝 Colunas de notas: {nota_columns}")
+    for col in nota_columns:
+        stats = column_statistics(parquet_file, col)
+        if stats is not None:
+            minimum, maximum, nulls = stats
+            print(f"   {col}: mín {minimum}, máx {maximum}, nulos {nulls:,}")
+
+    # Verificar primeiras linhas
+    print("\n📄 Primeiras 2 linhas:")
+    print(next(parquet_file.iter_batches(batch_size=2)).to_pandas())
+
+    # Verificar se há dados da Paraíba
+    paraiba_found = False
+    for col, counts in uf_counts.items():
+        paraiba_values = [val for val in counts if is_paraiba(val)]
+        if paraiba_values:
+            print(f"✅ Paraíba encontrada na coluna {col}")
+            paraiba_found = True
+            print(f"   Registros da Paraíba: {sum(counts[val] for val in paraiba_values):,}")
+
+    if not paraiba_found:
+        print("❌ Paraíba não encontrada em nenhuma coluna de UF")
+
+
+def explore_full(file_path: str):
+    """Exploração original: carrega o arquivo inteiro com pandas"""
+    # Ler o arquivo Parquet
+    df = pd.read_parquet(file_path)
+
+    print(f"📈 Total de registros: {len(df):,}")
+    print(f"📋 Número de colunas: {len(df.columns)}")
+
+    # Verificar colunas relacionadas a UF/localização
+    uf_columns = [col for col in df.columns if is_uf_column(col)]
+    print(f"📍 Colunas de localização: {uf_columns}")
+
+    # Mostrar valores únicos nas colunas de UF (se existirem)
+    for col in uf_columns:
+        unique_values = df[col].unique()
+        print(f"   Valores únicos em {col}: {unique_values[:10]}{'...' if len(unique_values) > 10 else ''}")
+
+    # Verificar colunas de questões socioeconômicas
+    q_columns = [col for col in df.columns if col.startswith('Q')]
+    print(f"❓ Colunas de questionário: {q_columns[:10]}{'...' if len(q_columns) > 10 else ''}")
+
+    # Verificar colunas de notas
+    nota_columns = [col for col in df.columns if 'NOTA' in col]
+    print(f"📝 Colunas de notas: {nota_columns}")
+
+    # Verificar primeiras linhas
+    print("\n📄 Primeiras 2 linhas:")
+    print(df.head(2))
+
+    # Verificar se há dados da Paraíba
+    paraiba_found = False
+    for col in uf_columns:
+        if any(is_paraiba(val) for val in df[col].unique()):
+            print(f"✅ Paraíba encontrada na coluna {col}")
+            paraiba_found = True
+            # Mostrar quantos registros da Paraíba
+            paraiba_data = df[df[col].astype(str).str.contains('25|PB')]
+            print(f"   Registros da Paraíba: {len(paraiba_data):,}")
+
+    if not paraiba_found:
+        print("❌ Paraíba não encontrada em nenhuma coluna de UF")
+
+
+def explore_parquet_files(data_dir: str = 'dados_enem', completo: bool = False):
+    """
+    Explora a estrutura dos arquivos Parquet.
+    Por padrão responde a partir dos metadados (rodapé, estatísticas e dicionários),
+    sem carregar os arquivos; completo=True usa a leitura integral com pandas.
+    """
     if not os.path.exists(data_dir):
-        print("❌ Pasta 'dados_enem' não existe")
+        print(f"❌ Pasta '{data_dir}' não existe")
         return
-    
-    parquet_files = [f for f in os.listdir(data_dir) if f.endswith('.parquet')]
-    
+
+    # Só os arquivos de ano (o cubo e as amostras ficam em subpastas, mas não custa filtrar)
+    parquet_files = sorted(f for f in os.listdir(data_dir)
+                           if f.startswith('microdados_enem_') and f.endswith('.parquet'))
+
     if not parquet_files:
         print("❌ Nenhum arquivo Parquet encontrado")
         return
-    
+
     print(f"📊 Encontrados {len(parquet_files)} arquivos Parquet")
-    
+
     for file_name in parquet_files:
         file_path = os.path.join(data_dir, file_name)
         print(f"\n🔍 Explorando: {file_name}")
-        
+
         try:
-            # Ler o arquivo Parquet
-            df = pd.read_parquet(file_path)
-            
-            print(f"📈 Total de registros: {len(df):,}")
-            print(f"📋 Número de colunas: {len(df.columns)}")
-            
-            # Verificar colunas relacionadas a UF/localização
-            uf_columns = [col for col in df.columns if 'UF' in col or 'ESTADO' in col or 'LOCAL' in col]
-            print(f"📍 Colunas de localização: {uf_columns}")
-            
-            # Mostrar valores únicos nas colunas de UF (se existirem)
-            for col in uf_columns:
-                unique_values = df[col].unique()
-                print(f"   Valores únicos em {col}: {unique_values[:10]}{'...' if len(unique_values) > 10 else ''}")
-            
-            # Verificar colunas de questões socioeconômicas
-            q_columns = [col for col in df.columns if col.startswith('Q')]
-            print(f"❓ Colunas de questionário: {q_columns[:10]}{'...' if len(q_columns) > 10 else ''}")
-            
-            # Verificar colunas de notas
-            nota_columns = [col for col in df.columns if 'NOTA' in col]
-            print(f"📝 Colunas de notas: {nota_columns}")
-            
-            # Verificar primeiras linhas
-            print("\n📄 Primeiras 2 linhas:")
-            print(df.head(2))
-            
-            # Verificar se há dados da Paraíba
-            paraiba_found = False
-            for col in uf_columns:
-                if any('25' in str(val) or 'PB' in str(val) for val in df[col].unique()):
-                    print(f"✅ Paraíba encontrada na coluna {col}")
-                    paraiba_found = True
-                    # Mostrar quantos registros da Paraíba
-                    paraiba_data = df[df[col].astype(str).str.contains('25|PB')]
-                    print(f"   Registros da Paraíba: {len(paraiba_data):,}")
-                    
-            if not paraiba_found:
-                print("❌ Paraíba não encontrada em nenhuma coluna de UF")
-                
+            if completo:
+                explore_full(file_path)
+            else:
+                explore_metadata(file_path)
         except Exception as e:
             print(f"❌ Erro ao explorar {file_name}: {e}")
 
 if __name__ == "__main__":
-    explore_parquet_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Explora a estrutura dos arquivos Parquet do ENEM")
+    parser.add_argument('--dados', default='dados_enem', help="Pasta com os arquivos Parquet")
+    parser.add_argument('--completo', action='store_true', help="Carrega cada arquivo inteiro (modo antigo, lento)")
+    args = parser.parse_args()
+
+    explore_parquet_files(args.dados, args.completo)
@@ -1,147 +1,193 @@
 # main.py
-from enem_lib.downloader import ENEMDownloader
+"""
+Uso interativo (pergunta anos, UF e confirmação):
+    python main.py
+
+Uso não interativo (ex: cron), com saída 1 se alguma etapa falhar:
+    python main.py --anos 2014:2024 --ufs PB,SP --analises trabalho,renda --downloads 3 --processos 4
+"""
 from enem_lib.numpy_ops import exemplo_algebra_linear, exemplo_numeros_aleatorios
-from enem_lib.analysis import ENEMAnalyzer
+from enem_lib.pipeline import ANALISES, parse_anos, run_pipeline
+from enem_lib import instrumentation
+import argparse
+import sys
 import time
 
-def main():
-    print("=" * 60)
-    print("📊 PROCESSADOR DE DADOS DO ENEM - ANÁLISE POR UF")
-    print("=" * 60)
-    
-    # Pedir anos para processar
-    anos_input = input("Digite os anos para baixar (ex: 2014:2024 ou 2014,2015,2016): ")
-    
-    # Processar input
-    if ':' in anos_input:
-        try:
-            inicio, fim = anos_input.split(':')
-            anos = [int(ano) for ano in range(int(inicio), int(fim) + 1)]
-        except ValueError:
-            print("❌ Formato de intervalo inválido. Use ex: 2014:2024")
-            return
-    else:
-        try:
-            anos = [int(ano.strip()) for ano in anos_input.split(",")]
-        except ValueError:
-            print("❌ Formato inválido. Use ex: 2014,2015,2016")
-            return
-    
-    # Verificar anos válidos
+
+def filtrar_anos_validos(anos: list) -> list:
     anos_validos = []
     for ano in anos:
         if 1998 <= ano <= 2024:
             anos_validos.append(ano)
         else:
             print(f"⚠️  Ano inválido: {ano}")
-    
+    return anos_validos
+
+
+def perguntar_configuracao() -> dict:
+    """Modo interativo original: três perguntas no terminal"""
+    anos_input = input("Digite os anos para baixar (ex: 2014:2024 ou 2014,2015,2016): ")
+
+    try:
+        anos = parse_anos(anos_input)
+    except ValueError:
+        print("❌ Formato inválido. Use ex: 2014:2024 ou 2014,2015,2016")
+        return None
+
+    anos_validos = filtrar_anos_validos(anos)
     if not anos_validos:
         print("❌ Nenhum ano válido fornecido")
-        return
-    
+        return None
+
     print(f"📅 Anos a processar: {', '.join(map(str, anos_validos))}")
-    
+
     # Pedir UF para análise
     uf = input("Digite a UF que deseja analisar (ex: PB, SP, RJ): ").strip().upper()
-    
+
     confirmacao = input("Continuar? (s/n): ")
     if confirmacao.lower() != 's':
         print("Operação cancelada pelo usuário")
+        return None
+
+    return {'anos': anos_validos, 'ufs': [uf], 'analises': ANALISES}
+
+
+def ler_argumentos(argv: list) -> dict:
+    parser = argparse.ArgumentParser(description="Baixa, converte e analisa os microdados do ENEM")
+    parser.add_argument('--anos', required=True, help="Intervalo (2014:2024) ou lista (2014,2015,2016)")
+    parser.add_argument('--ufs', default='PB', help="UFs a analisar, separadas por vírgula")
+    parser.add_argument('--analises', default=','.join(ANALISES), help=f"Análises: {', '.join(ANALISES)}")
+    parser.add_argument('--dados', default='dados_enem', help="Pasta dos Parquet e do cubo")
+    parser.add_argument('--downloads', type=int, default=2, help="Downloads simultâneos")
+    parser.add_argument('--processos', type=int, default=None, help="Processos de agregação (padrão: núcleos da CPU)")
+    parser.add_argument('--tentativas', type=int, default=5, help="Tentativas de download por ano")
+    parser.add_argument('--espera', type=int, default=10, help="Segundos entre tentativas")
+    parser.add_argument('--pular-existentes', action='store_true', help="Não baixa anos que já têm Parquet")
+    parser.add_argument('--espelhos', default='',
+                        help="Fontes tentadas antes do INEP, separadas por vírgula (pasta, file:// ou URL HTTP)")
+    parser.add_argument('--cache', default=None,
+                        help="Pasta do cache de ZIPs compartilhado (padrão: variável ENEM_CACHE_DIR)")
+    args = parser.parse_args(argv)
+
+    try:
+        anos = filtrar_anos_validos(parse_anos(args.anos))
+    except ValueError:
+        parser.error("formato inválido em --anos. Use ex: 2014:2024 ou 2014,2015,2016")
+    if not anos:
+        parser.error("nenhum ano válido em --anos")
+
+    analises = [analise.strip() for analise in args.analises.split(',') if analise.strip()]
+    desconhecidas = [analise for analise in analises if analise not in ANALISES]
+    if desconhecidas:
+        parser.error(f"análises desconhecidas: {', '.join(desconhecidas)}")
+
+    return {
+        'anos': anos,
+        'ufs': [uf.strip().upper() for uf in args.ufs.split(',') if uf.strip()],
+        'analises': analises,
+        'data_dir': args.dados,
+        'download_workers': args.downloads,
+        'analysis_workers': args.processos,
+        'max_retries': args.tentativas,
+        'delay_between_retries': args.espera,
+        'pular_existentes': args.pular_existentes,
+        'mirrors': [espelho.strip() for espelho in args.espelhos.split(',') if espelho.strip()],
+        'cache_dir': args.cache,
+    }
+
+
+def imprimir_painel(uf: str, resultados_painel: dict, analises: list):
+    if not resultados_painel:
+        print(f"❌ Não foi possível montar o painel para a UF {uf}")
         return
-    
-    # Processar os anos
+
+    if 'trabalho' in analises:
+        # Analisar relação entre trabalho dos pais e notas
+        print(f"\n🔍 Relação entre trabalho dos pais e notas na UF {uf} (ano x categoria)")
+        for parent_col in ['Q002_STATUS', 'Q003_STATUS']:
+            parent_name = "Pai" if "Q002" in parent_col else "Mãe"
+            print(f"\n📋 Estatísticas por trabalho do(a) {parent_name}:")
+            print(resultados_painel['estatisticas'][parent_col])
+
+    if 'renda' in analises:
+        # Analisar relação entre renda e notas
+        print(f"\n💰 Relação entre renda e notas na UF {uf}")
+        print("\n📈 Correlações entre renda e notas por ano:")
+        print(resultados_painel['correlacoes'].round(3))
+
+        print("\n📉 Variação das correlações em relação ao ano anterior:")
+        print(resultados_painel['variacao_correlacoes'].round(3))
+
+        print("\n📊 Estatísticas por ano e faixa de renda:")
+        print(resultados_painel['estatisticas']['Q006'])
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    print("=" * 60)
+    print("📊 PROCESSADOR DE DADOS DO ENEM - ANÁLISE POR UF")
+    print("=" * 60)
+
+    config = ler_argumentos(argv) if argv else perguntar_configuracao()
+    if config is None:
+        return 1
+
+    analises = config.pop('analises')
+
+    # Download, conversão e agregação rodam sobrepostos: cada ano é agregado
+    # assim que o seu Parquet fica pronto, enquanto os seguintes ainda baixam
     inicio = time.time()
-    
-    downloader = ENEMDownloader(max_retries=5, delay_between_retries=10)
-    resultados = downloader.download_enem_data(anos_validos)
-    
+    resultado = run_pipeline(analises=analises, **config)
     tempo_total = time.time() - inicio
-    
+
     # Mostrar resultados do download
     print("\n" + "=" * 60)
     print("📋 RESULTADOS DO DOWNLOAD")
     print("=" * 60)
-    
-    sucessos = 0
-    falhas = 0
-    
-    for ano, resultado in resultados.items():
-        status = "✅" if resultado == "Sucesso" else "❌"
-        print(f"{status} {ano}: {resultado}")
-        
-        if resultado == "Sucesso":
-            sucessos += 1
-        else:
-            falhas += 1
-    
-    print(f"\n📊 Resumo: {sucessos} sucesso(s), {falhas} falha(s)")
+
+    for ano, status in resultado['downloads'].items():
+        print(f"{'✅' if status == 'Sucesso' else '❌'} {ano}: {status}")
+
+    sucessos = sum(status == "Sucesso" for status in resultado['downloads'].values())
+    print(f"\n📊 Resumo: {sucessos} sucesso(s), {len(resultado['downloads']) - sucessos} falha(s)")
     print(f"⏱️  Tempo total: {tempo_total/60:.1f} minutos")
-    
+
     # Análise dos dados
-    if sucessos > 0:
+    if resultado['paineis']:
         print("\n" + "=" * 60)
         print("📈 ANÁLISE DOS DADOS")
         print("=" * 60)
-        
-        analyzer = ENEMAnalyzer()
-        analyzer.load_data(anos_validos)
-        
-        # Analisar relação entre trabalho dos pais e notas
-        print(f"\n🔍 Analisando relação entre trabalho dos pais e notas na UF {uf}")
-        for ano in anos_validos:
-            if str(ano) in resultados and resultados[str(ano)] == "Sucesso":
-                print(f"\n📊 Ano {ano}:")
-                resultados_trabalho, dados = analyzer.analyze_work_status_vs_grades(ano, uf)
-                
-                if resultados_trabalho:
-                    for parent_col, stats in resultados_trabalho.items():
-                        parent_name = "Pai" if "Q002" in parent_col else "Mãe"
-                        print(f"\n📋 Estatísticas por trabalho do(a) {parent_name}:")
-                        print(stats)
-                else:
-                    print("❌ Não foi possível analisar trabalho dos pais para este ano")
-        
-        # Analisar relação entre renda e notas
-        print(f"\n💰 Analisando relação entre renda e notas na UF {uf}")
-        for ano in anos_validos:
-            if str(ano) in resultados and resultados[str(ano)] == "Sucesso":
-                print(f"\n📊 Ano {ano}:")
-                resultados_renda, dados = analyzer.analyze_income_vs_grades(ano, uf)
-                
-                if resultados_renda:
-                    print("\n📈 Correlações entre renda e notas:")
-                    for nota, correlacao in resultados_renda['correlacoes'].items():
-                        nome_nota = nota.replace('NU_NOTA_', '').replace('_', ' ').title()
-                        if nota == 'NOTA_GERAL':
-                            nome_nota = 'Nota Geral'
-                        print(f"{nome_nota}: {correlacao:.3f}")
-                    
-                    print("\n📊 Estatísticas por faixa de renda:")
-                    print(resultados_renda['estatisticas_renda'])
-                else:
-                    print("❌ Não foi possível analisar renda para este ano")
-        
-        # Exemplos do NumPy
-        print("\n" + "=" * 50)
-        print("🧪 EXEMPLOS DO NUMPY COM DADOS DO ENEM")
-        print("=" * 50)
-        
-        exemplo_algebra_linear()
-        exemplo_numeros_aleatorios()
-    else:
-        print("\n⚠️  Não há dados do ENEM para analisar")
-        print("📋 Executando exemplos com dados simulados...")
-        
+
+        for uf, resultados_painel in resultado['paineis'].items():
+            imprimir_painel(uf, resultados_painel, analises)
+
+    if 'numpy' in analises:
         print("\n" + "=" * 50)
-        print("🧪 EXEMPLOS DO NUMPY (DADOS SIMULADOS)")
+        if sucessos > 0:
+            print("🧪 EXEMPLOS DO NUMPY COM DADOS DO ENEM")
+        else:
+            print("\n⚠️  Não há dados do ENEM para analisar")
+            print("📋 Executando exemplos com dados simulados...")
+            print("🧪 EXEMPLOS DO NUMPY (DADOS SIMULADOS)")
         print("=" * 50)
-        
+
         exemplo_algebra_linear()
         exemplo_numeros_aleatorios()
-    
+
+    if resultado['falhas']:
+        print("\n⚠️  Etapas com falha:")
+        for falha in resultado['falhas']:
+            print(f"   {falha}")
+
     print("\n" + "=" * 50)
     print("🎉 PROCESSAMENTO CONCLUÍDO!")
     print("=" * 50)
 
+    if instrumentation.is_enabled():
+        instrumentation.print_summary()
+
+    return 1 if resultado['falhas'] else 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# Permite `pytest` a partir de qualquer diretório sem instalar o pacote
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
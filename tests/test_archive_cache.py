@@ -0,0 +1,80 @@
+# tests/test_archive_cache.py
+import contextlib
+import io
+import os
+import pathlib
+
+import pytest
+
+pytest.importorskip('requests')
+
+from enem_lib.archive_cache import ArchiveCache
+from enem_lib.downloader import ENEMDownloader
+
+NAME = 'microdados_enem_2019.zip'
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def corrupt_keeping_stat(path):
+    """Troca um byte no lugar e restaura o mtime: o tamanho e a data continuam iguais"""
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        first = f.read(1)
+        f.seek(0)
+        f.write(bytes([first[0] ^ 0xFF]))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ArchiveCache(str(tmp_path / 'cache'))
+    quiet(cache.store_chunks, NAME, [b'PK' + os.urandom(4096)])
+    return cache
+
+
+def test_lookup_detects_corruption_with_same_size_and_mtime(cache):
+    path = cache.lookup(NAME)
+    assert path is not None
+    corrupt_keeping_stat(path)
+
+    assert quiet(cache.lookup, NAME) is None
+    assert not os.path.exists(path)
+
+
+def test_trust_stat_is_opt_in(cache):
+    path = cache.lookup(NAME)
+    corrupt_keeping_stat(path)
+    # Modo rápido explícito: não relê o objeto e, por isso, não percebe a troca
+    assert ArchiveCache(cache.cache_dir, trust_stat=True).lookup(NAME) == path
+
+
+def test_warm_cache_works_offline(cache, tmp_path):
+    """Com a origem HTTP fora do ar, um acerto de cache é usado sem erro"""
+    offline = 'http://127.0.0.1:9/microdados'
+    content = pathlib.Path(cache.lookup(NAME)).read_bytes()
+    cache.store_chunks(NAME, [content],
+                       source_version={'origem': f'{offline}/{NAME}', 'etag': '"v1"'})
+    downloader = ENEMDownloader(max_retries=1, delay_between_retries=0, output_dir=str(tmp_path),
+                                base_url=offline, cache_dir=cache.cache_dir)
+    assert quiet(downloader._fetch_archive, 2019, str(tmp_path)) == cache.lookup(NAME)
+
+
+def test_changed_local_mirror_invalidates_entry(tmp_path):
+    mirror = tmp_path / 'espelho'
+    mirror.mkdir()
+    (mirror / NAME).write_bytes(b'PK' + b'a' * 1000)
+    downloader = ENEMDownloader(max_retries=1, delay_between_retries=0, output_dir=str(tmp_path),
+                                base_url='http://127.0.0.1:9', mirrors=[str(mirror)],
+                                cache_dir=str(tmp_path / 'cache'))
+
+    first = quiet(downloader._fetch_archive, 2019, str(tmp_path))
+    assert quiet(downloader._fetch_archive, 2019, str(tmp_path)) == first
+
+    (mirror / NAME).write_bytes(b'PK' + b'b' * 2000)
+    second = quiet(downloader._fetch_archive, 2019, str(tmp_path))
+    assert second != first
+    assert pathlib.Path(second).read_bytes() == (mirror / NAME).read_bytes()
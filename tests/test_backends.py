@@ -0,0 +1,108 @@
+# tests/test_backends.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.aggregates import grade_moments
+from enem_lib.analysis import ENEMAnalyzer, ANALYSIS_COLUMNS
+from enem_lib.backends import BACKENDS, uf_filters
+from enem_lib.synthetic import generate_synthetic_microdata
+
+ANO = 2019
+KEYS = ['Q002', 'Q003', 'Q006']
+COLUMNS = ['NU_INSCRICAO', 'SG_UF_PROVA', 'Q006', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dados')
+    quiet(generate_synthetic_microdata, ANO, 20000, str(path), formatos=('parquet',), chunk_size=7000)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def in_memory(data_dir):
+    return pd.read_parquet(f'{data_dir}/microdados_enem_{ANO}.parquet')
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    if request.param != 'pandas':
+        pytest.importorskip(request.param)
+    return BACKENDS[request.param]()
+
+
+def by_candidate(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values('NU_INSCRICAO').reset_index(drop=True)
+
+
+def test_read_matches_in_memory_filter(backend, data_dir, in_memory):
+    result = backend.read(ANO, data_dir, COLUMNS, {'SG_UF_PROVA': 'PB'})
+    expected = in_memory.loc[in_memory['SG_UF_PROVA'] == 'PB', COLUMNS]
+
+    assert list(result.columns) == COLUMNS
+    pd.testing.assert_frame_equal(by_candidate(result), by_candidate(expected), check_dtype=False)
+
+
+@pytest.mark.parametrize('uf', [None, 'PB'])
+def test_grade_moments_match_in_memory(backend, data_dir, in_memory, uf):
+    result = backend.grade_moments([ANO], data_dir, KEYS, uf)
+    df = in_memory if uf is None else in_memory[in_memory['SG_UF_PROVA'] == uf]
+    expected = grade_moments(df, KEYS)
+    expected.insert(0, 'NU_ANO', ANO)
+
+    order = ['NU_ANO'] + KEYS
+    result = result.sort_values(order).reset_index(drop=True)
+    expected = expected.sort_values(order).reset_index(drop=True)
+    assert result[order].astype(str).equals(expected[order].astype(str))
+
+    numeric = [col for col in expected.columns if col not in order]
+    np.testing.assert_allclose(result[numeric].to_numpy(dtype='float64'),
+                               expected[numeric].to_numpy(dtype='float64'), rtol=1e-9)
+
+
+@pytest.mark.parametrize('uf', ['PB', '25'])
+def test_uf_rows_same_in_memory_and_on_disk(backend, data_dir, uf):
+    """Sigla (SG_UF_PROVA) ou código IBGE (CO_UF_PROVA): mesmas linhas com e sem load_data"""
+    on_disk = ENEMAnalyzer(data_dir=data_dir, backend=backend)
+    loaded = ENEMAnalyzer(data_dir=data_dir)
+    quiet(loaded.load_data, [ANO])
+
+    from_disk = quiet(on_disk.get_uf_data, ANO, uf)
+    from_memory = quiet(loaded.get_uf_data, ANO, uf)
+    assert from_disk is not None and len(from_disk) > 0
+
+    # A leitura do disco só traz as colunas das análises: compara as linhas como conjunto
+    columns = [col for col in ANALYSIS_COLUMNS if col in from_disk.columns]
+    sort = lambda df: df[columns].sort_values(columns).reset_index(drop=True)
+    pd.testing.assert_frame_equal(sort(from_disk), sort(from_memory), check_dtype=False)
+
+
+def test_unknown_uf_returns_none(data_dir):
+    analyzer = ENEMAnalyzer(data_dir=data_dir)
+    assert quiet(analyzer.get_uf_data, ANO, 'XX') is None
+
+
+def test_uf_filters_prefer_exam_uf():
+    """Nos arquivos do INEP SG_UF_RESIDENCIA vem antes; o filtro deve ser a UF de prova, como no cubo"""
+    columns = {'SG_UF_RESIDENCIA': True, 'CO_UF_ESC': False, 'CO_UF_PROVA': False, 'SG_UF_PROVA': True}
+    assert [col for col, _ in uf_filters(columns, 'PB')] == ['SG_UF_PROVA', 'SG_UF_RESIDENCIA']
+    assert [col for col, _ in uf_filters(columns, '25')][:2] == ['SG_UF_PROVA', 'CO_UF_PROVA']
+
+
+def test_uf_data_uses_exam_uf_over_residence(in_memory):
+    df = in_memory.copy()
+    df.insert(1, 'SG_UF_RESIDENCIA', np.where(df['SG_UF_PROVA'] == 'PB', 'PE', 'PB'))
+    analyzer = ENEMAnalyzer()
+    analyzer.data[ANO] = df
+    uf_data = quiet(analyzer.get_uf_data, ANO, 'PB')
+    assert (uf_data['SG_UF_PROVA'] == 'PB').all()
+    assert len(uf_data) == (df['SG_UF_PROVA'] == 'PB').sum()
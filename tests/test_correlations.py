@@ -0,0 +1,78 @@
+# tests/test_correlations.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.aggregates import correlate, kendall_tau_b, midranks, spearman_corr
+
+
+def naive_tau_b(x, y, w=None):
+    """Tau-b comparando todos os pares, cada par com peso w_i * w_j"""
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    w = np.ones(len(x)) if w is None else np.asarray(w, dtype='float64')
+    i, j = np.triu_indices(len(x), k=1)
+    pair_w = w[i] * w[j]
+    dx, dy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+    total = pair_w.sum()
+    not_tied_x = total - pair_w[dx == 0].sum()
+    not_tied_y = total - pair_w[dy == 0].sum()
+    return np.sum(pair_w * dx * dy) / np.sqrt(not_tied_x * not_tied_y)
+
+
+def ordinal_sample(n, seed):
+    """Preditor ordinal com muitos empates (como renda A-Q) e nota com empates de uma casa"""
+    rng = np.random.default_rng(seed)
+    x = rng.integers(0, 5, n).astype('float64')
+    y = np.round(500 + 40 * x + rng.normal(0, 80, n), -1)
+    return x, y
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_kendall_matches_pairwise_count(seed):
+    x, y = ordinal_sample(400, seed)
+    assert kendall_tau_b(x, y) == pytest.approx(naive_tau_b(x, y), abs=1e-12)
+    # Lado com menos valores distintos em y: o algoritmo troca os eixos
+    assert kendall_tau_b(y, x) == pytest.approx(naive_tau_b(y, x), abs=1e-12)
+
+
+def test_weighted_kendall_matches_pairwise_count():
+    x, y = ordinal_sample(300, 3)
+    w = np.random.default_rng(4).uniform(0.5, 20, len(x))
+    assert kendall_tau_b(x, y, w) == pytest.approx(naive_tau_b(x, y, w), abs=1e-12)
+
+
+def test_midranks_match_pandas_average_rank():
+    x, _ = ordinal_sample(200, 5)
+    # Postos a partir de 0 (peso acumulado até o meio do bloco): deslocados de 1/2
+    np.testing.assert_allclose(midranks(x) + 0.5, pd.Series(x).rank(method='average').to_numpy())
+
+
+def test_spearman_matches_pandas_rank_correlation():
+    x, y = ordinal_sample(500, 6)
+    expected = pd.Series(x).rank().corr(pd.Series(y).rank())
+    assert spearman_corr(x, y) == pytest.approx(expected, abs=1e-12)
+
+
+def test_weighted_spearman_equals_repeated_rows():
+    """Pesos inteiros equivalem a repetir cada linha w vezes"""
+    x, y = ordinal_sample(300, 7)
+    w = np.random.default_rng(8).integers(1, 6, len(x))
+    repeated_x, repeated_y = pd.Series(np.repeat(x, w)), pd.Series(np.repeat(y, w))
+    expected = repeated_x.rank().corr(repeated_y.rank())
+    assert spearman_corr(x, y, w) == pytest.approx(expected, abs=1e-12)
+
+
+def test_nan_pairs_are_dropped():
+    x, y = ordinal_sample(200, 9)
+    x_nan, y_nan = x.copy(), y.copy()
+    x_nan[::7] = np.nan
+    y_nan[3::11] = np.nan
+    keep = ~(np.isnan(x_nan) | np.isnan(y_nan))
+
+    for method in ('spearman', 'kendall'):
+        assert correlate(x_nan, y_nan, method) == pytest.approx(correlate(x[keep], y[keep], method), abs=1e-12)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        correlate([1, 2, 3], [1, 2, 3], 'distancia')
@@ -0,0 +1,74 @@
+# tests/test_numpy_ops.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.numpy_ops import NOTAS_PCA, acumular_covariancia, pca_notas
+from enem_lib.synthetic import generate_synthetic_microdata
+
+ANOS = [2019, 2020]
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dados')
+    for ano in ANOS:
+        quiet(generate_synthetic_microdata, ano, 6000, str(path), formatos=('parquet',))
+    return str(path)
+
+
+def in_memory(data_dir, anos=ANOS):
+    frames = [pd.read_parquet(f'{data_dir}/microdados_enem_{ano}.parquet') for ano in anos]
+    return pd.concat(frames, ignore_index=True).dropna(subset=NOTAS_PCA)
+
+
+def assert_matches_eigh(resultado, notas):
+    covariancia = np.cov(notas, rowvar=False)
+    autovalores, autovetores = np.linalg.eigh(covariancia)
+    ordem = np.argsort(autovalores)[::-1]
+
+    assert resultado['n'] == len(notas)
+    np.testing.assert_allclose(resultado['media'], notas.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(resultado['covariancia'], covariancia, rtol=1e-9)
+    np.testing.assert_allclose(resultado['autovalores'], autovalores[ordem], rtol=1e-9)
+    # Autovetores só são definidos a menos do sinal
+    np.testing.assert_allclose(np.abs(resultado['autovetores']), np.abs(autovetores[:, ordem]), atol=1e-8)
+
+
+def test_pca_matches_numpy_on_full_data(data_dir):
+    resultado = quiet(pca_notas, ANOS, data_dir)
+    assert_matches_eigh(resultado['TOTAL'], in_memory(data_dir)[NOTAS_PCA].to_numpy())
+
+
+@pytest.mark.parametrize('por', ['NU_ANO', 'SG_UF_PROVA'])
+def test_grouped_pca_matches_numpy_per_group(data_dir, por):
+    df = in_memory(data_dir)
+    resultados = quiet(pca_notas, ANOS, data_dir, por=por)
+    for grupo, dados in df.groupby(por):
+        if len(dados) > len(NOTAS_PCA):
+            assert_matches_eigh(resultados[grupo], dados[NOTAS_PCA].to_numpy())
+
+
+def test_small_batches_match_single_batch(data_dir):
+    inteiro = quiet(acumular_covariancia, ANOS, data_dir)['TOTAL']
+    em_lotes = quiet(acumular_covariancia, ANOS, data_dir, batch_size=777)['TOTAL']
+    assert em_lotes.n == inteiro.n
+    np.testing.assert_allclose(em_lotes.covariancia, inteiro.covariancia, rtol=1e-10)
+
+
+def test_year_missing_column_is_skipped(data_dir, tmp_path):
+    """Um ano sem alguma coluna é ignorado sem descartar o que os outros anos já acumularam"""
+    df = pd.read_parquet(f'{data_dir}/microdados_enem_2019.parquet')
+    df.to_parquet(tmp_path / 'microdados_enem_2019.parquet', index=False)
+    df.drop(columns=['NU_NOTA_REDACAO']).to_parquet(tmp_path / 'microdados_enem_2020.parquet', index=False)
+
+    resultado = quiet(pca_notas, ANOS, str(tmp_path))
+    assert_matches_eigh(resultado['TOTAL'], in_memory(data_dir, [2019])[NOTAS_PCA].to_numpy())
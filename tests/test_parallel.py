@@ -0,0 +1,79 @@
+# tests/test_parallel.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.analysis import ENEMAnalyzer
+from enem_lib.paraiba_analysis import ParaibaENEMAnalyzer
+from enem_lib.parallel import MIN_YEARS_IN_FLIGHT, run_parallel_analyses, years_in_flight
+from enem_lib.synthetic import generate_synthetic_microdata
+
+ANOS = [2019, 2020, 2021]
+UFS = ['PB', 'SP']
+ANALISES = ['trabalho', 'renda', 'correlacoes', 'descritivas']
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dados')
+    for ano in ANOS:
+        quiet(generate_synthetic_microdata, ano, 5000, str(path), formatos=('parquet',))
+    return str(path)
+
+
+def assert_same(left, right):
+    """Compara os resultados aninhados (dicionários, DataFrames, Series e números)"""
+    if isinstance(left, dict):
+        assert left.keys() == right.keys()
+        for key in left:
+            assert_same(left[key], right[key])
+    elif isinstance(left, pd.DataFrame):
+        pd.testing.assert_frame_equal(left, right)
+    elif isinstance(left, pd.Series):
+        pd.testing.assert_series_equal(left, right)
+    elif isinstance(left, (float, np.floating)):
+        assert left == pytest.approx(right, nan_ok=True)
+    else:
+        assert left == right
+
+
+def sequential(data_dir):
+    """As mesmas análises chamadas direto nos analisadores, um ano por vez"""
+    analyzer, paraiba = ENEMAnalyzer(data_dir=data_dir), ParaibaENEMAnalyzer(data_dir=data_dir)
+    quiet(analyzer.load_data, ANOS)
+    quiet(paraiba.load_data, ANOS)
+    results = {}
+    for ano in ANOS:
+        for uf in UFS:
+            results[(ano, uf, 'trabalho')] = quiet(analyzer.analyze_work_status_vs_grades, ano, uf)[0]
+            results[(ano, uf, 'renda')] = quiet(analyzer.analyze_income_vs_grades, ano, uf)[0]
+        results[(ano, 'PB', 'correlacoes')] = quiet(paraiba.analyze_correlations, ano)[0]
+        results[(ano, 'PB', 'descritivas')] = quiet(paraiba.print_descriptive_stats, ano)
+    return results
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_parallel_matches_sequential(data_dir, max_workers):
+    parallel = quiet(run_parallel_analyses, ANOS, UFS, ANALISES, data_dir,
+                     max_workers=max_workers, show_output=False)
+    expected = sequential(data_dir)
+    assert parallel.keys() == expected.keys()
+    for key in expected:
+        assert_same(parallel[key], expected[key])
+
+
+def test_window_fills_workers_within_budget():
+    # Uma análise por ano e 8 processos: 8 anos ocupam todos, mais um à frente
+    assert years_in_flight(8, 1) == 9
+    assert years_in_flight(4, 10) == MIN_YEARS_IN_FLIGHT
+    # Orçamento para 3 anos de 100 MB limita a janela; nunca abaixo de um ano
+    assert years_in_flight(8, 1, year_bytes=100, budget_bytes=350) == 3
+    assert years_in_flight(8, 1, year_bytes=100, budget_bytes=50) == 1
@@ -0,0 +1,104 @@
+# tests/test_percentile_index.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.aggregates import NOTE_COLUMNS
+from enem_lib.percentile_index import RANK_KINDS, build_percentile_index
+from enem_lib.synthetic import generate_synthetic_microdata
+
+ANO = 2019
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture(scope='module')
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('dados')
+    quiet(generate_synthetic_microdata, ANO, 8000, str(path), formatos=('parquet',))
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def df(data_dir):
+    df = pd.read_parquet(f'{data_dir}/microdados_enem_{ANO}.parquet')
+    df['NOTA_GERAL'] = df[NOTE_COLUMNS].mean(axis=1).where(df[NOTE_COLUMNS].notna().all(axis=1))
+    return df
+
+
+@pytest.fixture(scope='module')
+def index(data_dir):
+    # Lotes pequenos: o índice é montado a partir de vários lotes
+    return quiet(build_percentile_index, ANO, data_dir, batch_size=1500)
+
+
+def percentile_of_score(values, score, kind):
+    """Mesma definição de scipy.stats.percentileofscore ('mean', 'weak', 'strict')"""
+    values = values[~np.isnan(values)]
+    if np.isnan(score) or len(values) == 0:
+        return np.nan
+    below, at_or_below = np.sum(values < score), np.sum(values <= score)
+    count = {'media': (below + at_or_below) / 2, 'fraca': at_or_below, 'estrita': below}[kind]
+    return count * 100 / len(values)
+
+
+def scores_for(df, area):
+    """Notas do índice, notas ausentes dele, fora da escala e NaN"""
+    present = df[area].dropna().sample(40, random_state=0).to_numpy()
+    return np.concatenate([present, present + 0.05, [-10.0, 0.0, 1000.0, 2000.0, np.nan]])
+
+
+@pytest.mark.parametrize('kind', RANK_KINDS)
+@pytest.mark.parametrize('area', ['NU_NOTA_MT', 'NOTA_GERAL'])
+def test_percentile_rank_matches_brute_force(index, df, area, kind):
+    scores = scores_for(df, area)
+    segments = [({}, df), ({'uf': 'PB'}, df[df['SG_UF_PROVA'] == 'PB']), ({'renda': 'C'}, df[df['Q006'] == 'C'])]
+    for segment, rows in segments:
+        ranks = index.percentile_rank(scores, area, kind=kind, **segment)
+        expected = [percentile_of_score(rows[area].to_numpy(), score, kind) for score in scores]
+        np.testing.assert_allclose(ranks, expected, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+def test_scalar_and_out_of_range(index):
+    assert index.percentile_rank(-10.0, 'NU_NOTA_MT') == 0.0
+    assert index.percentile_rank(2000.0, 'NU_NOTA_MT') == 100.0
+    assert isinstance(index.percentile_rank(600.0), float)
+    assert np.isnan(index.percentile_rank(np.nan))
+
+
+def test_unknown_segment_is_nan(index):
+    ranks = index.percentile_rank([600.0, 600.0], uf=['PB', 'XX'])
+    assert not np.isnan(ranks[0]) and np.isnan(ranks[1])
+
+
+def test_invalid_area_and_kind_raise(index):
+    with pytest.raises(ValueError):
+        index.percentile_rank(600.0, 'NU_NOTA_XX')
+    with pytest.raises(ValueError):
+        index.lookup_candidates([1], areas=['NOTA_GERAL', 'NU_NOTA_XX'])
+    with pytest.raises(ValueError):
+        index.lookup_candidates([1], kind='abaixo')
+
+
+def test_lookup_candidates_matches_brute_force(index, df):
+    sample = df.sample(150, random_state=1)
+    missing = df['NU_INSCRICAO'].max() + 1
+    table = index.lookup_candidates(np.append(sample['NU_INSCRICAO'].to_numpy(), missing))
+
+    assert table[('candidato', 'encontrado')].tolist() == [True] * len(sample) + [False]
+    assert table.loc[missing].drop('candidato', level=0).isna().all()
+    for _, row in sample.iterrows():
+        result = table.loc[row['NU_INSCRICAO']]
+        for area in ['NU_NOTA_CN', 'NOTA_GERAL']:
+            segments = {'BR': df, 'UF': df[df['SG_UF_PROVA'] == row['SG_UF_PROVA']],
+                        'RENDA': df[df['Q006'] == row['Q006']]}
+            for name, rows in segments.items():
+                expected = percentile_of_score(rows[area].to_numpy(), row[area], 'media')
+                np.testing.assert_allclose(result[(area, name)], expected, rtol=1e-12, equal_nan=True)
+            np.testing.assert_equal(result[(area, 'nota')], row[area])
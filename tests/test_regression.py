@@ -0,0 +1,84 @@
+# tests/test_regression.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enem_lib.aggregates import NOTE_COLUMNS, derive_predictors
+from enem_lib.regression import INTERCEPT, regress_from_cells, regression_moments
+
+KEYS = ['NU_ANO', 'SG_UF_PROVA', 'Q002', 'Q003', 'Q006']
+LETTERS = np.array(list('ABCDEFGH'))
+
+
+def microdata(n=3000, seed=0, weighted=False):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'NU_ANO': rng.choice([2019, 2020, 2021], n),
+        'SG_UF_PROVA': rng.choice(['PB', 'PE', 'SP'], n),
+        'Q002': LETTERS[rng.integers(0, 8, n)],
+        'Q003': LETTERS[rng.integers(0, 7, n)],
+        'Q006': LETTERS[rng.integers(0, 8, n)],
+    })
+    income = derive_predictors(df)['RENDA_NUM'].to_numpy()
+    for i, col in enumerate(NOTE_COLUMNS):
+        df[col] = np.round(450 + 12 * income + 5 * i + (df['SG_UF_PROVA'] == 'SP') * 30
+                           + rng.normal(0, 60 + 10 * income, n), 1)
+    df.loc[rng.random(n) < 0.05, 'NU_NOTA_MT'] = np.nan
+    if weighted:
+        df['PESO_AMOSTRAL'] = rng.uniform(1, 50, n)
+    return df
+
+
+def row_level_fit(df, predictor, fixed_effects, column):
+    """MQO (ponderado) linha a linha com erros HC1, via numpy.linalg.lstsq"""
+    rows = derive_predictors(df.dropna(subset=NOTE_COLUMNS))
+    y = rows[NOTE_COLUMNS].mean(axis=1).to_numpy() if column == 'NOTA_GERAL' else rows[column].to_numpy()
+    w = rows['PESO_AMOSTRAL'].to_numpy() if 'PESO_AMOSTRAL' in rows else np.ones(len(rows))
+
+    columns = {INTERCEPT: np.ones(len(rows)), predictor: rows[predictor].to_numpy(dtype='float64')}
+    for name in fixed_effects:
+        for level in sorted(rows[name].unique(), key=str)[1:]:
+            columns[f'{name}[{level}]'] = (rows[name] == level).to_numpy(dtype='float64')
+    X = np.column_stack(list(columns.values()))
+
+    sqrt_w = np.sqrt(w)
+    beta = np.linalg.lstsq(X * sqrt_w[:, None], y * sqrt_w, rcond=None)[0]
+    residual = y - X @ beta
+    bread = np.linalg.inv(X.T @ (X * w[:, None]))
+    meat = X.T @ (X * ((w * residual) ** 2)[:, None])
+    n, k = X.shape
+    covariance = n / (n - k) * bread @ meat @ bread
+    return pd.DataFrame({'coeficiente': beta, 'erro_padrao': np.sqrt(np.diag(covariance))},
+                        index=list(columns))
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+@pytest.mark.parametrize('column', ['NU_NOTA_MT', 'NOTA_GERAL'])
+def test_cells_match_row_level_hc1(weighted, column):
+    df = microdata(weighted=weighted)
+    cells = regression_moments(df, KEYS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = regress_from_cells(cells, ['RENDA_NUM'], ('SG_UF_PROVA', 'NU_ANO'), columns=[column])
+
+    table = result['coeficientes'][column]
+    expected = row_level_fit(df, 'RENDA_NUM', ['SG_UF_PROVA', 'NU_ANO'], column)
+    assert result['n_obs'] == df[NOTE_COLUMNS].notna().all(axis=1).sum()
+    assert list(table.index) == list(expected.index)
+    np.testing.assert_allclose(table['coeficiente'], expected['coeficiente'], rtol=1e-8, atol=1e-8)
+    np.testing.assert_allclose(table['erro_padrao'], expected['erro_padrao'], rtol=1e-6)
+
+
+def test_single_level_fixed_effect_is_dropped():
+    df = microdata(n=800)
+    df['SG_UF_PROVA'] = 'PB'
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = regress_from_cells(regression_moments(df, KEYS), ['RENDA_NUM'], columns=['NOTA_GERAL'])
+    assert not any(term.startswith('SG_UF_PROVA') for term in result['coeficientes']['NOTA_GERAL'].index)
+
+
+def test_missing_predictor_returns_empty():
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert regress_from_cells(regression_moments(microdata(n=200), KEYS), ['NAO_EXISTE']) == {}
@@ -0,0 +1,90 @@
+# tests/test_sketch.py
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from enem_lib.analysis import ENEMAnalyzer
+from enem_lib.sketch import GradeQuantileSketch, GroupedQuantileSketch, counts_quantiles
+from enem_lib.synthetic import generate_synthetic_microdata
+
+QS = [0.01, 0.10, 0.25, 0.50, 0.75, 0.90, 0.99]
+
+
+def assert_within_one_bin(estimated, values, qs, bin_width=1.0):
+    """O quantil do sketch fica a até um bin das estatísticas de ordem vizinhas"""
+    lower = np.quantile(values, qs, method='lower') - bin_width
+    upper = np.quantile(values, qs, method='higher') + bin_width
+    assert np.all(estimated >= lower - 1e-9) and np.all(estimated <= upper + 1e-9), (estimated, lower, upper)
+
+
+def test_quantiles_within_one_bin_of_numpy():
+    rng = np.random.default_rng(0)
+    values = np.clip(rng.normal(520, 90, 50000), 0, 1000).round(1)
+
+    sketch = GradeQuantileSketch().update(values)
+    assert sketch.count == len(values)
+    assert_within_one_bin(sketch.quantiles(QS), values, QS, sketch.bin_width)
+
+
+def test_merge_equals_single_pass_and_ignores_nan():
+    rng = np.random.default_rng(1)
+    values = rng.uniform(300, 800, 20000)
+    values[::50] = np.nan
+
+    whole = GradeQuantileSketch().update(values)
+    left = GradeQuantileSketch().update(values[:7000])
+    right = GradeQuantileSketch().update(values[7000:])
+    np.testing.assert_array_equal(left.merge(right).counts, whole.counts)
+    assert whole.count == np.count_nonzero(~np.isnan(values))
+
+
+def test_grouped_sketch_matches_numpy_per_group():
+    rng = np.random.default_rng(2)
+    n = 30000
+    df = pd.DataFrame({
+        'Q006': rng.choice(list('ABCDE'), n),
+        'NOTA_GERAL': np.clip(rng.normal(500, 100, n), 0, 1000),
+    })
+    sketch = GroupedQuantileSketch(['Q006'], columns=['NOTA_GERAL']).update(df)
+    table = sketch.quantile_table(QS)
+
+    for band, group in df.groupby('Q006'):
+        # quantile_table arredonda para 2 casas
+        estimated = table.loc[band, 'NOTA_GERAL'].to_numpy()
+        assert_within_one_bin(estimated, group['NOTA_GERAL'].to_numpy(), QS, 1.0 + 0.005)
+
+
+def test_counts_quantiles_empty_is_nan():
+    assert np.isnan(counts_quantiles(np.zeros(10), [0.5])).all()
+
+
+def test_panel_quantiles_share_one_streaming_pass(tmp_path, monkeypatch):
+    """analyze_panel(quantiles=True) com várias categorias lê cada ano uma vez só"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for year in (2019, 2020):
+            generate_synthetic_microdata(year, 4000, str(tmp_path), formatos=('parquet',))
+
+    reads = []
+    iter_batches = pq.ParquetFile.iter_batches
+    monkeypatch.setattr(pq.ParquetFile, 'iter_batches',
+                        lambda self, *args, **kwargs: reads.append(1) or iter_batches(self, *args, **kwargs))
+
+    analyzer = ENEMAnalyzer(data_dir=str(tmp_path))
+    categories = ['Q006', 'Q002_STATUS', 'EDUCACAO_PAIS']
+    with contextlib.redirect_stdout(io.StringIO()):
+        sketches = analyzer.grade_sketches([['NU_ANO', col] for col in categories], [2019, 2020])
+        assert len(reads) == 2
+        for col in categories:
+            alone = analyzer.grade_sketch(['NU_ANO', col], [2019, 2020])
+            assert sketches[('NU_ANO', col)].groups.keys() == alone.groups.keys()
+            for key, counts in alone.groups.items():
+                np.testing.assert_array_equal(sketches[('NU_ANO', col)].groups[key], counts)
+
+        reads.clear()
+        result = analyzer.analyze_panel(by=categories, years=[2019, 2020], quantiles=True)
+    # Uma leitura por ano para os momentos e outra para todos os sketches
+    assert len(reads) <= 2 * 2
+    assert ('NOTA_GERAL', 'p50') in result['estatisticas']['Q002_STATUS'].columns